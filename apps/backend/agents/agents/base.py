@@ -6,6 +6,8 @@
 from __future__ import annotations
 
 import json
+import os
+from contextlib import aclosing
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
@@ -14,13 +16,27 @@ from uuid import uuid4
 
 from shared.types import AgentRole, SenderRole
 
-from ..llm import LLMProviderError, get_llm_service
+from ..config import AgentRegistry, default_registry
+from ..llm import (
+    ChatMessage,
+    LLMProviderError,
+    build_prompt_messages,
+    flatten_messages,
+    get_llm_service,
+)
 from ..tools import ToolExecutor
 from ..stream import publish_error, publish_token
 from ..context.models import ActionLogEntry, TodoEntry
+from ..utils import TurnDeadlineExceeded
+from ..utils.tracing import annotate_span, traced
 from ..utils.llm_logger import record_llm_interaction
 
-_CONTEXT_LOG_PATH = Path(__file__).resolve().parents[3] / 'data' / 'agent_context_logs.jsonl'
+_CONTEXT_LOG_PATH = Path(
+    os.getenv(
+        'AGENT_CONTEXT_LOG_PATH',
+        str(Path(__file__).resolve().parents[3] / 'data' / 'agent_context_logs.jsonl'),
+    )
+)
 
 
 @dataclass(frozen=True)
@@ -31,6 +47,7 @@ class AgentRunResult:
     sender: SenderRole
     content: str
     message_id: str
+    data: Optional[Dict[str, Any]] = None  # 结构化输出（如 Mike 路由 JSON），没有则为 None
 
 
 @dataclass
@@ -91,10 +108,13 @@ class BaseAgent:
 
     name: AgentRole
 
-    def __init__(self, *, name: AgentRole, description: str) -> None:
+    def __init__(
+        self, *, name: AgentRole, description: str, registry: Optional[AgentRegistry] = None
+    ) -> None:
         self.name = name
         self.description = description
         self._llm = get_llm_service()
+        self._registry = registry or default_registry
 
     async def plan(self, context: AgentContext) -> str:
         """Optional planning step before执行工具。"""
@@ -108,40 +128,56 @@ class BaseAgent:
         """整理输出给 Mike/用户。"""
         return result
 
+    @traced('agent.stream_llm_response')
     async def _stream_llm_response(
         self,
         *,
         context: AgentContext,
-        prompt: str,
-        provider: str,
+        messages: List[ChatMessage],
         sender: SenderRole,
         final_transform: Optional[Callable[[str], str]] = None,
         interaction: str = 'act',
     ) -> AgentRunResult:
         """统一的 LLM 流式封装，方便各角色直接调用。"""
 
+        annotate_span(agent=str(self.name), interaction=interaction)
+        options = self._generation_options(interaction)
         message_id = self._new_message_id()
         chunks: list[str] = []
+        usage: Dict[str, int] = {}
+        timing: Dict[str, Any] = {}
         try:
-            async for chunk in self._llm.stream_generate(prompt=prompt, provider=provider):
-                chunks.append(chunk)
-                await publish_token(
-                    sender=sender,
-                    agent=self.name,
-                    content=chunk,
-                    message_id=message_id,
-                    final=False,
+            async with aclosing(
+                self._llm.stream_generate(
+                    messages=messages,
+                    usage=usage,
+                    agent=str(self.name),
+                    interaction=interaction,
+                    timing=timing,
+                    **options,
                 )
+            ) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    await publish_token(
+                        sender=sender,
+                        agent=self.name,
+                        content=chunk,
+                        message_id=message_id,
+                        final=False,
+                    )
             full_text = ''.join(chunks)
             final_text = final_transform(full_text) if final_transform else full_text
             await record_llm_interaction(
                 session_id=context.session_id,
                 agent=str(self.name),
-                prompt=prompt,
-                provider=provider,
+                prompt=flatten_messages(messages),
+                provider=options.get('provider', 'default'),
                 raw_response=full_text,
                 final_response=final_text,
                 interaction=interaction,
+                usage=usage,
+                timing=timing,
             )
             final_timestamp = datetime.now(timezone.utc).isoformat()
             await publish_token(
@@ -154,7 +190,7 @@ class BaseAgent:
                 timestamp=final_timestamp,
             )
             return AgentRunResult(agent=self.name, sender=sender, content=final_text, message_id=message_id)
-        except LLMProviderError as exc:
+        except (LLMProviderError, TurnDeadlineExceeded) as exc:
             await publish_error(
                 content=str(exc),
                 agent=self.name,
@@ -162,6 +198,10 @@ class BaseAgent:
             )
             raise
 
+    def _generation_options(self, interaction: str) -> Dict[str, Any]:
+        """provider/model/max_tokens/stop/temperature，来自 AgentRegistry 的角色策略表。"""
+        return self._registry.generation_policy(self.name, interaction).request_options()
+
     async def _emit_final_message(
         self,
         *,
@@ -183,35 +223,48 @@ class BaseAgent:
     def _new_message_id(self) -> str:
         return str(uuid4())
 
-    def _compose_user_message(self, context: AgentContext) -> str:
+    def _build_messages(
+        self,
+        context: Optional[AgentContext],
+        *,
+        system_prompt: str,
+        task_prompt: str,
+    ) -> List[ChatMessage]:
+        """静态角色说明 → 会话上下文 → 本轮输入，保持前缀稳定以命中 provider 前缀缓存。"""
+        session_context = self._compose_context(context) if context else ''
+        return build_prompt_messages(
+            system=system_prompt, context=session_context, tail=task_prompt
+        )
+
+    def _compose_context(self, context: AgentContext) -> str:
+        # 按变化频率从低到高排列，越稳定的段落越靠前
         metadata = context.metadata or {}
         sections: list[str] = []
-        history = context.history or metadata.get('history')
-        if history:
-            sections.append(f"最近对话（供参考）:\n{history}")
+        files_overview = context.files_overview or metadata.get('files_overview') or metadata.get('files')
+        if files_overview:
+            sections.append(f"沙箱文件概览:\n{files_overview}")
         artifacts = context.artifacts or metadata.get('artifacts')
         artifacts_summary = self._summarize_recent_writes(artifacts)
         if artifacts_summary:
             sections.append(f"近期文件写入（供参考）:\n{artifacts_summary}")
-        files_overview = context.files_overview or metadata.get('files_overview') or metadata.get('files')
-        if files_overview:
-            sections.append(f"沙箱文件概览:\n{files_overview}")
-        if context.action_log:
-            log_lines = '\n'.join(
-                f"- [{entry.status}] {entry.agent} {entry.action}: {entry.result}"
-                for entry in context.action_log
-            )
-            sections.append(f"关键动作回顾:\n{log_lines}")
+        history = context.history or metadata.get('history')
+        if history:
+            sections.append(f"最近对话（供参考）:\n{history}")
         if context.pending_todos:
             todo_lines = '\n'.join(
                 f"- ({todo.priority}) {todo.description} [{todo.status}]"
                 for todo in context.pending_todos
             )
             sections.append(f"重要遗留事项:\n{todo_lines}")
+        if context.action_log:
+            log_lines = '\n'.join(
+                f"- [{entry.status}] {entry.agent} {entry.action}: {entry.result}"
+                for entry in context.action_log
+            )
+            sections.append(f"关键动作回顾:\n{log_lines}")
         if context.agent_data:
             agent_lines = '\n'.join(f"- {key}: {value}" for key, value in context.agent_data.items())
             sections.append(f"{self.name} 专属提示:\n{agent_lines}")
-        sections.append(f"当前用户输入:\n{context.user_message}")
         return '\n\n'.join(sections)
 
     def _format_context_for_log(self, context: AgentContext, *, stage: str, preview: int = 200) -> str:
@@ -1,13 +1,18 @@
-from .alex import ALEX_SYSTEM_PROMPT
-from .bob import BOB_SYSTEM_PROMPT
-from .david import DAVID_SYSTEM_PROMPT
-from .emma import EMMA_SYSTEM_PROMPT
-from .iris import IRIS_SYSTEM_PROMPT
+from .alex import ALEX_SYSTEM_PROMPT, ALEX_TASK_PROMPT
+from .bob import BOB_SYSTEM_PROMPT, BOB_TASK_PROMPT
+from .david import DAVID_SYSTEM_PROMPT, DAVID_TASK_PROMPT
+from .emma import EMMA_SYSTEM_PROMPT, EMMA_TASK_PROMPT
+from .iris import IRIS_SYSTEM_PROMPT, IRIS_TASK_PROMPT
 from .mike import (
     MIKE_SYSTEM_PROMPT,
+    MIKE_TASK_PROMPT,
     MIKE_PLAN_PROMPT,
+    MIKE_PLAN_TASK_PROMPT,
+    MIKE_DAG_PLAN_PROMPT,
     MIKE_REVIEW_PROMPT,
+    MIKE_REVIEW_TASK_PROMPT,
     MIKE_SUMMARY_PROMPT,
+    MIKE_SUMMARY_TASK_PROMPT,
 )
 
 SYSTEM_PROMPTS = {
@@ -21,13 +26,23 @@ SYSTEM_PROMPTS = {
 
 __all__ = [
     'ALEX_SYSTEM_PROMPT',
+    'ALEX_TASK_PROMPT',
     'BOB_SYSTEM_PROMPT',
+    'BOB_TASK_PROMPT',
     'DAVID_SYSTEM_PROMPT',
+    'DAVID_TASK_PROMPT',
     'EMMA_SYSTEM_PROMPT',
+    'EMMA_TASK_PROMPT',
     'IRIS_SYSTEM_PROMPT',
+    'IRIS_TASK_PROMPT',
     'MIKE_SYSTEM_PROMPT',
+    'MIKE_TASK_PROMPT',
     'MIKE_PLAN_PROMPT',
+    'MIKE_PLAN_TASK_PROMPT',
+    'MIKE_DAG_PLAN_PROMPT',
     'MIKE_REVIEW_PROMPT',
+    'MIKE_REVIEW_TASK_PROMPT',
     'MIKE_SUMMARY_PROMPT',
+    'MIKE_SUMMARY_TASK_PROMPT',
     'SYSTEM_PROMPTS',
 ]
@@ -29,6 +29,9 @@ Guidelines:
 - 若需要研究或外部信息，交给 Iris；你只专注于实现与验证。
 - 文件 block 内如需再嵌 code fence，请用 `~~~` 或缩进，避免破坏外层 fence。
 
-User ask: "{user_message}"
 请按照上述要求返回实施步骤，并附上必要的 file/shell blocks，以便系统自动应用。\
 """
+
+ALEX_TASK_PROMPT = """\
+User ask: "{user_message}"\
+"""
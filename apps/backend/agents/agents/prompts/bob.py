@@ -15,6 +15,9 @@ Guidelines:
 ```endfile
 The tooling会写入项目沙箱，若未指定则默认 overwrite。
 
-User brief: "{user_message}"
 Return an architecture summary + prioritized technical considerations.\
 """
+
+BOB_TASK_PROMPT = """\
+User brief: "{user_message}"\
+"""
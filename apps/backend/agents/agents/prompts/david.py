@@ -8,6 +8,9 @@ Guidelines:
 - Tie insights back to the user’s goal.
 - Suggest lightweight validation or experimentation steps.
 
-User request: "{user_message}"
 Produce data/analytics recommendations with next steps.\
 """
+
+DAVID_TASK_PROMPT = """\
+User request: "{user_message}"\
+"""
@@ -15,9 +15,11 @@ Guidelines:
 - Reference existing documents using `{{read_file:path/to/doc.md}}` when relevant.
 - Inside file blocks, use `~~~` or indentation for nested code to avoid prematurely closing the fence.
 
+Produce a compact requirements summary plus next validation steps.\
+"""
+
+EMMA_TASK_PROMPT = """\
 User context: "{user_message}"
 Research snippets (if any):
-{research_snippets}
-
-Produce a compact requirements summary plus next validation steps.\
+{research_snippets}\
 """
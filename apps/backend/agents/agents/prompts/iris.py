@@ -9,9 +9,11 @@ Guidelines:
 - Focus on actionable findings, not generic statements.
 - If online data is unavailable, suggest alternative research paths.
 
+Return 2-4 concise findings with source hints.\
+"""
+
+IRIS_TASK_PROMPT = """\
 Current topic: "{user_message}"
 Research snippets collected via tools:
-{research_snippets}
-
-Return 2-4 concise findings with source hints.\
+{research_snippets}\
 """
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
+from contextlib import aclosing
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
 from ..base import AgentContext, AgentRunResult, BaseAgent
-from ..prompts import ALEX_SYSTEM_PROMPT
+from ..prompts import ALEX_SYSTEM_PROMPT, ALEX_TASK_PROMPT
 from ...tools import ToolExecutionError
-from ...llm import LLMProviderError
-from ...utils import extract_file_blocks, extract_shell_blocks
+from ...llm import LLMProviderError, flatten_messages
+from ...utils import TurnDeadlineExceeded, extract_file_blocks, extract_shell_blocks
 from ...utils.llm_logger import record_llm_interaction
 from ...stream import publish_error, publish_status, publish_token
 
@@ -24,19 +25,36 @@ class AlexAgent(BaseAgent):
     async def act(self, context: AgentContext) -> AgentRunResult:
         # TODO: remove context logging once pipeline verified
         self._format_context_for_log(context, stage='act')
-        prompt = ALEX_SYSTEM_PROMPT.format(user_message=self._compose_user_message(context))
+        messages = self._build_messages(
+            context,
+            system_prompt=ALEX_SYSTEM_PROMPT,
+            task_prompt=ALEX_TASK_PROMPT.format(user_message=context.user_message),
+        )
+        options = self._generation_options('act')
         message_id = self._new_message_id()
         chunks: list[str] = []
+        usage: Dict[str, int] = {}
+        timing: Dict[str, Any] = {}
         try:
-            async for chunk in self._llm.stream_generate(prompt=prompt, provider='deepseek'):
-                chunks.append(chunk)
-                await publish_token(
-                    sender='agent',
-                    agent=self.name,
-                    content=chunk,
-                    message_id=message_id,
-                    final=False,
+            async with aclosing(
+                self._llm.stream_generate(
+                    messages=messages,
+                    usage=usage,
+                    agent=str(self.name),
+                    interaction='act',
+                    timing=timing,
+                    **options,
                 )
+            ) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    await publish_token(
+                        sender='agent',
+                        agent=self.name,
+                        content=chunk,
+                        message_id=message_id,
+                        final=False,
+                    )
             raw = ''.join(chunks)
             files = extract_file_blocks(raw)
             commands = extract_shell_blocks(raw)
@@ -110,11 +128,13 @@ class AlexAgent(BaseAgent):
             await record_llm_interaction(
                 session_id=context.session_id,
                 agent=str(self.name),
-                prompt=prompt,
-                provider='deepseek',
+                prompt=flatten_messages(messages),
+                provider=options.get('provider', 'default'),
                 raw_response=raw,
                 final_response=summary,
                 interaction='act',
+                usage=usage,
+                timing=timing,
             )
             await publish_token(
                 sender='agent',
@@ -126,7 +146,7 @@ class AlexAgent(BaseAgent):
                 timestamp=datetime.now(timezone.utc).isoformat(),
             )
             return AgentRunResult(agent=self.name, sender='agent', content=summary, message_id=message_id)
-        except LLMProviderError as exc:
+        except (LLMProviderError, TurnDeadlineExceeded) as exc:
             await publish_error(
                 content=str(exc),
                 agent=self.name,
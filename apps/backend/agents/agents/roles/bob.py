@@ -1,14 +1,15 @@
 from __future__ import annotations
 
 import re
+from contextlib import aclosing
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
 from ..base import AgentContext, AgentRunResult, BaseAgent
-from ..prompts import BOB_SYSTEM_PROMPT
+from ..prompts import BOB_SYSTEM_PROMPT, BOB_TASK_PROMPT
 from ...tools import ToolExecutionError
-from ...llm import LLMProviderError
-from ...utils import extract_file_blocks
+from ...llm import LLMProviderError, flatten_messages
+from ...utils import TurnDeadlineExceeded, extract_file_blocks
 from ...utils.llm_logger import record_llm_interaction
 from ...stream import publish_error, publish_token
 
@@ -25,19 +26,36 @@ class BobAgent(BaseAgent):
     async def act(self, context: AgentContext) -> AgentRunResult:
         # TODO: remove context logging once pipeline verified
         self._format_context_for_log(context, stage='act')
-        prompt = BOB_SYSTEM_PROMPT.format(user_message=self._compose_user_message(context))
+        messages = self._build_messages(
+            context,
+            system_prompt=BOB_SYSTEM_PROMPT,
+            task_prompt=BOB_TASK_PROMPT.format(user_message=context.user_message),
+        )
+        options = self._generation_options('act')
         message_id = self._new_message_id()
         chunks: list[str] = []
+        usage: Dict[str, int] = {}
+        timing: Dict[str, Any] = {}
         try:
-            async for chunk in self._llm.stream_generate(prompt=prompt, provider='deepseek'):
-                chunks.append(chunk)
-                await publish_token(
-                    sender='agent',
-                    agent=self.name,
-                    content=chunk,
-                    message_id=message_id,
-                    final=False,
+            async with aclosing(
+                self._llm.stream_generate(
+                    messages=messages,
+                    usage=usage,
+                    agent=str(self.name),
+                    interaction='act',
+                    timing=timing,
+                    **options,
                 )
+            ) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    await publish_token(
+                        sender='agent',
+                        agent=self.name,
+                        content=chunk,
+                        message_id=message_id,
+                        final=False,
+                    )
             raw = ''.join(chunks)
             reference_blocks = self._extract_read_blocks(raw)
             history_paths = self._discover_shared_paths(context)
@@ -71,11 +89,13 @@ class BobAgent(BaseAgent):
             await record_llm_interaction(
                 session_id=context.session_id,
                 agent=str(self.name),
-                prompt=prompt,
-                provider='deepseek',
+                prompt=flatten_messages(messages),
+                provider=options.get('provider', 'default'),
                 raw_response=raw,
                 final_response=summary,
                 interaction='act',
+                usage=usage,
+                timing=timing,
             )
             await publish_token(
                 sender='agent',
@@ -87,7 +107,7 @@ class BobAgent(BaseAgent):
                 timestamp=datetime.now(timezone.utc).isoformat(),
             )
             return AgentRunResult(agent=self.name, sender='agent', content=summary, message_id=message_id)
-        except LLMProviderError as exc:
+        except (LLMProviderError, TurnDeadlineExceeded) as exc:
             await publish_error(
                 content=str(exc),
                 agent=self.name,
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from ..base import AgentContext, AgentRunResult, BaseAgent
-from ..prompts import DAVID_SYSTEM_PROMPT
+from ..prompts import DAVID_SYSTEM_PROMPT, DAVID_TASK_PROMPT
 
 
 class DavidAgent(BaseAgent):
@@ -16,10 +16,13 @@ class DavidAgent(BaseAgent):
     async def act(self, context: AgentContext) -> AgentRunResult:
         # TODO: remove context logging once pipeline verified
         self._format_context_for_log(context, stage='act')
-        prompt = DAVID_SYSTEM_PROMPT.format(user_message=self._compose_user_message(context))
+        messages = self._build_messages(
+            context,
+            system_prompt=DAVID_SYSTEM_PROMPT,
+            task_prompt=DAVID_TASK_PROMPT.format(user_message=context.user_message),
+        )
         return await self._stream_llm_response(
             context=context,
-            prompt=prompt,
-            provider='deepseek',
+            messages=messages,
             sender='agent',
         )
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
 import re
+from contextlib import aclosing
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
 from ..base import AgentContext, AgentRunResult, BaseAgent
-from ..prompts import EMMA_SYSTEM_PROMPT
+from ..prompts import EMMA_SYSTEM_PROMPT, EMMA_TASK_PROMPT
 from ...tools import ToolExecutionError
-from ...llm import LLMProviderError
-from ...utils import extract_file_blocks
+from ...llm import LLMProviderError, flatten_messages
+from ...utils import TurnDeadlineExceeded, extract_file_blocks
 from ...utils.llm_logger import record_llm_interaction
 from ...stream import publish_error, publish_token
 
@@ -26,22 +27,39 @@ class EmmaAgent(BaseAgent):
         # TODO: remove context logging once pipeline verified
         self._format_context_for_log(context, stage='act')
         research_snippets = await self._collect_research(context)
-        prompt = EMMA_SYSTEM_PROMPT.format(
-            user_message=self._compose_user_message(context),
-            research_snippets=research_snippets,
+        messages = self._build_messages(
+            context,
+            system_prompt=EMMA_SYSTEM_PROMPT,
+            task_prompt=EMMA_TASK_PROMPT.format(
+                user_message=context.user_message,
+                research_snippets=research_snippets,
+            ),
         )
+        options = self._generation_options('act')
         message_id = self._new_message_id()
         chunks: list[str] = []
+        usage: Dict[str, int] = {}
+        timing: Dict[str, Any] = {}
         try:
-            async for chunk in self._llm.stream_generate(prompt=prompt, provider='deepseek'):
-                chunks.append(chunk)
-                await publish_token(
-                    sender='agent',
-                    agent=self.name,
-                    content=chunk,
-                    message_id=message_id,
-                    final=False,
+            async with aclosing(
+                self._llm.stream_generate(
+                    messages=messages,
+                    usage=usage,
+                    agent=str(self.name),
+                    interaction='act',
+                    timing=timing,
+                    **options,
                 )
+            ) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    await publish_token(
+                        sender='agent',
+                        agent=self.name,
+                        content=chunk,
+                        message_id=message_id,
+                        final=False,
+                    )
             raw = ''.join(chunks)
             reference_blocks = self._extract_read_blocks(raw)
             references = ''
@@ -73,11 +91,13 @@ class EmmaAgent(BaseAgent):
             await record_llm_interaction(
                 session_id=context.session_id,
                 agent=str(self.name),
-                prompt=prompt,
-                provider='deepseek',
+                prompt=flatten_messages(messages),
+                provider=options.get('provider', 'default'),
                 raw_response=raw,
                 final_response=summary,
                 interaction='act',
+                usage=usage,
+                timing=timing,
             )
             await publish_token(
                 sender='agent',
@@ -89,7 +109,7 @@ class EmmaAgent(BaseAgent):
                 timestamp=datetime.now(timezone.utc).isoformat(),
             )
             return AgentRunResult(agent=self.name, sender='agent', content=summary, message_id=message_id)
-        except LLMProviderError as exc:
+        except (LLMProviderError, TurnDeadlineExceeded) as exc:
             await publish_error(
                 content=str(exc),
                 agent=self.name,
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from ..base import AgentContext, AgentRunResult, BaseAgent
-from ..prompts import IRIS_SYSTEM_PROMPT
+from ..prompts import IRIS_SYSTEM_PROMPT, IRIS_TASK_PROMPT
 from ...tools import ToolExecutionError
 
 
@@ -18,14 +18,17 @@ class IrisAgent(BaseAgent):
         # TODO: remove context logging once pipeline verified
         self._format_context_for_log(context, stage='act')
         research_snippets = await self._collect_external_insights(context)
-        prompt = IRIS_SYSTEM_PROMPT.format(
-            user_message=self._compose_user_message(context),
-            research_snippets=research_snippets,
+        messages = self._build_messages(
+            context,
+            system_prompt=IRIS_SYSTEM_PROMPT,
+            task_prompt=IRIS_TASK_PROMPT.format(
+                user_message=context.user_message,
+                research_snippets=research_snippets,
+            ),
         )
         return await self._stream_llm_response(
             context=context,
-            prompt=prompt,
-            provider='deepseek',
+            messages=messages,
             sender='agent',
         )
 
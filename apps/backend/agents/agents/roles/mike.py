@@ -2,10 +2,27 @@ from __future__ import annotations
 
 import json
 import re
-from typing import Any, Dict, Optional, Tuple
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from ..base import AgentContext, AgentRunResult, BaseAgent
-from ..prompts import MIKE_PLAN_PROMPT, MIKE_REVIEW_PROMPT, MIKE_SUMMARY_PROMPT, MIKE_SYSTEM_PROMPT
+from ..prompts import (
+    MIKE_DAG_PLAN_PROMPT,
+    MIKE_PLAN_PROMPT,
+    MIKE_PLAN_TASK_PROMPT,
+    MIKE_REVIEW_PROMPT,
+    MIKE_REVIEW_TASK_PROMPT,
+    MIKE_SUMMARY_PROMPT,
+    MIKE_SUMMARY_TASK_PROMPT,
+    MIKE_SYSTEM_PROMPT,
+    MIKE_TASK_PROMPT,
+)
+from ...llm import ChatMessage, LLMProviderError, flatten_messages
+from ...stream import publish_error, publish_token
+from ...utils import IncrementalJSONParser, TurnDeadlineExceeded
+from ...utils.llm_logger import record_llm_interaction
+from ...utils.tracing import annotate_span, traced
 
 
 class MikeAgent(BaseAgent):
@@ -20,11 +37,14 @@ class MikeAgent(BaseAgent):
     async def act(self, context: AgentContext) -> AgentRunResult:
         # TODO: remove context logging once pipeline verified
         self._format_context_for_log(context, stage='act')
-        prompt = MIKE_SYSTEM_PROMPT.format(user_message=self._compose_user_message(context))
+        messages = self._build_messages(
+            context,
+            system_prompt=MIKE_SYSTEM_PROMPT,
+            task_prompt=MIKE_TASK_PROMPT.format(user_message=context.user_message),
+        )
         return await self._stream_llm_response(
             context=context,
-            prompt=prompt,
-            provider='deepseek',
+            messages=messages,
             sender='mike',
         )
 
@@ -39,19 +59,42 @@ class MikeAgent(BaseAgent):
             available_text = '\n'.join(f"- {entry}" for entry in available_agents)
         else:
             available_text = '暂无可用 Agent'
-        prompt = MIKE_PLAN_PROMPT.format(
-            user_message=self._compose_user_message(context),
-            available_agents=available_text,
+        messages = self._build_messages(
+            context,
+            system_prompt=MIKE_PLAN_PROMPT.format(available_agents=available_text),
+            task_prompt=MIKE_PLAN_TASK_PROMPT.format(user_message=context.user_message),
         )
-        return await self._stream_llm_response(
+        return await self._stream_routing_decision(
             context=context,
-            prompt=prompt,
-            provider='deepseek',
-            sender='mike',
+            messages=messages,
             interaction='plan_next_agent',
+            required_fields=('next_agent',),
             final_transform=self._format_plan_response,
         )
 
+    async def plan_dependency_graph(
+        self,
+        context: AgentContext,
+        available_agents: list[str],
+    ) -> AgentRunResult:
+        """并行模式：一次性规划参与的 Agent 及其依赖，data['steps'] 为 [{agent, depends_on}]。"""
+        if available_agents:
+            available_text = '\n'.join(f"- {entry}" for entry in available_agents)
+        else:
+            available_text = '暂无可用 Agent'
+        messages = self._build_messages(
+            context,
+            system_prompt=MIKE_DAG_PLAN_PROMPT.format(available_agents=available_text),
+            task_prompt=MIKE_PLAN_TASK_PROMPT.format(user_message=context.user_message),
+        )
+        return await self._stream_routing_decision(
+            context=context,
+            messages=messages,
+            interaction='plan_dependency_graph',
+            required_fields=('steps',),
+            final_transform=self._format_dag_plan_response,
+        )
+
     async def review_agent_output(
         self,
         context: AgentContext,
@@ -61,16 +104,21 @@ class MikeAgent(BaseAgent):
     ) -> AgentRunResult:
         # TODO: remove context logging once pipeline verified
         self._format_context_for_log(context, stage='review_agent_output')
-        prompt = MIKE_REVIEW_PROMPT.format(agent_name=agent_name, agent_output=agent_output)
+        task_prompt = MIKE_REVIEW_TASK_PROMPT.format(
+            agent_name=agent_name, agent_output=agent_output
+        )
         if not remaining_agents:
-            prompt += "\n没有剩余 Agent，可考虑 finish。"
-        return await self._stream_llm_response(
+            task_prompt += "\n没有剩余 Agent，可考虑 finish。"
+        # review 只看 Agent 输出，不带会话上下文
+        messages = self._build_messages(
+            None, system_prompt=MIKE_REVIEW_PROMPT, task_prompt=task_prompt
+        )
+        return await self._stream_routing_decision(
             context=context,
-            prompt=prompt,
-            provider='deepseek',
-            sender='mike',
+            messages=messages,
             interaction='review_agent_output',
-            final_transform=lambda text: self._format_review_response(text, agent_name),
+            required_fields=('decision', 'next_agent'),
+            final_transform=lambda data, raw: self._format_review_response(data, raw, agent_name),
         )
 
     async def summarize_team(
@@ -81,21 +129,104 @@ class MikeAgent(BaseAgent):
         # TODO: remove context logging once pipeline verified
         self._format_context_for_log(context, stage='summarize_team')
         contributions_text = self._render_contributions(contributions)
-        prompt = MIKE_SUMMARY_PROMPT.format(
-            user_message=self._compose_user_message(context),
-            contributions=contributions_text,
+        messages = self._build_messages(
+            context,
+            system_prompt=MIKE_SUMMARY_PROMPT,
+            task_prompt=MIKE_SUMMARY_TASK_PROMPT.format(
+                user_message=context.user_message,
+                contributions=contributions_text,
+            ),
         )
         return await self._stream_llm_response(
             context=context,
-            prompt=prompt,
-            provider='deepseek',
+            messages=messages,
             sender='mike',
             interaction='summarize_team',
             final_transform=lambda text: self._format_summary_response(text, context.user_message),
         )
 
-    def _format_plan_response(self, raw: str) -> str:
-        data = self._extract_json_block(raw)
+    @traced('agent.stream_routing_decision')
+    async def _stream_routing_decision(
+        self,
+        *,
+        context: AgentContext,
+        messages: List[ChatMessage],
+        interaction: str,
+        required_fields: Tuple[str, ...],
+        final_transform: Callable[[Optional[Dict[str, Any]], str], str],
+    ) -> AgentRunResult:
+        """JSON 模式下流式解析路由结果：只把 reason 推给前端，决策字段齐全后立即断开流。"""
+
+        annotate_span(agent=str(self.name), interaction=interaction)
+        options = self._generation_options(interaction)
+        message_id = self._new_message_id()
+        parser = IncrementalJSONParser()
+        chunks: list[str] = []
+        usage: Dict[str, int] = {}
+        timing: Dict[str, Any] = {}
+        streamed = 0
+        try:
+            async with aclosing(
+                self._llm.stream_generate(
+                    messages=messages,
+                    usage=usage,
+                    agent=str(self.name),
+                    interaction=interaction,
+                    timing=timing,
+                    response_format={'type': 'json_object'},
+                    **options,
+                )
+            ) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    parser.feed(chunk)
+                    reason = parser.partial_string('reason') or ''
+                    if len(reason) > streamed:
+                        await publish_token(
+                            sender='mike',
+                            agent=self.name,
+                            content=reason[streamed:],
+                            message_id=message_id,
+                            final=False,
+                        )
+                        streamed = len(reason)
+                    if parser.has(*required_fields):
+                        break
+        except (LLMProviderError, TurnDeadlineExceeded) as exc:
+            await publish_error(content=str(exc), agent=self.name, message_id=message_id)
+            raise
+        raw = ''.join(chunks)
+        # provider 不支持 JSON 模式时退回到整段文本里找 JSON
+        if parser.has(*required_fields):
+            data = dict(parser.fields)
+        else:
+            data = self._extract_json_block(raw)
+        final_text = final_transform(data, raw)
+        await record_llm_interaction(
+            session_id=context.session_id,
+            agent=str(self.name),
+            prompt=flatten_messages(messages),
+            provider=options.get('provider', 'default'),
+            raw_response=raw,
+            final_response=final_text,
+            interaction=interaction,
+            usage=usage,
+            timing=timing,
+        )
+        await publish_token(
+            sender='mike',
+            agent=self.name,
+            content=final_text,
+            message_id=message_id,
+            final=True,
+            persist_final=True,
+            timestamp=datetime.now(timezone.utc).isoformat(),
+        )
+        return AgentRunResult(
+            agent=self.name, sender='mike', content=final_text, message_id=message_id, data=data
+        )
+
+    def _format_plan_response(self, data: Optional[Dict[str, Any]], raw: str) -> str:
         if not data:
             return raw.strip()
         next_agent = data.get('next_agent')
@@ -107,8 +238,26 @@ class MikeAgent(BaseAgent):
             lines.append(f"- 决策理由：{reason}")
         return "\n".join(lines).strip()
 
-    def _format_review_response(self, raw: str, agent_name: str) -> str:
-        data = self._extract_json_block(raw)
+    def _format_dag_plan_response(self, data: Optional[Dict[str, Any]], raw: str) -> str:
+        if not data:
+            return raw.strip()
+        lines = ["## Mike 任务规划（并行）"]
+        steps = data.get('steps')
+        if isinstance(steps, list):
+            for step in steps:
+                if not isinstance(step, dict) or not step.get('agent'):
+                    continue
+                depends_on = [str(item) for item in step.get('depends_on') or []]
+                suffix = f"（依赖 {'、'.join(depends_on)}）" if depends_on else '（可立即开始）'
+                lines.append(f"- {step['agent']}{suffix}")
+        reason = data.get('reason')
+        if reason:
+            lines.append(f"- 决策理由：{reason}")
+        return "\n".join(lines).strip()
+
+    def _format_review_response(
+        self, data: Optional[Dict[str, Any]], raw: str, agent_name: str
+    ) -> str:
         if not data:
             return raw.strip()
         decision = data.get('decision')
@@ -1,3 +1,11 @@
+from .generation import DEFAULT_GENERATION_POLICY, GenerationPolicy, load_policy_overrides
 from .registry import AgentMetadata, AgentRegistry, default_registry
 
-__all__ = ['AgentMetadata', 'AgentRegistry', 'default_registry']
+__all__ = [
+    'AgentMetadata',
+    'AgentRegistry',
+    'DEFAULT_GENERATION_POLICY',
+    'GenerationPolicy',
+    'default_registry',
+    'load_policy_overrides',
+]
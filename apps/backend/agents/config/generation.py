@@ -0,0 +1,122 @@
+"""Role/interaction → LLM generation policy (provider, model, max_tokens, stop, temperature).
+
+解析顺序（后者覆盖前者的非空字段）：
+1. DEFAULT_GENERATION_POLICY（保持原先所有角色走 deepseek 默认模型的行为）
+2. AgentMetadata.generation 中的 '*' 与具体 interaction
+3. 配置 AGENT_GENERATION_POLICY（内联 JSON 或 JSON 文件路径）中的 '*' / 角色，再按 '*' / interaction
+
+配置示例：
+    {
+      "*": {"*": {"max_tokens": 2048}},
+      "Mike": {"plan_next_agent": {"provider": "openai", "model": "gpt-4o-mini", "max_tokens": 120}}
+    }
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = '*'
+
+
+@dataclass(frozen=True)
+class GenerationPolicy:
+    """Per-call generation settings; None means "inherit / provider default"."""
+
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    max_tokens: Optional[int] = None
+    stop: Optional[Tuple[str, ...]] = None
+    temperature: Optional[float] = None
+
+    def merged(self, override: Optional['GenerationPolicy']) -> 'GenerationPolicy':
+        if override is None:
+            return self
+        changes = {
+            item.name: getattr(override, item.name)
+            for item in fields(self)
+            if getattr(override, item.name) is not None
+        }
+        return replace(self, **changes) if changes else self
+
+    def request_options(self) -> Dict[str, Any]:
+        """Keyword arguments for LLMService.generate/stream_generate."""
+        options: Dict[str, Any] = {}
+        for item in fields(self):
+            value = getattr(self, item.name)
+            if value is None:
+                continue
+            options[item.name] = list(value) if item.name == 'stop' else value
+        return options
+
+    @classmethod
+    def from_dict(cls, payload: Mapping[str, Any]) -> 'GenerationPolicy':
+        unknown = set(payload) - {item.name for item in fields(cls)}
+        if unknown:
+            raise ValueError(f'Unknown generation policy keys: {sorted(unknown)}')
+        stop = payload.get('stop')
+        if isinstance(stop, str):
+            stop = (stop,)
+        max_tokens = payload.get('max_tokens')
+        temperature = payload.get('temperature')
+        return cls(
+            provider=payload.get('provider'),
+            model=payload.get('model'),
+            max_tokens=int(max_tokens) if max_tokens is not None else None,
+            stop=tuple(stop) if stop else None,
+            temperature=float(temperature) if temperature is not None else None,
+        )
+
+
+DEFAULT_GENERATION_POLICY = GenerationPolicy(provider='deepseek')
+
+# role（或 '*'） -> interaction（或 '*'） -> policy
+PolicyTable = Dict[str, Dict[str, GenerationPolicy]]
+
+
+def parse_policy_table(payload: Mapping[str, Any]) -> PolicyTable:
+    table: PolicyTable = {}
+    for role, interactions in payload.items():
+        if not isinstance(interactions, Mapping):
+            raise ValueError(f'Generation policy for "{role}" must be an object')
+        table[str(role)] = {
+            str(interaction): GenerationPolicy.from_dict(policy)
+            for interaction, policy in interactions.items()
+        }
+    return table
+
+
+def load_policy_overrides(raw: Optional[str] = None) -> PolicyTable:
+    """Read AGENT_GENERATION_POLICY (inline JSON or a path to a JSON file)."""
+
+    raw = raw if raw is not None else os.getenv('AGENT_GENERATION_POLICY', '')
+    raw = raw.strip()
+    if not raw:
+        return {}
+    try:
+        if raw.startswith('{'):
+            payload = json.loads(raw)
+        else:
+            payload = json.loads(Path(raw).expanduser().read_text(encoding='utf-8'))
+        return parse_policy_table(payload)
+    except (OSError, ValueError) as exc:
+        # 配置有误时不阻塞启动，退回默认策略
+        logger.warning('Ignoring invalid AGENT_GENERATION_POLICY: %s', exc)
+        return {}
+
+
+__all__ = [
+    'DEFAULT_GENERATION_POLICY',
+    'GenerationPolicy',
+    'PolicyTable',
+    'WILDCARD',
+    'load_policy_overrides',
+    'parse_policy_table',
+]
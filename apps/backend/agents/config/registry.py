@@ -7,6 +7,14 @@ from typing import Dict, Iterable, Optional
 
 from shared.types import AgentRole
 
+from .generation import (
+    DEFAULT_GENERATION_POLICY,
+    WILDCARD,
+    GenerationPolicy,
+    PolicyTable,
+    load_policy_overrides,
+)
+
 
 @dataclass(frozen=True)
 class AgentMetadata:
@@ -15,13 +23,21 @@ class AgentMetadata:
     description: str
     enabled: bool = True
     default_tools: list[str] = field(default_factory=list)
+    # interaction（act/plan_next_agent/... 或 '*'）-> 默认生成策略
+    generation: Dict[str, GenerationPolicy] = field(default_factory=dict)
 
 
 class AgentRegistry:
     """Simple in-memory registry that can later be backed by DB/config service."""
 
-    def __init__(self, agents: Iterable[AgentMetadata]) -> None:
+    def __init__(
+        self,
+        agents: Iterable[AgentMetadata],
+        *,
+        generation_overrides: Optional[PolicyTable] = None,
+    ) -> None:
         self._agents: Dict[AgentRole, AgentMetadata] = {agent.name: agent for agent in agents}
+        self._generation_overrides: PolicyTable = generation_overrides or {}
 
     def get(self, name: AgentRole) -> Optional[AgentMetadata]:
         return self._agents.get(name)
@@ -43,6 +59,23 @@ class AgentRegistry:
             descriptions.append(f"{meta.name}（{meta.title}：{meta.description}）")
         return descriptions
 
+    def generation_policy(self, name: AgentRole, interaction: str) -> GenerationPolicy:
+        """Resolve provider/model/max_tokens/stop/temperature for a role + interaction."""
+        # 由泛到专：全局配置（'*' 角色）< 角色内置默认 < 按角色配置，
+        # 全局的 max_tokens 等覆盖不会抬高 Mike 路由调用的上限
+        policy = DEFAULT_GENERATION_POLICY
+        layers = [self._generation_overrides.get(WILDCARD, {})]
+        meta = self._agents.get(name)
+        if meta:
+            layers.append(meta.generation)
+        layers.append(self._generation_overrides.get(name, {}))
+        for layer in layers:
+            policy = policy.merged(layer.get(WILDCARD)).merged(layer.get(interaction))
+        return policy
+
+    def set_generation_overrides(self, overrides: Optional[PolicyTable]) -> None:
+        self._generation_overrides = overrides or {}
+
 
 default_registry = AgentRegistry(
     [
@@ -51,6 +84,12 @@ default_registry = AgentRegistry(
             title='Team Lead',
             description='负责需求分析、任务规划与质量把关，并向用户同步结果。',
             default_tools=['planning', 'status-broadcast'],
+            # 路由只需一句 reason + 决策字段
+            generation={
+                'plan_next_agent': GenerationPolicy(max_tokens=160),
+                'plan_dependency_graph': GenerationPolicy(max_tokens=320),
+                'review_agent_output': GenerationPolicy(max_tokens=160),
+            },
         ),
         AgentMetadata(
             name='Emma',
@@ -82,5 +121,6 @@ default_registry = AgentRegistry(
             description='专职信息检索、网络搜索与资料整理，汇总可引用的外部参考，不修改代码。',
             default_tools=['search'],
         ),
-    ]
+    ],
+    generation_overrides=load_policy_overrides(),
 )
@@ -11,6 +11,8 @@ from typing import Dict, Optional
 
 from dotenv import dotenv_values
 
+from ...utils.tracing import traced
+
 ALLOWED_PREVIEW_PORTS: list[int] = [4173, 5173, 3000]
 APP_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
 APP_ENV_VALUES: Dict[str, Optional[str]] = dotenv_values(APP_ENV_PATH) if APP_ENV_PATH.exists() else {}
@@ -68,6 +70,9 @@ def _parse_extra_env(raw: str | None) -> Dict[str, str]:
 class SandboxConfig:
     """Runtime configuration for sandbox containers."""
 
+    # docker: 每个会话一个容器；
+    # offline: 只维护工作目录、不调用 docker，命令返回空输出（基准/压测用）
+    runtime: str = (_config_value("SANDBOX_RUNTIME", "docker") or "docker").lower()
     image: str = _config_value("SANDBOX_IMAGE", "mgx-sandbox:latest")
     base_path: Path = Path(_config_value("SANDBOX_BASE_PATH", "/tmp/mgx/sandboxes"))
     cpu_limit: str = _config_value("SANDBOX_CPU", "1")
@@ -149,6 +154,10 @@ class ContainerManager:
         self._metadata: Dict[str, Dict[str, object]] = self._load_metadata()
         self._restore_instances()
 
+    @property
+    def offline(self) -> bool:
+        return self.config.runtime == "offline"
+
     def ensure_session_container(self, *, session_id: str, owner_id: str) -> SandboxInstance:
         """Return existing sandbox or create a new one for the session."""
         if session_id in self._instances:
@@ -244,8 +253,11 @@ class ContainerManager:
             stopped.append(session_id)
         return stopped
 
+    @traced('docker.run')
     def _start_container_with_ports(self, *, container_name: str, workspace_path: Path, port_map: Dict[int, int]) -> str:
         """Run docker container with a predefined port map and return container id."""
+        if self.offline:
+            return f"offline-{container_name}"
         cmd = [
             "docker",
             "run",
@@ -278,7 +290,10 @@ class ContainerManager:
             raise SandboxError(f"Failed to start sandbox: {result.stderr.strip() or result.stdout.strip()}")
         return result.stdout.strip()
 
+    @traced('docker.find')
     def _find_existing_container(self, container_name: str) -> Optional[str]:
+        if self.offline:
+            return None
         result = subprocess.run([
             "docker",
             "ps",
@@ -301,8 +316,11 @@ class ContainerManager:
         inspect = subprocess.run(["docker", "ps", "-q", "--filter", f"name={container_name}"], capture_output=True, text=True)
         return inspect.stdout.strip() or first
 
+    @traced('docker.stop')
     def _stop_container(self, container_name: str) -> None:
         """Stop docker container gracefully."""
+        if self.offline:
+            return
         result = subprocess.run(["docker", "stop", container_name], capture_output=True, text=True)
         if result.returncode != 0 and "No such container" not in result.stderr:
             raise SandboxError(result.stderr.strip() or result.stdout.strip() or "Failed to stop container")
@@ -332,7 +350,10 @@ class ContainerManager:
         for host_port in port_map.values():
             self._port_allocator.reserve(host_port)
 
+    @traced('docker.inspect')
     def _inspect_port_bindings(self, container_name: str) -> Dict[int, int]:
+        if self.offline:
+            return {}
         result = subprocess.run(
             ["docker", "inspect", container_name, "--format", "{{json .NetworkSettings.Ports}}"],
             capture_output=True,
@@ -361,6 +382,7 @@ class ContainerManager:
                 continue
         return port_map
 
+    @traced('docker.network')
     def _ensure_network(self, network_name: str) -> None:
         """确保自定义 Docker 网络存在，不存在则创建。"""
         if not network_name:
@@ -4,9 +4,13 @@ import asyncio
 import os
 import shlex
 import subprocess
+import threading
 from dataclasses import dataclass
 from typing import Dict, Optional
+from uuid import uuid4
 
+from ...utils.deadline import clamp_timeout
+from ...utils.tracing import annotate_span, traced
 from .container import container_manager, SandboxError
 
 
@@ -24,6 +28,9 @@ class SandboxCommandService:
     def __init__(self, *, default_shell: str = "/bin/bash", default_cwd: Optional[str] = None) -> None:
         self._shell = default_shell
         self._default_cwd = self._normalize_default_cwd(default_cwd)
+        # command_id -> 本地 docker exec 进程，取消/超时时用于终止
+        self._processes: Dict[str, subprocess.Popen] = {}
+        self._lock = threading.Lock()
 
     async def run_command(
         self,
@@ -39,18 +46,30 @@ class SandboxCommandService:
             raise SandboxError("Command must not be empty")
         if timeout <= 0:
             raise SandboxError("Timeout must be positive")
+        # 命令超时不超过本轮剩余时间，避免 docker exec 在轮次结束后继续运行
+        timeout = clamp_timeout(timeout)
         instance = container_manager.ensure_session_container(session_id=session_id, owner_id=owner_id)
         container_manager.mark_active(session_id)
-        return await asyncio.to_thread(
-            self._run_sync,
-            instance.container_name,
-            session_id,
-            command.strip(),
-            cwd,
-            env or {},
-            timeout,
-        )
+        command_id = uuid4().hex[:12]
+        try:
+            return await asyncio.to_thread(
+                self._run_sync,
+                instance.container_name,
+                session_id,
+                command.strip(),
+                cwd,
+                env or {},
+                timeout,
+                command_id,
+            )
+        except asyncio.CancelledError:
+            # 取消 await 不会停止线程里的 docker exec，需要主动杀掉容器内的进程组
+            await asyncio.shield(
+                asyncio.to_thread(self._terminate, instance.container_name, command_id)
+            )
+            raise
 
+    @traced('sandbox.exec')
     def _run_sync(
         self,
         container_name: str,
@@ -59,6 +78,7 @@ class SandboxCommandService:
         cwd: Optional[str],
         env: Dict[str, str],
         timeout: int,
+        command_id: Optional[str] = None,
     ) -> SandboxCommandResult:
         workdir = cwd.strip() if cwd else self._default_cwd
         if workdir and workdir.startswith("/"):
@@ -67,28 +87,80 @@ class SandboxCommandService:
             resolved = f"/workspace/{workdir.lstrip('/')}"
         else:
             resolved = "/workspace"
-        prefix = f"cd {shlex.quote(resolved)} && "
+        command_id = command_id or uuid4().hex[:12]
+        annotate_span(command=command[:200], cwd=resolved)
+        if container_manager.offline:
+            # 离线沙箱不执行命令，直接返回成功与空输出
+            return SandboxCommandResult(command=command, exit_code=0, stdout="", stderr="")
+        pid_file = self._pid_file(command_id)
+        # setsid -w 让命令成为独立进程组，记录 pid 以便取消时整组 kill（含 dev server 等子进程）
+        prefix = (
+            f"echo $$ > {pid_file}; trap 'rm -f {pid_file}' EXIT; "
+            f"cd {shlex.quote(resolved)} && "
+        )
         final_command = prefix + command
 
         exec_cmd: list[str] = ["docker", "exec", "-i"]
         for key, value in env.items():
             exec_cmd += ["-e", f"{key}={value}"]
-        exec_cmd += [container_name, self._shell, "-lc", final_command]
+        exec_cmd += [container_name, "setsid", "-w", self._shell, "-lc", final_command]
 
-        result = subprocess.run(
+        process = subprocess.Popen(
             exec_cmd,
-            capture_output=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=timeout,
         )
+        with self._lock:
+            self._processes[command_id] = process
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._terminate(container_name, command_id)
+            process.communicate()
+            raise
+        finally:
+            with self._lock:
+                self._processes.pop(command_id, None)
         container_manager.mark_active(session_id)
+        annotate_span(exit_code=process.returncode)
         return SandboxCommandResult(
             command=command,
-            exit_code=result.returncode,
-            stdout=result.stdout,
-            stderr=result.stderr,
+            exit_code=process.returncode,
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+    @traced('docker.kill')
+    def _terminate(self, container_name: str, command_id: str) -> None:
+        """Kill the in-container process group first, then the local docker exec client."""
+        if container_manager.offline:
+            return
+        pid_file = self._pid_file(command_id)
+        kill_script = (
+            f"pid=$(cat {pid_file} 2>/dev/null) && [ -n \"$pid\" ] && "
+            f"(kill -TERM -- -$pid 2>/dev/null; sleep 1; kill -KILL -- -$pid 2>/dev/null); "
+            f"rm -f {pid_file}; true"
         )
-    
+        try:
+            subprocess.run(
+                ["docker", "exec", container_name, "sh", "-c", kill_script],
+                capture_output=True,
+                text=True,
+                timeout=15,
+            )
+        except (OSError, subprocess.SubprocessError):
+            pass
+        with self._lock:
+            process = self._processes.get(command_id)
+        if process and process.poll() is None:
+            process.kill()
+
+    @staticmethod
+    def _pid_file(command_id: str) -> str:
+        return f"/tmp/mgx-cmd-{command_id}.pid"
+
     def _normalize_default_cwd(self, value: Optional[str]) -> str:
         env_value = value if value is not None else os.getenv("SANDBOX_PROJECT_ROOT", ".")
         if not env_value:
@@ -12,6 +12,7 @@ from ..agents.base import AgentContext
 from ..tools import ToolExecutor
 from .models import SessionContext
 from .state import hydrate_session_context, get_session_state
+from ..utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +35,7 @@ def register_session_store(store: SessionStore) -> None:
     _session_store = store
 
 
+@traced('context.build_session_context')
 def build_session_context(
     *,
     session_id: str,
@@ -1,3 +1,15 @@
+from .messages import ChatMessage, build_prompt_messages, flatten_messages
+from .metrics import LLMMetrics, get_llm_metrics
 from .service import LLMConfig, LLMProviderError, LLMService, get_llm_service
 
-__all__ = ['LLMConfig', 'LLMProviderError', 'LLMService', 'get_llm_service']
+__all__ = [
+    'ChatMessage',
+    'LLMConfig',
+    'LLMMetrics',
+    'LLMProviderError',
+    'LLMService',
+    'build_prompt_messages',
+    'flatten_messages',
+    'get_llm_metrics',
+    'get_llm_service',
+]
@@ -0,0 +1,61 @@
+"""Structured chat messages so prompts keep a stable, cache-friendly prefix.
+
+Provider 侧的前缀缓存（DeepSeek context caching / OpenAI prompt caching）只有在请求开头
+逐字一致时才会命中，因此统一按「静态 system → 会话上下文 → 本次输入」的顺序组织消息。
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Literal, Optional, TypedDict
+
+ChatRole = Literal['system', 'user', 'assistant']
+
+
+class ChatMessage(TypedDict):
+    role: ChatRole
+    content: str
+
+
+def build_prompt_messages(
+    *,
+    system: str,
+    tail: str,
+    context: Optional[str] = None,
+) -> List[ChatMessage]:
+    """Assemble system (static) + stable context + volatile tail, skipping empty parts."""
+
+    messages: List[ChatMessage] = [{'role': 'system', 'content': system}]
+    if context:
+        messages.append({'role': 'user', 'content': context})
+    messages.append({'role': 'user', 'content': tail})
+    return messages
+
+
+def flatten_messages(messages: Iterable[ChatMessage]) -> str:
+    """Single-string view used for logging, prompt hashing and providers without chat APIs."""
+
+    return '\n\n'.join(message['content'] for message in messages if message.get('content'))
+
+
+def merge_consecutive_roles(messages: Iterable[ChatMessage]) -> List[ChatMessage]:
+    """Collapse adjacent messages of the same role; prefix order (and cache hits) is preserved."""
+
+    merged: List[ChatMessage] = []
+    for message in messages:
+        if not message.get('content'):
+            continue
+        if merged and merged[-1]['role'] == message['role']:
+            content = f"{merged[-1]['content']}\n\n{message['content']}"
+            merged[-1] = {'role': message['role'], 'content': content}
+            continue
+        merged.append({'role': message['role'], 'content': message['content']})
+    return merged
+
+
+__all__ = [
+    'ChatMessage',
+    'ChatRole',
+    'build_prompt_messages',
+    'flatten_messages',
+    'merge_consecutive_roles',
+]
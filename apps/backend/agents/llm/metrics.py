@@ -0,0 +1,245 @@
+"""Per-call LLM timing (TTFT, inter-chunk gaps, throughput) and rolling histograms.
+
+LLMService 为每次 generate/stream_generate 创建一个 LLMCallTimer，结束后把结果写回调用方的
+`timing` dict（随 record_llm_interaction 落盘），同时按 provider/agent/interaction 聚合到
+LLMMetrics 的滚动窗口中，供 /api/admin/llm/metrics 查询。
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+# 直方图桶上界；最后一个桶为 +Inf
+_MS_BUCKETS: Tuple[float, ...] = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+_TPS_BUCKETS: Tuple[float, ...] = (5, 10, 20, 40, 80, 160, 320)
+
+METRIC_BUCKETS: Dict[str, Tuple[float, ...]] = {
+    'ttft_ms': _MS_BUCKETS,
+    'total_ms': _MS_BUCKETS,
+    'max_gap_ms': _MS_BUCKETS,
+    'mean_gap_ms': _MS_BUCKETS,
+    'tokens_per_second': _TPS_BUCKETS,
+}
+
+DEFAULT_WINDOW = 512
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+@dataclass
+class LLMCallTimer:
+    """Collects timestamps for a single provider call."""
+
+    provider: str
+    model: str
+    agent: str = 'unknown'
+    interaction: str = 'unknown'
+    streaming: bool = True
+    started: float = field(default_factory=time.perf_counter)
+    first_chunk: Optional[float] = None
+    last_chunk: Optional[float] = None
+    chunks: int = 0
+    output_chars: int = 0
+    max_gap: float = 0.0
+
+    def mark_chunk(self, text: str) -> None:
+        now = time.perf_counter()
+        if self.first_chunk is None:
+            self.first_chunk = now
+        elif self.last_chunk is not None:
+            self.max_gap = max(self.max_gap, now - self.last_chunk)
+        self.last_chunk = now
+        self.chunks += 1
+        self.output_chars += len(text)
+
+    def finish(
+        self, *, usage: Optional[Dict[str, int]] = None, status: str = 'ok'
+    ) -> Dict[str, Any]:
+        """Freeze the timer into a JSON-friendly dict."""
+
+        ended = time.perf_counter()
+        completion_tokens = int((usage or {}).get('completion_tokens') or 0)
+        # 没有 usage（离线 provider / 中途取消）时按 chunk 数近似 token 数
+        tokens = completion_tokens or self.chunks
+        timing: Dict[str, Any] = {
+            'provider': self.provider,
+            'model': self.model,
+            'agent': self.agent,
+            'interaction': self.interaction,
+            'streaming': self.streaming,
+            'status': status,
+            # 计时从 provider 调用前开始，包含连接池等待等 provider 内部排队
+            'ttft_ms': (
+                _ms(self.first_chunk - self.started) if self.first_chunk is not None else None
+            ),
+            'total_ms': _ms(ended - self.started),
+            'chunks': self.chunks,
+            'output_chars': self.output_chars,
+            'tokens': tokens,
+            'tokens_estimated': not completion_tokens,
+            'max_gap_ms': _ms(self.max_gap) if self.chunks > 1 else None,
+            'mean_gap_ms': None,
+            'tokens_per_second': None,
+        }
+        if self.first_chunk is not None and self.last_chunk is not None:
+            decode_window = self.last_chunk - self.first_chunk
+            if self.chunks > 1:
+                timing['mean_gap_ms'] = _ms(decode_window / (self.chunks - 1))
+            # 流式调用用首包到末包的解码窗口；单 chunk 时退化为从发出请求算起
+            if self.chunks > 1 and decode_window > 0:
+                window = decode_window
+            else:
+                window = self.last_chunk - self.started
+            if window > 0 and tokens:
+                timing['tokens_per_second'] = round(tokens / window, 2)
+        return timing
+
+
+class RollingHistogram:
+    """Fixed-size window of recent samples with percentile and bucket views."""
+
+    def __init__(self, buckets: Sequence[float], window: int = DEFAULT_WINDOW) -> None:
+        self._buckets = tuple(buckets)
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self._samples.append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+        count = len(samples)
+        buckets: Dict[str, int] = {}
+        index = 0
+        for bound in self._buckets:
+            start = index
+            while index < count and samples[index] <= bound:
+                index += 1
+            buckets[f'le_{bound:g}'] = index - start
+        buckets['le_inf'] = count - index
+        if not count:
+            return {'count': 0, 'buckets': buckets}
+        return {
+            'count': count,
+            'min': samples[0],
+            'max': samples[-1],
+            'mean': round(sum(samples) / count, 2),
+            'p50': self._percentile(samples, 0.50),
+            'p90': self._percentile(samples, 0.90),
+            'p99': self._percentile(samples, 0.99),
+            'buckets': buckets,
+        }
+
+    @staticmethod
+    def _percentile(samples: List[float], quantile: float) -> float:
+        # nearest-rank，样本已排序
+        rank = max(1, math.ceil(quantile * len(samples)))
+        return samples[rank - 1]
+
+
+GroupKey = Tuple[str, str, str]
+
+
+class LLMMetrics:
+    """Aggregates call timings into rolling histograms keyed by provider/agent/interaction."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW) -> None:
+        self._window = window
+        self._lock = threading.Lock()
+        self._histograms: Dict[GroupKey, Dict[str, RollingHistogram]] = {}
+        self._counters: Dict[GroupKey, Dict[str, int]] = {}
+
+    def observe(self, timing: Dict[str, Any]) -> None:
+        key = (str(timing['provider']), str(timing['agent']), str(timing['interaction']))
+        with self._lock:
+            histograms = self._histograms.get(key)
+            if histograms is None:
+                histograms = {
+                    name: RollingHistogram(buckets, window=self._window)
+                    for name, buckets in METRIC_BUCKETS.items()
+                }
+                self._histograms[key] = histograms
+                self._counters[key] = {
+                    'calls': 0,
+                    'errors': 0,
+                    'cancelled': 0,
+                    'closed': 0,
+                    'deadline': 0,
+                    'tokens': 0,
+                }
+            counters = self._counters[key]
+            counters['calls'] += 1
+            counters['tokens'] += int(timing.get('tokens') or 0)
+            if timing.get('status') == 'error':
+                counters['errors'] += 1
+            elif timing.get('status') == 'cancelled':
+                counters['cancelled'] += 1
+            elif timing.get('status') == 'closed':
+                counters['closed'] += 1
+            elif timing.get('status') == 'deadline':
+                counters['deadline'] += 1
+            for name, histogram in histograms.items():
+                value = timing.get(name)
+                if value is not None:
+                    histogram.observe(float(value))
+
+    def snapshot(
+        self,
+        *,
+        provider: Optional[str] = None,
+        agent: Optional[str] = None,
+        interaction: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return one entry per provider/agent/interaction group, optionally filtered."""
+
+        with self._lock:
+            groups: List[Dict[str, Any]] = []
+            for key in sorted(self._histograms):
+                group_provider, group_agent, group_interaction = key
+                if provider and group_provider.lower() != provider.lower():
+                    continue
+                if agent and group_agent.lower() != agent.lower():
+                    continue
+                if interaction and group_interaction != interaction:
+                    continue
+                groups.append(
+                    {
+                        'provider': group_provider,
+                        'agent': group_agent,
+                        'interaction': group_interaction,
+                        **self._counters[key],
+                        'metrics': {
+                            name: histogram.snapshot()
+                            for name, histogram in self._histograms[key].items()
+                        },
+                    }
+                )
+            return groups
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+_LLM_METRICS: Optional[LLMMetrics] = None
+
+
+def get_llm_metrics() -> LLMMetrics:
+    global _LLM_METRICS
+    if _LLM_METRICS is None:
+        _LLM_METRICS = LLMMetrics()
+    return _LLM_METRICS
+
+
+__all__ = ['LLMCallTimer', 'LLMMetrics', 'RollingHistogram', 'get_llm_metrics']
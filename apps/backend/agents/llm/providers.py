@@ -2,17 +2,56 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import random
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, AsyncIterator
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 from openai import AsyncOpenAI, OpenAIError
 
+from ..utils.llm_logger import llm_log_paths, prompt_hash
+from .messages import ChatMessage, merge_consecutive_roles
+
 logger = logging.getLogger(__name__)
 
 
+def _request_messages(prompt: str, kwargs: Dict[str, Any]) -> List[ChatMessage]:
+    # 优先使用结构化 messages（system + 上下文 + 本轮输入），否则退化为单条 user 消息
+    messages = kwargs.get('messages')
+    if messages:
+        return merge_consecutive_roles(messages)
+    return [{'role': 'user', 'content': prompt}]
+
+
+def _completion_options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    # 仅透传调用方显式指定的可选参数（JSON 模式、输出上限等），保持默认请求不变
+    options: Dict[str, Any] = {}
+    for key in ('response_format', 'max_tokens', 'stop'):
+        if kwargs.get(key) is not None:
+            options[key] = kwargs[key]
+    return options
+
+
+def _report_usage(kwargs: Dict[str, Any], raw: Any) -> None:
+    """Normalize provider usage (incl. prefix-cache hits) into the caller's `usage` dict."""
+
+    sink = kwargs.get('usage')
+    if sink is None or not raw:
+        return
+    if not isinstance(raw, dict):
+        raw = raw.model_dump() if hasattr(raw, 'model_dump') else dict(raw)
+    details = raw.get('prompt_tokens_details') or {}
+    cached = raw.get('prompt_cache_hit_tokens')  # DeepSeek
+    if cached is None:
+        cached = details.get('cached_tokens', 0)  # OpenAI
+    sink['prompt_tokens'] = int(raw.get('prompt_tokens') or 0)
+    sink['completion_tokens'] = int(raw.get('completion_tokens') or 0)
+    sink['cached_tokens'] = int(cached or 0)
+
 
 class LLMProvider:
     """Minimal provider interface that concrete clients must implement."""
@@ -55,10 +94,12 @@ class OpenAIProvider(LLMProvider):
         try:
             temperature = kwargs.get('temperature', 0.3)
             completion = await self._client.chat.completions.create(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
+                model=kwargs.get('model') or self.model,
+                messages=_request_messages(prompt, kwargs),
                 temperature=temperature,
+                **_completion_options(kwargs),
             )
+            _report_usage(kwargs, completion.usage)
             content = completion.choices[0].message.content
             if isinstance(content, list):
                 return ''.join(
@@ -72,82 +113,153 @@ class OpenAIProvider(LLMProvider):
         try:
             temperature = kwargs.get('temperature', 0.3)
             stream = await self._client.chat.completions.create(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
+                model=kwargs.get('model') or self.model,
+                messages=_request_messages(prompt, kwargs),
                 temperature=temperature,
                 stream=True,
+                stream_options={'include_usage': True},
+                **_completion_options(kwargs),
             )
-            async for chunk in stream:
-                choice = chunk.choices[0]
-                delta = choice.delta.content
-                if not delta:
-                    continue
-                if isinstance(delta, list):
-                    text = ''.join(
-                        part.get('text', '') if isinstance(part, dict) else str(part) for part in delta
-                    )
-                else:
-                    text = delta
-                if text:
-                    yield text
+            try:
+                async for chunk in stream:
+                    if chunk.usage:
+                        _report_usage(kwargs, chunk.usage)
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    delta = choice.delta.content
+                    if not delta:
+                        continue
+                    if isinstance(delta, list):
+                        text = ''.join(
+                            part.get('text', '') if isinstance(part, dict) else str(part)
+                            for part in delta
+                        )
+                    else:
+                        text = delta
+                    if text:
+                        yield text
+            finally:
+                # 取消或调用方提前退出时立即断开 HTTP 流，避免继续消耗额度
+                await stream.close()
         except OpenAIError as exc:
             raise RuntimeError(f'OpenAI API error: {exc}') from exc
 
 
 @dataclass
-class DeepseekProvider(LLMProvider):
-    """DeepSeek API provider using its OpenAI-compatible REST interface."""
+class OpenAICompatibleProvider(LLMProvider):
+    """Generic `/chat/completions` client for OpenAI-compatible servers.
 
-    name: str = 'Deepseek'
-    model: str = 'deepseek-chat'
+    适用于 Ollama、vLLM、llama.cpp、LM Studio 等。复用同一个 httpx.AsyncClient
+    （连接池 + keep-alive），与本地推理服务同机部署时每次调用只剩毫秒级网络开销。
+    `model` 为空时通过 `/models` 自动发现并使用第一个可用模型。
+    """
+
+    name: str = 'Local'
+    model: str = ''
     api_key: Optional[str] = None
-    base_url: str = 'https://api.deepseek.com'
+    base_url: str = 'http://127.0.0.1:11434/v1'
+    timeout: float = 30.0
+    max_connections: int = 20
 
     def __post_init__(self) -> None:
-        if not self.api_key:
-            raise ValueError('Deepseek API key is required for DeepseekProvider')
+        self.base_url = self.base_url.rstrip('/')
+        self._client: Optional[httpx.AsyncClient] = None
+        self._discovered_model: Optional[str] = None
 
     def _headers(self) -> Dict[str, str]:
-        return {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json',
-        }
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        return headers
 
-    async def generate(self, *, prompt: str, **kwargs: Any) -> str:
-        payload = {
-            'model': self.model,
-            'messages': [{'role': 'user', 'content': prompt}],
-            'temperature': kwargs.get('temperature', 0.3),
-        }
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f'{self.base_url}/v1/chat/completions', json=payload, headers=self._headers()
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers(),
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
             )
-            try:
-                response.raise_for_status()
-            except httpx.HTTPStatusError as exc:
-                raise RuntimeError(f'Deepseek API error: {exc.response.text}') from exc
-            data = response.json()
-            content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
-            return content or ''
+        return self._client
 
-    async def stream_generate(self, *, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
-        payload = {
-            'model': self.model,
-            'messages': [{'role': 'user', 'content': prompt}],
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def list_models(self) -> List[str]:
+        """Model ids advertised by the server's `/models` endpoint."""
+        try:
+            response = await self._http().get('/models')
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise RuntimeError(f'{self.name} model discovery failed: {exc}') from exc
+        data = response.json()
+        entries = data.get('data') if isinstance(data, dict) else data
+        return [
+            entry['id'] for entry in entries or [] if isinstance(entry, dict) and entry.get('id')
+        ]
+
+    async def _resolve_model(self, kwargs: Dict[str, Any]) -> str:
+        model = kwargs.get('model') or self.model
+        if model:
+            return model
+        if self._discovered_model is None:
+            models = await self.list_models()
+            if not models:
+                raise RuntimeError(f'{self.name} has no models available at {self.base_url}')
+            self._discovered_model = models[0]
+        return self._discovered_model
+
+    async def _payload(
+        self, prompt: str, kwargs: Dict[str, Any], *, stream: bool
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            'model': await self._resolve_model(kwargs),
+            'messages': _request_messages(prompt, kwargs),
             'temperature': kwargs.get('temperature', 0.3),
-            'stream': True,
+            **_completion_options(kwargs),
         }
-        headers = {**self._headers(), 'Accept': 'text/event-stream'}
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream(
-                'POST', f'{self.base_url}/v1/chat/completions', json=payload, headers=headers
+        if stream:
+            payload['stream'] = True
+            payload['stream_options'] = {'include_usage': True}
+        return payload
+
+    async def generate(self, *, prompt: str, **kwargs: Any) -> str:
+        payload = await self._payload(prompt, kwargs, stream=False)
+        try:
+            response = await self._http().post('/chat/completions', json=payload)
+        except httpx.HTTPError as exc:
+            raise RuntimeError(f'{self.name} API error: {exc}') from exc
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            raise RuntimeError(f'{self.name} API error: {exc.response.text}') from exc
+        data = response.json()
+        _report_usage(kwargs, data.get('usage'))
+        content = (data.get('choices') or [{}])[0].get('message', {}).get('content', '')
+        return content or ''
+
+    async def stream_generate(self, *, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        payload = await self._payload(prompt, kwargs, stream=True)
+        try:
+            async with self._http().stream(
+                'POST',
+                '/chat/completions',
+                json=payload,
+                headers={'Accept': 'text/event-stream'},
+                # 流式响应不设读超时，由 turn 取消/截止时间控制
+                timeout=httpx.Timeout(None, connect=10.0),
             ) as response:
                 try:
                     response.raise_for_status()
                 except httpx.HTTPStatusError as exc:
                     body = await exc.response.aread()
-                    raise RuntimeError(f'Deepseek API error: {body.decode()}') from exc
+                    raise RuntimeError(f'{self.name} API error: {body.decode()}') from exc
                 async for line in response.aiter_lines():
                     if not line or not line.startswith('data:'):
                         continue
@@ -157,16 +269,215 @@ class DeepseekProvider(LLMProvider):
                             break
                         continue
                     try:
-                        payload = json.loads(chunk)
+                        event = json.loads(chunk)
                     except json.JSONDecodeError:
                         continue
-                    delta = payload.get('choices', [{}])[0].get('delta', {}).get('content')
+                    _report_usage(kwargs, event.get('usage'))
+                    delta = (event.get('choices') or [{}])[0].get('delta', {}).get('content')
                     if delta:
                         yield delta
+        except httpx.HTTPError as exc:
+            raise RuntimeError(f'{self.name} API error: {exc}') from exc
+
+
+@dataclass
+class DeepseekProvider(OpenAICompatibleProvider):
+    """DeepSeek API provider using its OpenAI-compatible REST interface."""
+
+    name: str = 'Deepseek'
+    model: str = 'deepseek-chat'
+    api_key: Optional[str] = None
+    base_url: str = 'https://api.deepseek.com/v1'
+
+    def __post_init__(self) -> None:
+        if not self.api_key:
+            raise ValueError('Deepseek API key is required for DeepseekProvider')
+        super().__post_init__()
+
+
+@dataclass
+class ReplayProvider(LLMProvider):
+    """Offline provider replaying `record_llm_interaction` captures, matched by prompt hash."""
+
+    name: str = 'Replay'
+    model: str = 'replay'
+    source: Optional[str] = None  # 目录或单个 *_llm.json，默认 data/sessions
+    chunk_chars: int = 24
+    tokens_per_second: float = 0.0  # 0 表示不限速，直接回放
+    fallback: Optional[LLMProvider] = None
+
+    def __post_init__(self) -> None:
+        self._responses: Optional[Dict[str, str]] = None
+
+    async def generate(self, *, prompt: str, **kwargs: Any) -> str:
+        response = self._lookup(prompt)
+        if response is None:
+            if self.fallback:
+                return await self.fallback.generate(prompt=prompt, **kwargs)
+            raise RuntimeError(_replay_miss(prompt))
+        return response
+
+    async def stream_generate(self, *, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        response = self._lookup(prompt)
+        if response is None:
+            if self.fallback:
+                async for chunk in _stream_from(self.fallback, prompt=prompt, **kwargs):
+                    yield chunk
+                return
+            raise RuntimeError(_replay_miss(prompt))
+        delay = _chunk_delay(self.chunk_chars, self.tokens_per_second)
+        for index in range(0, len(response), self.chunk_chars):
+            if delay:
+                await asyncio.sleep(delay)
+            yield response[index:index + self.chunk_chars]
+
+    def reload(self) -> int:
+        """Re-scan recorded sessions; returns how many distinct prompts are replayable."""
+        self._responses = self._load_responses()
+        return len(self._responses)
+
+    def _lookup(self, prompt: str) -> Optional[str]:
+        if self._responses is None:
+            self.reload()
+        assert self._responses is not None
+        return self._responses.get(prompt_hash(prompt))
+
+    def _load_responses(self) -> Dict[str, str]:
+        responses: Dict[str, str] = {}
+        for path in self._source_paths():
+            try:
+                entries = json.loads(path.read_text(encoding='utf-8'))
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.warning('ReplayProvider: skip unreadable log %s: %s', path, exc)
+                continue
+            if not isinstance(entries, list):
+                continue
+            for entry in entries:
+                if not isinstance(entry, dict) or 'raw_response' not in entry:
+                    continue
+                key = entry.get('prompt_hash') or prompt_hash(str(entry.get('prompt') or ''))
+                # 同一 prompt 多次录制时保留最新一次
+                responses[key] = str(entry.get('raw_response') or '')
+        logger.info('ReplayProvider: loaded %d recorded prompts', len(responses))
+        return responses
+
+    def _source_paths(self) -> List[Path]:
+        if not self.source:
+            return llm_log_paths()
+        path = Path(self.source).expanduser()
+        if path.is_dir():
+            return llm_log_paths(path)
+        return [path] if path.exists() else []
+
+
+_SYNTHETIC_WORDS = (
+    'layout', 'component', 'state', 'render', 'endpoint', 'schema', 'cache', 'queue', 'module',
+    'router', 'payload', 'latency', 'handler', 'config', 'service', 'token', 'session', 'widget',
+    'style', 'metric', 'update', 'review', 'stream', 'buffer', 'index', 'record', 'filter', 'query',
+    'option', 'preview',
+)
+
+
+@dataclass
+class SyntheticProvider(LLMProvider):
+    """Deterministic offline provider that streams filler text with realistic token timings.
+
+    输出只依赖 prompt（作为随机种子），并刻意避开 Agent 名称与 finish 关键字，
+    因此编排器会按 AGENT_EXECUTION_ORDER 依次走完所有角色，适合压测/基准。
+    请求 JSON 模式时返回短 reason + 空 next_agent 的路由 JSON，同样交由默认顺序决定下一位。
+    """
+
+    name: str = 'Synthetic'
+    model: str = 'synthetic'
+    ttft_ms: float = 400.0
+    tokens_per_second: float = 60.0
+    response_tokens: int = 240
+    file_blocks: int = 1
+    shell_blocks: int = 0
+    file_block_tokens: int = 120
+    seed: int = 0
+
+    async def generate(self, *, prompt: str, **kwargs: Any) -> str:
+        tokens = self._tokens(prompt, json_mode=_wants_json(kwargs))
+        delay = self.ttft_ms / 1000
+        if self.tokens_per_second > 0:
+            delay += len(tokens) / self.tokens_per_second
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return ''.join(tokens)
+
+    async def stream_generate(self, *, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        tokens = self._tokens(prompt, json_mode=_wants_json(kwargs))
+        if self.ttft_ms > 0:
+            await asyncio.sleep(self.ttft_ms / 1000)
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for index, token in enumerate(tokens):
+            if interval and index:
+                await asyncio.sleep(interval)
+            yield token
+
+    def render(self, prompt: str) -> str:
+        """Full response text for a prompt without any pacing (handy for fixtures)."""
+        return ''.join(self._tokens(prompt))
+
+    def _tokens(self, prompt: str, *, json_mode: bool = False) -> List[str]:
+        digest = prompt_hash(prompt)
+        rng = random.Random(int(digest[:16], 16) ^ self.seed)
+        if json_mode:
+            reason = self._prose(rng, min(self.response_tokens, 24))
+            return ['{"reason": "', *reason, '", "next_agent": "', '", "decision": "pass"}']
+        tokens: List[str] = self._prose(rng, self.response_tokens)
+        for index in range(self.file_blocks):
+            path = f'synthetic/{digest[:8]}_{index}.md'
+            tokens += [f'\n\n```file:{path} overwrite\n', '# Synthetic notes\n']
+            tokens += self._prose(rng, self.file_block_tokens)
+            tokens.append('\n```endfile\n')
+        for index in range(self.shell_blocks):
+            tokens += ['\n```shell\n', f'echo synthetic-{digest[:8]}-{index}', '\n```endshell\n']
+        return tokens
+
+    def _prose(self, rng: random.Random, count: int) -> List[str]:
+        tokens: List[str] = []
+        for index in range(count):
+            word = rng.choice(_SYNTHETIC_WORDS)
+            if index and index % 12 == 0:
+                tokens.append('.\n' if rng.random() < 0.3 else '. ')
+            tokens.append(word if not tokens or tokens[-1].endswith((' ', '\n')) else f' {word}')
+        return tokens
+
+
+def _wants_json(kwargs: Dict[str, Any]) -> bool:
+    response_format = kwargs.get('response_format') or {}
+    return response_format.get('type') == 'json_object'
+
+
+def _replay_miss(prompt: str) -> str:
+    return f'Replay miss: no recorded response for prompt hash {prompt_hash(prompt)[:12]}'
+
+
+def _chunk_delay(chunk_chars: int, tokens_per_second: float, chars_per_token: int = 4) -> float:
+    if tokens_per_second <= 0:
+        return 0.0
+    return max(chunk_chars / chars_per_token, 1) / tokens_per_second
+
+
+async def _stream_from(provider: LLMProvider, *, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+    stream_method = getattr(provider, 'stream_generate', None)
+    if stream_method is None:
+        yield await provider.generate(prompt=prompt, **kwargs)
+        return
+    async for chunk in stream_method(prompt=prompt, **kwargs):
+        yield chunk
 
 
-def get_builtin_provider(provider_name: str, *, model: str, api_key: str | None) -> LLMProvider:
-    """Factory returning a placeholder provider for the given name."""
+def get_builtin_provider(
+    provider_name: str,
+    *,
+    model: str,
+    api_key: str | None,
+    base_url: str | None = None,
+) -> LLMProvider:
+    """Factory returning the provider for the given name (echo placeholder when not configured)."""
 
     normalized = provider_name.lower()
     if normalized == 'openai':
@@ -177,9 +488,26 @@ def get_builtin_provider(provider_name: str, *, model: str, api_key: str | None)
         if api_key:
             return DeepseekProvider(model=model, api_key=api_key)
         return EchoProvider(name='Deepseek', model=model, api_key=api_key)
-    if normalized in {'anthropic', 'gemini', 'ollama'}:
+    if normalized in {'ollama', 'local'}:
+        # Ollama 自带 OpenAI 兼容接口（/v1），其余本地推理服务同理
+        return OpenAICompatibleProvider(
+            name=provider_name.capitalize(),
+            model=model,
+            api_key=api_key,
+            base_url=base_url or OpenAICompatibleProvider.base_url,
+        )
+    if normalized in {'anthropic', 'gemini'}:
         return EchoProvider(name=provider_name.capitalize(), model=model, api_key=api_key)
     raise ValueError(f'Unsupported provider: {provider_name}')
 
 
-__all__ = ['LLMProvider', 'EchoProvider', 'OpenAIProvider', 'DeepseekProvider', 'get_builtin_provider']
+__all__ = [
+    'LLMProvider',
+    'EchoProvider',
+    'OpenAIProvider',
+    'OpenAICompatibleProvider',
+    'DeepseekProvider',
+    'ReplayProvider',
+    'SyntheticProvider',
+    'get_builtin_provider',
+]
@@ -2,13 +2,25 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+from contextlib import aclosing
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional, AsyncIterator
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from .providers import EchoProvider, LLMProvider, get_builtin_provider
+from ..utils.deadline import TurnDeadlineExceeded, iterate_within_deadline, within_deadline
+from ..utils.tracing import Span, tracer
+from .messages import ChatMessage, flatten_messages
+from .metrics import LLMCallTimer, get_llm_metrics
+from .providers import (
+    LLMProvider,
+    OpenAICompatibleProvider,
+    ReplayProvider,
+    SyntheticProvider,
+    get_builtin_provider,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -66,6 +78,27 @@ class LLMConfig:
     deepseek_api_key: Optional[str] = os.getenv('DEEPSEEK_API_KEY')
     enable_logging: bool = True
 
+    # OpenAI 兼容的本地推理服务（Ollama / vLLM / llama.cpp server 等）
+    ollama_base_url: str = os.getenv('AGENT_LLM_OLLAMA_BASE_URL', 'http://127.0.0.1:11434/v1')
+    local_base_url: str = os.getenv('AGENT_LLM_LOCAL_BASE_URL', 'http://127.0.0.1:8000/v1')
+    local_model: str = os.getenv('AGENT_LLM_LOCAL_MODEL', '')  # 留空则通过 /models 自动发现
+    local_api_key: Optional[str] = os.getenv('AGENT_LLM_LOCAL_API_KEY')
+    local_max_connections: int = int(os.getenv('AGENT_LLM_LOCAL_MAX_CONNECTIONS', '20'))
+
+    # 离线 provider：replay 回放 data/sessions/*_llm.json，synthetic 生成确定性的假数据
+    replay_path: Optional[str] = os.getenv('AGENT_LLM_REPLAY_PATH') or None
+    replay_tokens_per_second: float = float(os.getenv('AGENT_LLM_REPLAY_TPS', '0'))
+    replay_fallback: str = os.getenv('AGENT_LLM_REPLAY_FALLBACK', '')
+    synthetic_ttft_ms: float = float(os.getenv('AGENT_LLM_SYNTHETIC_TTFT_MS', '400'))
+    synthetic_tokens_per_second: float = float(os.getenv('AGENT_LLM_SYNTHETIC_TPS', '60'))
+    synthetic_response_tokens: int = int(os.getenv('AGENT_LLM_SYNTHETIC_TOKENS', '240'))
+    synthetic_file_blocks: int = int(os.getenv('AGENT_LLM_SYNTHETIC_FILE_BLOCKS', '1'))
+    synthetic_shell_blocks: int = int(os.getenv('AGENT_LLM_SYNTHETIC_SHELL_BLOCKS', '0'))
+    synthetic_seed: int = int(os.getenv('AGENT_LLM_SYNTHETIC_SEED', '0'))
+
+
+OFFLINE_PROVIDERS = {'replay', 'synthetic'}
+
 
 class LLMService:
     """Routes generation requests to specific providers."""
@@ -78,60 +111,285 @@ class LLMService:
                 'anthropic', model=config.anthropic_model, api_key=config.anthropic_api_key
             ),
             'gemini': get_builtin_provider('gemini', model=config.gemini_model, api_key=config.gemini_api_key),
-            'ollama': get_builtin_provider('ollama', model=config.ollama_model, api_key=config.ollama_api_key),
+            'ollama': get_builtin_provider(
+                'ollama',
+                model=config.ollama_model,
+                api_key=config.ollama_api_key,
+                base_url=config.ollama_base_url,
+            ),
+            'local': OpenAICompatibleProvider(
+                name='Local',
+                model=config.local_model,
+                api_key=config.local_api_key,
+                base_url=config.local_base_url,
+                max_connections=config.local_max_connections,
+            ),
             'deepseek': get_builtin_provider('deepseek', model=config.deepseek_model, api_key=config.deepseek_api_key),
         }
+        synthetic = SyntheticProvider(
+            ttft_ms=config.synthetic_ttft_ms,
+            tokens_per_second=config.synthetic_tokens_per_second,
+            response_tokens=config.synthetic_response_tokens,
+            file_blocks=config.synthetic_file_blocks,
+            shell_blocks=config.synthetic_shell_blocks,
+            seed=config.synthetic_seed,
+        )
+        self._providers['synthetic'] = synthetic
+        self._providers['replay'] = ReplayProvider(
+            source=config.replay_path,
+            tokens_per_second=config.replay_tokens_per_second,
+            fallback=synthetic if config.replay_fallback.lower() == 'synthetic' else None,
+        )
+
+    def register_provider(self, key: str, provider: LLMProvider) -> None:
+        """Register or replace a provider (benchmarks inject tuned offline providers here)."""
+        self._providers[key.lower()] = provider
+
+    def provider_keys(self) -> List[str]:
+        return sorted(self._providers)
+
+    async def list_models(self, name: str) -> List[str]:
+        """Model discovery for providers that expose `/models` (OpenAI-compatible servers)."""
+        provider = self._providers.get(name.lower())
+        if provider is None:
+            raise ValueError(f'LLM provider "{name}" not configured')
+        lister = getattr(provider, 'list_models', None)
+        if lister is None:
+            model = getattr(provider, 'model', '')
+            return [model] if model else []
+        try:
+            return await lister()
+        except Exception as exc:
+            raise LLMProviderError(str(exc)) from exc
+
+    async def aclose(self) -> None:
+        """Release pooled HTTP connections held by providers."""
+        for provider in self._providers.values():
+            closer = getattr(provider, 'aclose', None)
+            if closer is not None:
+                await closer()
 
     def get_provider(self, name: Optional[str] = None) -> LLMProvider:
-        key = (name or self._config.default_provider).lower()
+        default_key = self._config.default_provider.lower()
+        # 离线模式下接管所有调用（各角色目前写死 deepseek），保证整条链路不触网
+        key = default_key if default_key in OFFLINE_PROVIDERS else (name or default_key).lower()
         provider = self._providers.get(key)
         if not provider:
             raise ValueError(f'LLM provider "{key}" not configured')
         return provider
 
-    async def generate(self, *, prompt: str, provider: Optional[str] = None, **kwargs) -> str:
-        """Generate text from the selected provider."""
+    async def generate(
+        self,
+        *,
+        prompt: Optional[str] = None,
+        messages: Optional[List[ChatMessage]] = None,
+        provider: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None,
+        agent: Optional[str] = None,
+        interaction: Optional[str] = None,
+        timing: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> str:
+        """Generate text from the selected provider.
+
+        `messages` 为结构化 prompt（system + 上下文 + 本轮输入）；`usage` / `timing` 若传入会被填充
+        token 用量与耗时（TTFT/吞吐），`agent` / `interaction` 用于指标分组。
+        """
 
+        prompt, kwargs = self._prepare_request(prompt, messages, usage, kwargs)
         selected = self.get_provider(provider)
         provider_name = getattr(selected, 'name', provider or self._config.default_provider)
+        timer = self._start_timer(
+            selected, provider_name, agent, interaction, streaming=False, model=kwargs.get('model')
+        )
+        llm_span = tracer.start_span('llm.request', streaming=False)
         logger.info(
-            'LLMService: invoking provider=%s model=%s prompt_len=%d',
+            'LLMService: invoking provider=%s model=%s prompt_len=%d messages=%d',
             provider_name,
-            getattr(selected, 'model', 'unknown'),
+            kwargs.get('model') or getattr(selected, 'model', 'unknown'),
             len(prompt),
+            len(messages or []),
         )
+        status = 'error'
         try:
-            result = await selected.generate(prompt=prompt, **kwargs)
+            async with within_deadline():
+                result = await selected.generate(prompt=prompt, **kwargs)
+            timer.mark_chunk(result)
+            status = 'ok'
             logger.info('LLMService: provider=%s succeeded response_len=%d', provider_name, len(result))
+            self._log_usage(provider_name, kwargs['usage'])
             return result
+        except asyncio.CancelledError:
+            status = 'cancelled'
+            raise
+        except TurnDeadlineExceeded:
+            status = 'deadline'
+            raise
         except Exception as exc:
             logger.exception('LLMService: provider=%s failed', provider_name, exc_info=exc)
             raise LLMProviderError(str(exc)) from exc
+        finally:
+            self._finish_timer(timer, kwargs['usage'], status, timing, llm_span)
 
     async def stream_generate(
         self,
         *,
-        prompt: str,
+        prompt: Optional[str] = None,
+        messages: Optional[List[ChatMessage]] = None,
         provider: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None,
+        agent: Optional[str] = None,
+        interaction: Optional[str] = None,
+        timing: Optional[Dict[str, Any]] = None,
         **kwargs,
     ) -> AsyncIterator[str]:
         """Stream text chunks from the selected provider."""
 
+        prompt, kwargs = self._prepare_request(prompt, messages, usage, kwargs)
         selected = self.get_provider(provider)
         provider_name = getattr(selected, 'name', provider or self._config.default_provider)
         stream_method = getattr(selected, 'stream_generate', None)
-        if stream_method is None:
-            logger.info('LLMService: provider=%s has no stream API, returning single chunk', provider_name)
-            result = await selected.generate(prompt=prompt, **kwargs)
-            yield result
-            return
-        logger.info('LLMService: streaming via provider=%s model=%s', provider_name, getattr(selected, 'model', 'unknown'))
+        timer = self._start_timer(
+            selected,
+            provider_name,
+            agent,
+            interaction,
+            streaming=stream_method is not None,
+            model=kwargs.get('model'),
+        )
+        # 生成器内不能切换当前 span，这里记录为叶子 span
+        llm_span = tracer.start_span('llm.request', streaming=stream_method is not None)
+        status = 'error'
         try:
-            async for chunk in stream_method(prompt=prompt, **kwargs):
-                yield chunk
-        except Exception as exc:
-            logger.exception('LLMService: streaming provider=%s failed', provider_name, exc_info=exc)
-            raise LLMProviderError(str(exc)) from exc
+            if stream_method is None:
+                logger.info(
+                    'LLMService: provider=%s has no stream API, returning single chunk',
+                    provider_name,
+                )
+                async with within_deadline():
+                    result = await selected.generate(prompt=prompt, **kwargs)
+                timer.mark_chunk(result)
+                status = 'ok'
+                yield result
+                return
+            logger.info(
+                'LLMService: streaming via provider=%s model=%s',
+                provider_name,
+                kwargs.get('model') or getattr(selected, 'model', 'unknown'),
+            )
+            try:
+                # 显式关闭 provider 流，调用方提前停止时底层 HTTP 连接随之释放
+                async with aclosing(stream_method(prompt=prompt, **kwargs)) as provider_stream:
+                    # 每个 chunk 的等待都受本轮剩余时间约束（provider 流式请求本身不设读超时）
+                    async for chunk in iterate_within_deadline(provider_stream):
+                        timer.mark_chunk(chunk)
+                        yield chunk
+            except TurnDeadlineExceeded:
+                raise
+            except Exception as exc:
+                logger.exception(
+                    'LLMService: streaming provider=%s failed', provider_name, exc_info=exc
+                )
+                raise LLMProviderError(str(exc)) from exc
+            status = 'ok'
+            self._log_usage(provider_name, kwargs['usage'])
+        except GeneratorExit:
+            # 调用方主动停止读取（如路由 JSON 字段已齐全提前结束）
+            status = 'closed'
+            raise
+        except asyncio.CancelledError:
+            status = 'cancelled'
+            raise
+        except TurnDeadlineExceeded:
+            status = 'deadline'
+            raise
+        finally:
+            self._finish_timer(timer, kwargs['usage'], status, timing, llm_span)
+
+    def _start_timer(
+        self,
+        selected: LLMProvider,
+        provider_name: str,
+        agent: Optional[str],
+        interaction: Optional[str],
+        *,
+        streaming: bool,
+        model: Optional[str] = None,
+    ) -> LLMCallTimer:
+        return LLMCallTimer(
+            provider=str(provider_name),
+            model=str(model or getattr(selected, 'model', 'unknown')),
+            agent=agent or 'unknown',
+            interaction=interaction or 'unknown',
+            streaming=streaming,
+        )
+
+    def _finish_timer(
+        self,
+        timer: LLMCallTimer,
+        usage: Dict[str, int],
+        status: str,
+        sink: Optional[Dict[str, Any]],
+        llm_span: Optional[Span] = None,
+    ) -> None:
+        result = timer.finish(usage=usage, status=status)
+        get_llm_metrics().observe(result)
+        if sink is not None:
+            sink.update(result)
+        if llm_span is not None:
+            llm_span.set(
+                **{
+                    key: result.get(key)
+                    for key in ('provider', 'model', 'agent', 'interaction', 'ttft_ms', 'tokens')
+                }
+            )
+            tracer.end_span(llm_span, status)
+        logger.info(
+            'LLMService: provider=%s agent=%s interaction=%s status=%s '
+            'ttft_ms=%s total_ms=%s tokens/s=%s',
+            result['provider'],
+            result['agent'],
+            result['interaction'],
+            status,
+            result['ttft_ms'],
+            result['total_ms'],
+            result['tokens_per_second'],
+        )
+
+    def _prepare_request(
+        self,
+        prompt: Optional[str],
+        messages: Optional[List[ChatMessage]],
+        usage: Optional[Dict[str, int]],
+        kwargs: Dict[str, Any],
+    ) -> Tuple[str, Dict[str, Any]]:
+        if not prompt and not messages:
+            raise ValueError('LLMService requires either prompt or messages')
+        request = dict(kwargs)
+        if messages:
+            request['messages'] = messages
+            prompt = flatten_messages(messages)
+        request['usage'] = usage if usage is not None else {}
+        if self._config.default_provider.lower() in OFFLINE_PROVIDERS:
+            # 离线 provider 接管时忽略角色策略里的模型覆盖
+            request.pop('model', None)
+        return prompt or '', request
+
+    def _log_usage(self, provider_name: str, usage: Dict[str, int]) -> None:
+        if not usage:
+            return
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        cached_tokens = usage.get('cached_tokens', 0)
+        hit_rate = cached_tokens / prompt_tokens if prompt_tokens else 0.0
+        logger.info(
+            'LLMService: provider=%s usage prompt_tokens=%d cached_tokens=%d (%.0f%%) '
+            'completion_tokens=%d',
+            provider_name,
+            prompt_tokens,
+            cached_tokens,
+            hit_rate * 100,
+            usage.get('completion_tokens', 0),
+        )
 
 
 _LLM_SERVICE: Optional[LLMService] = None
@@ -144,4 +402,4 @@ def get_llm_service() -> LLMService:
     return _LLM_SERVICE
 
 
-__all__ = ['LLMConfig', 'LLMService', 'get_llm_service']
+__all__ = ['LLMConfig', 'LLMService', 'OFFLINE_PROVIDERS', 'get_llm_service']
@@ -1,10 +1,27 @@
-from .executor import AgentExecutor, WorkflowContext
+import os
+
+from .classifier import FAST_PATH_ENABLED, complexity_classifier
+from .executor import AgentExecutor, AgentWorkflow, WorkflowContext
 from ..config import default_registry
 from ..workflows.orchestrator import SequentialWorkflow
+from ..workflows.parallel import ParallelWorkflow
+from ..workflows.single import SingleAgentWorkflow
 from ..tools.registry import get_tool_executor
 
 _ORCHESTRATOR: AgentExecutor | None = None
 
+# sequential：Mike 逐个调度并复盘；dag：Mike 一次规划依赖，独立 Agent 并行执行
+WORKFLOW_MODE = os.getenv('AGENT_WORKFLOW_MODE', 'sequential').lower()
+
+
+def build_workflow(mode: str | None = None) -> AgentWorkflow:
+    mode = (mode or WORKFLOW_MODE).lower()
+    if mode == 'dag':
+        return ParallelWorkflow()
+    if mode != 'sequential':
+        raise ValueError(f'Unknown AGENT_WORKFLOW_MODE: {mode}')
+    return SequentialWorkflow()
+
 
 def get_agent_orchestrator() -> AgentExecutor:
     """Singleton accessor so the FastAPI gateway can share orchestrator state."""
@@ -12,8 +29,16 @@ def get_agent_orchestrator() -> AgentExecutor:
     if _ORCHESTRATOR is None:
         _ORCHESTRATOR = AgentExecutor(
             registry=default_registry,
-            workflow=SequentialWorkflow(),
+            workflow=build_workflow(),
             tool_executor=get_tool_executor(),
+            fast_workflow=SingleAgentWorkflow() if FAST_PATH_ENABLED else None,
+            classifier=complexity_classifier if FAST_PATH_ENABLED else None,
         )
     return _ORCHESTRATOR
-__all__ = ['AgentExecutor', 'WorkflowContext', 'get_agent_orchestrator']
+__all__ = [
+    'AgentExecutor',
+    'WorkflowContext',
+    'build_workflow',
+    'complexity_classifier',
+    'get_agent_orchestrator',
+]
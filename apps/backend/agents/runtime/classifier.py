@@ -0,0 +1,111 @@
+"""Heuristic request complexity classifier used to pick the single-agent fast path.
+
+只有“短、单一动作、明确落在代码层面”的请求才判为 simple；命中多角色关键词、篇幅较长或
+无法判断时一律走完整团队流程，宁可少走快路径也不误判复杂需求。
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Literal, Optional
+
+from shared.types import AgentRole
+
+TurnComplexity = Literal['simple', 'complex']
+
+# 需要产品/架构/调研/分析等多角色参与的信号
+COMPLEX_PATTERN = re.compile(
+    r'from scratch'
+    r'|\b(build|create|develop|implement|design)\b.{0,40}'
+    r'\b(app|application|website|site|system|platform|service|game)\b'
+    r'|\barchitecture\b|\bresearch\b|\bmarket\b|\bcompetitor|\bPRD\b|\brequirements?\b'
+    r'|\bdeploy|\banaly[sz]'
+    r'|从零|搭建|开发一个|做一个|设计|架构|调研|竞品|市场|需求文档|产品需求|部署|数据分析|方案',
+    re.IGNORECASE,
+)
+
+# 多个步骤或多个交付物（“修复登录并补测试”“改用 Postgres 然后更新文档”）
+MULTI_STEP_PATTERN = re.compile(
+    r'\band\b|\bthen\b|\balso\b|\bplus\b|\bas well as\b|&|;|；'
+    r'|并且|并|然后|再|同时|以及|还要|顺便|和|、',
+    re.IGNORECASE,
+)
+
+# 只有明确的单点编辑或对现有代码的提问才算 simple
+SIMPLE_PATTERN = re.compile(
+    r'\brename\b|\btypo\b|\bspelling\b|\bwhat does\b|\bexplain\b|\bcomment\b|\bformat\b'
+    r'|重命名|改名|拼写|错别字|是做什么|有什么用|做了什么|解释|注释|格式化',
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class ComplexityVerdict:
+    complexity: TurnComplexity
+    reason: str
+    agent: Optional[AgentRole] = None
+
+    @property
+    def simple(self) -> bool:
+        return self.complexity == 'simple'
+
+
+class ComplexityClassifier:
+    """Classifies a user turn as simple (single agent) or complex (full team)."""
+
+    def __init__(
+        self, *, max_chars: int = 160, max_lines: int = 3, agent: AgentRole = 'Alex'
+    ) -> None:
+        self._max_chars = max_chars
+        self._max_lines = max_lines
+        self._agent = agent
+        self.reset()
+
+    def classify(self, user_message: str) -> ComplexityVerdict:
+        verdict = self._classify((user_message or '').strip())
+        self.counts[verdict.complexity] += 1
+        return verdict
+
+    def _classify(self, text: str) -> ComplexityVerdict:
+        if not text:
+            return ComplexityVerdict('complex', 'empty')
+        if len(text) > self._max_chars:
+            return ComplexityVerdict('complex', 'long_request')
+        if len([line for line in text.splitlines() if line.strip()]) > self._max_lines:
+            return ComplexityVerdict('complex', 'multi_line')
+        if COMPLEX_PATTERN.search(text):
+            return ComplexityVerdict('complex', 'multi_role_keyword')
+        if MULTI_STEP_PATTERN.search(text):
+            return ComplexityVerdict('complex', 'multi_step')
+        if SIMPLE_PATTERN.search(text):
+            return ComplexityVerdict('simple', 'single_action', agent=self._agent)
+        return ComplexityVerdict('complex', 'unknown')
+
+    def reset(self) -> None:
+        self.counts: Dict[str, int] = {'simple': 0, 'complex': 0}
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = sum(self.counts.values())
+        return {
+            'counts': dict(self.counts),
+            'simple_ratio': round(self.counts['simple'] / total, 4) if total else None,
+        }
+
+
+# 默认关闭（所有请求走完整团队流程）；在真实流量上核对分类结果后再设置为 1 启用
+FAST_PATH_ENABLED = os.getenv('AGENT_FAST_PATH', '0') == '1'
+
+complexity_classifier = ComplexityClassifier(
+    max_chars=int(os.getenv('AGENT_FAST_PATH_MAX_CHARS', '160')),
+)
+
+__all__ = [
+    'ComplexityClassifier',
+    'ComplexityVerdict',
+    'FAST_PATH_ENABLED',
+    'MULTI_STEP_PATTERN',
+    'TurnComplexity',
+    'complexity_classifier',
+]
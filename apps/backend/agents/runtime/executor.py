@@ -6,6 +6,7 @@ agent microservice communicating via RPC/queue.
 
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Callable, Awaitable, Dict, Any, TYPE_CHECKING
@@ -17,6 +18,9 @@ from ..tools import ToolExecutor
 from ..context import build_session_context
 from ..context.models import SessionContext
 from ..stream import StreamContext, push_stream_context, pop_stream_context
+from ..utils.deadline import reset_turn_deadline, start_turn_deadline
+from ..utils.tracing import tracer
+from .classifier import ComplexityClassifier
 
 if TYPE_CHECKING:  # pragma: no cover
     from app.models import Message
@@ -29,6 +33,7 @@ class WorkflowContext:
     owner_id: str
     tools: Optional[ToolExecutor] = None
     session_context: Optional[SessionContext] = None
+    turn_id: Optional[str] = None  # 用于保存/恢复工作流 checkpoint
 
 
 StreamPublisher = Callable[[Dict[str, Any]], Awaitable[None]]
@@ -50,10 +55,15 @@ class AgentExecutor:
         registry: AgentRegistry,
         workflow: AgentWorkflow,
         tool_executor: ToolExecutor,
+        fast_workflow: Optional[AgentWorkflow] = None,
+        classifier: Optional[ComplexityClassifier] = None,
     ) -> None:
         self._registry = registry
         self._workflow = workflow
         self._tool_executor = tool_executor
+        # 简单请求走单 Agent 快路径，两者缺一则始终使用完整工作流
+        self._fast_workflow = fast_workflow
+        self._classifier = classifier
 
     async def handle_user_turn(
         self,
@@ -63,9 +73,40 @@ class AgentExecutor:
         user_id: str,
         user_message: str,
         stream_publisher: Optional[StreamPublisher] = None,
-        persist_fn: Callable[[SenderRole, Optional[AgentRole], str, Optional[str], Optional[datetime]], 'Message'],
+        persist_fn: Callable[
+            [SenderRole, Optional[AgentRole], str, Optional[str], Optional[datetime]], 'Message'
+        ],
+        turn_id: Optional[str] = None,
         ) -> list['Message']:
         """Run the workflow for a user turn and return persisted messages."""
+        workflow = self._select_workflow(user_message)
+        # 每轮一条 trace，trace_id 复用 turn_id，便于按轮次查看 waterfall
+        with tracer.trace(turn_id, 'turn', session_id=session_id, workflow=type(workflow).__name__):
+            return await self._run_workflow(
+                workflow,
+                session_id=session_id,
+                owner_id=owner_id,
+                user_id=user_id,
+                user_message=user_message,
+                stream_publisher=stream_publisher,
+                persist_fn=persist_fn,
+                turn_id=turn_id,
+            )
+
+    async def _run_workflow(
+        self,
+        workflow: AgentWorkflow,
+        *,
+        session_id: str,
+        owner_id: str,
+        user_id: str,
+        user_message: str,
+        stream_publisher: Optional[StreamPublisher],
+        persist_fn: Callable[
+            [SenderRole, Optional[AgentRole], str, Optional[str], Optional[datetime]], 'Message'
+        ],
+        turn_id: Optional[str],
+    ) -> list['Message']:
         session_context = build_session_context(
             session_id=session_id,
             owner_id=owner_id,
@@ -79,6 +120,7 @@ class AgentExecutor:
             user_message=user_message,
             tools=self._tool_executor,
             session_context=session_context,
+            turn_id=turn_id,
         )
         stream_context = StreamContext(
             session_id=session_id,
@@ -87,8 +129,20 @@ class AgentExecutor:
             persist_fn=persist_fn,
         )
         token = push_stream_context(stream_context)
+        # 本轮截止时间随上下文传递到 LLM 调用、工具执行与沙箱命令
+        deadline_token = start_turn_deadline()
         try:
-            await self._workflow.generate(workflow_context, self._registry)
+            await workflow.generate(workflow_context, self._registry)
         finally:
-            pop_stream_context(token)
+            reset_turn_deadline(deadline_token)
+            try:
+                await asyncio.shield(stream_context.aclose())
+            finally:
+                pop_stream_context(token)
         return stream_context.persisted_messages()
+
+    def _select_workflow(self, user_message: str) -> AgentWorkflow:
+        if self._fast_workflow is None or self._classifier is None:
+            return self._workflow
+        verdict = self._classifier.classify(user_message)
+        return self._fast_workflow if verdict.simple else self._workflow
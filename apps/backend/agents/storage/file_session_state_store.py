@@ -3,18 +3,25 @@
 from __future__ import annotations
 
 import json
+import os
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from ..context.models import ActionLogEntry, SessionContext, TodoEntry
+from ..utils.tracing import traced
 from .session_state_store import SessionState, SessionStateStore
 
+# 会话状态与工作流 checkpoint 的存放目录，默认 apps/data/sessions
+STATE_DIR = Path(
+    os.getenv('AGENT_STATE_DIR', str(Path(__file__).resolve().parents[3] / 'data' / 'sessions'))
+)
+
 
 class FileSessionStateStore(SessionStateStore):
     """Default store writing session state to the data/sessions directory."""
 
     def __init__(self, base_dir: Path | None = None) -> None:
-        self._base_dir = base_dir or Path(__file__).resolve().parents[3] / 'data' / 'sessions'
+        self._base_dir = base_dir or STATE_DIR
         self._base_dir.mkdir(parents=True, exist_ok=True)
         self._cache: Dict[str, SessionState] = {}
 
@@ -38,6 +45,7 @@ class FileSessionStateStore(SessionStateStore):
         self._cache[session_id] = state
         return state
 
+    @traced('state_store.persist_state')
     def persist_state(self, session_id: str, state: SessionState) -> None:
         payload = {
             'action_log': [self._serialize_action(entry) for entry in state.action_log],
@@ -87,6 +95,87 @@ class FileSessionStateStore(SessionStateStore):
         if path.exists():
             path.unlink()
 
+    @traced('state_store.persist_checkpoint')
+    def persist_checkpoint(self, turn_id: str, payload: Dict[str, Any]) -> None:
+        # 先写临时文件再替换，进程中途退出也不会留下半截 checkpoint
+        directory = self._checkpoint_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{turn_id}.json'
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp_path.replace(path)
+        # 正在执行的进程持有 claim，其它 worker 启动时不会把仍在运行的轮次当作中断轮次恢复
+        self._create_claim(self._claim_path(turn_id))
+
+    def claim_checkpoint(self, turn_id: str) -> bool:
+        """Atomically take ownership of a checkpoint; False when a live process already holds it."""
+        path = self._claim_path(turn_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self._create_claim(path):
+            return True
+        holder = self._claim_holder(path)
+        if holder == os.getpid():
+            return True
+        if holder is not None and _process_alive(holder):
+            return False
+        # 持有者已退出：先原子地把旧 claim 改名，只有一个 worker 能成功，再重新创建
+        stale = path.with_name(f'{path.name}.stale-{os.getpid()}')
+        try:
+            os.rename(path, stale)
+        except FileNotFoundError:
+            return False
+        stale.unlink(missing_ok=True)
+        return self._create_claim(path)
+
+    def load_checkpoint(self, turn_id: str) -> Optional[Dict[str, Any]]:
+        return self._read_checkpoint(self._checkpoint_dir() / f'{turn_id}.json')
+
+    def list_checkpoints(self) -> List[Dict[str, Any]]:
+        directory = self._checkpoint_dir()
+        if not directory.exists():
+            return []
+        payloads = [self._read_checkpoint(path) for path in sorted(directory.glob('*.json'))]
+        return [payload for payload in payloads if payload]
+
+    def clear_checkpoint(self, turn_id: str) -> None:
+        path = self._checkpoint_dir() / f'{turn_id}.json'
+        if path.exists():
+            path.unlink()
+        self._claim_path(turn_id).unlink(missing_ok=True)
+
+    @staticmethod
+    def _read_checkpoint(path: Path) -> Optional[Dict[str, Any]]:
+        if not path.exists():
+            return None
+        try:
+            payload = json.loads(path.read_text(encoding='utf-8'))
+        except json.JSONDecodeError:
+            return None
+        return payload if isinstance(payload, dict) else None
+
+    def _checkpoint_dir(self) -> Path:
+        return self._base_dir / 'checkpoints'
+
+    def _claim_path(self, turn_id: str) -> Path:
+        return self._checkpoint_dir() / f'{turn_id}.claim'
+
+    @staticmethod
+    def _create_claim(path: Path) -> bool:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='ascii') as handle:
+            handle.write(str(os.getpid()))
+        return True
+
+    @staticmethod
+    def _claim_holder(path: Path) -> Optional[int]:
+        try:
+            return int(path.read_text(encoding='ascii').strip())
+        except (OSError, ValueError):
+            return None
+
     def _state_path(self, session_id: str) -> Path:
         return self._base_dir / f'{session_id}_context.json'
 
@@ -142,3 +231,14 @@ class FileSessionStateStore(SessionStateStore):
 
 
 __all__ = ['FileSessionStateStore']
+
+
+def _process_alive(pid: int) -> bool:
+    # claim 只在同一主机的多个 worker 之间有效（与 unix stream broker 的部署方式一致）
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, Protocol
+from typing import Any, Dict, List, Optional, Protocol
 
 from ..context.models import ActionLogEntry, SessionContext, TodoEntry
 
@@ -31,6 +31,16 @@ class SessionStateStore(Protocol):
 
     def clear_session_state(self, session_id: str) -> None: ...
 
+    def persist_checkpoint(self, turn_id: str, payload: Dict[str, Any]) -> None: ...
+
+    def load_checkpoint(self, turn_id: str) -> Optional[Dict[str, Any]]: ...
+
+    def list_checkpoints(self) -> List[Dict[str, Any]]: ...
+
+    def claim_checkpoint(self, turn_id: str) -> bool: ...
+
+    def clear_checkpoint(self, turn_id: str) -> None: ...
+
 
 _STATE_STORE: SessionStateStore | None = None
 
@@ -1,4 +1,5 @@
 from .events import (
+    error_event,
     file_change_event,
     message_event,
     publish_error,
@@ -9,7 +10,9 @@ from .events import (
     status_event,
     token_event,
     tool_call_event,
+    turn_event,
 )
+from .coalescer import CoalescerConfig, TokenCoalescer
 from .context import (
     StreamContext,
     current_stream_context,
@@ -18,6 +21,7 @@ from .context import (
 )
 
 __all__ = [
+    'error_event',
     'file_change_event',
     'message_event',
     'publish_error',
@@ -28,6 +32,9 @@ __all__ = [
     'status_event',
     'token_event',
     'tool_call_event',
+    'turn_event',
+    'CoalescerConfig',
+    'TokenCoalescer',
     'StreamContext',
     'current_stream_context',
     'push_stream_context',
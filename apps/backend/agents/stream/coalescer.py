@@ -0,0 +1,121 @@
+"""Coalesce small non-final token events before they reach the publisher.
+
+Provider chunk 往往只有几个字符，逐条推送会产生大量 WebSocket 帧与缓冲区写入。这里按 message_id 合并
+非 final 的 token，满 `max_bytes` 或距首个待发片段 `interval_ms` 后统一发送；其它事件（final token、
+status、tool_call 等）发送前会先冲刷所有待发内容，保证事件顺序不变。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+EventPayload = Dict[str, Any]
+StreamPublisher = Callable[[EventPayload], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class CoalescerConfig:
+    """Flush thresholds; both <= 0 disables coalescing."""
+
+    interval_ms: float = float(os.getenv('STREAM_TOKEN_FLUSH_MS', '50'))
+    max_bytes: int = int(os.getenv('STREAM_TOKEN_FLUSH_BYTES', '1024'))
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_ms > 0 or self.max_bytes > 0
+
+
+@dataclass
+class _PendingTokens:
+    event: EventPayload
+    parts: List[str] = field(default_factory=list)
+    size: int = 0
+
+
+class TokenCoalescer:
+    """Per-turn buffer of pending token text keyed by message_id."""
+
+    def __init__(
+        self, publisher: StreamPublisher, config: Optional[CoalescerConfig] = None
+    ) -> None:
+        self._publisher = publisher
+        self._config = config or CoalescerConfig()
+        self._pending: 'OrderedDict[str, _PendingTokens]' = OrderedDict()
+        self._lock = asyncio.Lock()  # 定时冲刷与生产者共用，保证发送顺序
+        self._timer: Optional[asyncio.Task] = None
+        self.events_in = 0
+        self.events_out = 0
+
+    async def push(self, event: EventPayload) -> None:
+        """Queue a non-final token event; flushes when the byte threshold is reached."""
+
+        self.events_in += 1
+        if not self._config.enabled:
+            await self._send(event)
+            return
+        content = event.get('content') or ''
+        message_id = event['message_id']
+        pending = self._pending.get(message_id)
+        if pending is None:
+            pending = _PendingTokens(event=dict(event))
+            self._pending[message_id] = pending
+        pending.parts.append(content)
+        pending.size += len(content.encode('utf-8'))
+        if 0 < self._config.max_bytes <= pending.size:
+            async with self._lock:
+                await self._flush_locked(message_id)
+        elif self._config.interval_ms > 0:
+            self._schedule()
+
+    async def publish(self, event: EventPayload) -> None:
+        """Send any other event after flushing everything pending."""
+
+        self.events_in += 1
+        async with self._lock:
+            await self._flush_locked()
+            await self._send(event)
+
+    async def flush(self, message_id: Optional[str] = None) -> None:
+        async with self._lock:
+            await self._flush_locked(message_id)
+
+    async def aclose(self) -> None:
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+        await self.flush()
+
+    @property
+    def pending_messages(self) -> int:
+        return len(self._pending)
+
+    async def _flush_locked(self, message_id: Optional[str] = None) -> None:
+        if message_id is not None:
+            pending = self._pending.pop(message_id, None)
+            targets = [pending] if pending else []
+        else:
+            targets = list(self._pending.values())
+            self._pending.clear()
+        for pending in targets:
+            event = pending.event
+            event['content'] = ''.join(pending.parts)
+            await self._send(event)
+
+    async def _send(self, event: EventPayload) -> None:
+        self.events_out += 1
+        await self._publisher(event)
+
+    def _schedule(self) -> None:
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._config.interval_ms / 1000)
+        await self.flush()
+
+
+__all__ = ['CoalescerConfig', 'TokenCoalescer']
@@ -6,6 +6,8 @@ from typing import Any, Awaitable, Callable, Dict, List, Optional, TYPE_CHECKING
 
 from shared.types import AgentRole, SenderRole
 
+from .coalescer import TokenCoalescer
+
 if TYPE_CHECKING:  # pragma: no cover
     from app.models import Message
 
@@ -29,6 +31,8 @@ class StreamContext:
         self.session_id = session_id
         self.owner_id = owner_id
         self.publisher = publisher
+        # 非 final token 先经 coalescer 合并再交给 publisher
+        self.coalescer = TokenCoalescer(publisher) if publisher else None
         self._persist_fn = persist_fn  # 统一的落库回调
         self._persisted: List['Message'] = []  # 已经写入的消息缓存，供调用方返回
 
@@ -52,6 +56,11 @@ class StreamContext:
     def persisted_messages(self) -> List['Message']:
         return list(self._persisted)
 
+    async def aclose(self) -> None:
+        # 轮次结束（含取消）时发出尚未冲刷的 token
+        if self.coalescer:
+            await self.coalescer.aclose()
+
 
 _stream_context: ContextVar[Optional[StreamContext]] = ContextVar('stream_context', default=None)
 
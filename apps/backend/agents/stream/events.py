@@ -38,6 +38,12 @@ def _ensure_timestamp(timestamp: Optional[str]) -> str:
 
 async def publish_event(event: EventPayload, publisher: Optional[StreamPublisher] = None) -> None:
     # 最底层的发送函数：publisher 可能为空（例如未开启流式）
+    if not publisher:
+        ctx = current_stream_context()
+        if ctx and ctx.coalescer:
+            # 经 coalescer 发送，先冲刷待发 token 以保持事件顺序
+            await ctx.coalescer.publish(event)
+            return
     resolved = _resolve_publisher(publisher)
     if not resolved:
         return
@@ -66,17 +72,18 @@ async def publish_token(
             message_id=message_id,
             timestamp=ts,
         )
-    await publish_event(
-        token_event(
-            sender=sender,
-            agent=agent,
-            content=content,
-            message_id=message_id,
-            final=final,
-            timestamp=ts,
-        ),
-        publisher,
+    event = token_event(
+        sender=sender,
+        agent=agent,
+        content=content,
+        message_id=message_id,
+        final=final,
+        timestamp=ts,
     )
+    if not final and not publisher and ctx and ctx.coalescer:
+        await ctx.coalescer.push(event)
+        return
+    await publish_event(event, publisher)
 
 
 async def publish_status(
@@ -297,3 +304,25 @@ def tool_call_event(
 def file_change_event(paths: Iterable[str]) -> EventPayload:
     # 文件变更事件不落库，只用于触发前端刷新文件树
     return {'type': 'file_change', 'paths': list(paths)}
+
+
+def turn_event(
+    *,
+    turn_id: str,
+    status: str,
+    queue_position: Optional[int] = None,
+    admission_position: Optional[int] = None,
+    cancel_reason: Optional[str] = None,
+    error: Optional[str] = None,
+) -> EventPayload:
+    # turn 事件不落库，只用于前端跟踪后台执行中的轮次状态
+    event: EventPayload = {'type': 'turn', 'turn_id': turn_id, 'status': status}
+    if queue_position is not None:
+        event['queue_position'] = queue_position
+    if admission_position is not None:
+        event['admission_position'] = admission_position
+    if cancel_reason:
+        event['cancel_reason'] = cancel_reason
+    if error:
+        event['error'] = error
+    return event
@@ -6,6 +6,8 @@ import logging
 from abc import ABC, abstractmethod
 from typing import Any, Awaitable, Callable, Dict, Optional
 
+from ..utils.deadline import TurnDeadlineExceeded, within_deadline
+from ..utils.tracing import span
 
 ToolParams = Dict[str, Any]
 ToolPayload = Dict[str, Any]
@@ -64,8 +66,11 @@ class ToolExecutor:
                     await self._event_hook(tool_name, params)
                 except Exception as exc:  # pragma: no cover - defensive logging
                     logger.warning('Tool event hook failed for %s: %s', tool_name, exc)
-            return await tool.run(params=params)
-        except ToolExecutionError:
+            # 工具执行受本轮剩余时间约束，超时由 Agent 上抛给工作流处理
+            with span('tool.run', tool=tool_name, agent=params.get('agent')):
+                async with within_deadline():
+                    return await tool.run(params=params)
+        except (ToolExecutionError, TurnDeadlineExceeded):
             raise
         except Exception as exc:  # pragma: no cover - defensive
             raise ToolExecutionError(f'{tool_name} 执行失败: {exc}') from exc
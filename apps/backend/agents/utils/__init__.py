@@ -1,4 +1,12 @@
+from .deadline import TurnDeadlineExceeded, remaining_time
 from .file_blocks import extract_file_blocks
+from .json_stream import IncrementalJSONParser
 from .shell_blocks import extract_shell_blocks
 
-__all__ = ['extract_file_blocks', 'extract_shell_blocks']
+__all__ = [
+    'IncrementalJSONParser',
+    'TurnDeadlineExceeded',
+    'extract_file_blocks',
+    'extract_shell_blocks',
+    'remaining_time',
+]
@@ -0,0 +1,127 @@
+"""Turn-level deadline carried in a context variable.
+
+`AgentExecutor` 在轮次开始时设置截止时间；LLM 调用、工具执行与沙箱命令通过
+`clamp_timeout` / `within_deadline` 读取剩余预算，超时抛出 `TurnDeadlineExceeded`。
+asyncio 子任务与 `asyncio.to_thread` 会复制上下文，预测运行与 docker exec 线程同样受限。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+# 单轮总预算（秒），<=0 表示不限制
+TURN_DEADLINE_SECONDS = float(os.getenv('AGENT_TURN_DEADLINE_SECONDS', '300'))
+# 剩余时间低于该值时跳过 Mike 复盘，按默认顺序调度
+DEADLINE_SKIP_REVIEW_SECONDS = float(os.getenv('AGENT_DEADLINE_SKIP_REVIEW_SECONDS', '60'))
+# 剩余时间低于该值时不再调度新的 Agent，直接汇总
+DEADLINE_FORCE_SUMMARY_SECONDS = float(os.getenv('AGENT_DEADLINE_FORCE_SUMMARY_SECONDS', '20'))
+
+
+class TurnDeadlineExceeded(Exception):
+    """Raised when the current turn has used up its time budget."""
+
+
+@dataclass(frozen=True)
+class TurnDeadline:
+    budget: float
+    expires_at: float  # time.monotonic() 时间点
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_CURRENT_DEADLINE: ContextVar[Optional[TurnDeadline]] = ContextVar(
+    'agent_turn_deadline', default=None
+)
+
+
+def start_turn_deadline(budget: Optional[float] = None) -> Token:
+    budget = TURN_DEADLINE_SECONDS if budget is None else budget
+    deadline = None
+    if budget > 0:
+        deadline = TurnDeadline(budget=budget, expires_at=time.monotonic() + budget)
+    return _CURRENT_DEADLINE.set(deadline)
+
+
+def reset_turn_deadline(token: Token) -> None:
+    _CURRENT_DEADLINE.reset(token)
+
+
+def current_deadline() -> Optional[TurnDeadline]:
+    return _CURRENT_DEADLINE.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left in the current turn, or None when no deadline is set."""
+    deadline = _CURRENT_DEADLINE.get()
+    return deadline.remaining() if deadline else None
+
+
+def clamp_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Shrink a per-call timeout to the remaining turn budget; raise once the budget is gone."""
+    deadline = _CURRENT_DEADLINE.get()
+    if deadline is None:
+        return timeout
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise TurnDeadlineExceeded(f'已超过本轮时限（{deadline.budget:g}s）')
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+@asynccontextmanager
+async def within_deadline() -> AsyncIterator[None]:
+    """Cancel the enclosed block when the turn deadline passes (no-op without a deadline)."""
+    timeout = clamp_timeout(None)
+    if timeout is None:
+        yield
+        return
+    scope = asyncio.timeout(timeout)
+    try:
+        async with scope:
+            yield
+    except TimeoutError as exc:
+        # 只转换由截止时间触发的超时，内部自身的 TimeoutError 原样抛出
+        if not scope.expired():
+            raise
+        deadline = _CURRENT_DEADLINE.get()
+        budget = deadline.budget if deadline else timeout
+        raise TurnDeadlineExceeded(f'已超过本轮时限（{budget:g}s）') from exc
+
+
+async def iterate_within_deadline(iterator: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Yield from an async iterator, bounding each wait for an item by the remaining budget."""
+    while True:
+        try:
+            async with within_deadline():
+                item = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        yield item
+
+
+__all__ = [
+    'DEADLINE_FORCE_SUMMARY_SECONDS',
+    'DEADLINE_SKIP_REVIEW_SECONDS',
+    'TURN_DEADLINE_SECONDS',
+    'TurnDeadline',
+    'TurnDeadlineExceeded',
+    'clamp_timeout',
+    'current_deadline',
+    'iterate_within_deadline',
+    'remaining_time',
+    'reset_turn_deadline',
+    'start_turn_deadline',
+    'within_deadline',
+]
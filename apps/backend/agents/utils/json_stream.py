@@ -0,0 +1,166 @@
+"""Incremental parser for a single flat JSON object arriving in stream chunks.
+
+路由类调用（Mike plan/review）只关心少数几个字段，边收边解析即可在字段齐全时提前结束流，
+不必等模型把整段 JSON（甚至后续的解释文字）都生成完。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+_WHITESPACE = ' \t\r\n'
+
+
+class IncrementalJSONParser:
+    """Feed chunks; completed top-level fields appear in `fields` as soon as their value closes.
+
+    Text before the first `{` (e.g. prose when JSON mode is unavailable) is skipped, and anything
+    after the closing `}` is ignored.
+    """
+
+    def __init__(self) -> None:
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._state = 'seek'
+        self._key: Optional[str] = None
+        self._buffer: List[str] = []
+        self._escape = False
+        self._depth = 0
+        self._nested_in_string = False
+
+    def feed(self, chunk: str) -> None:
+        for char in chunk:
+            if self.done:
+                return
+            self._step(char)
+
+    def has(self, *keys: str) -> bool:
+        return all(key in self.fields for key in keys)
+
+    def partial_string(self, key: str) -> Optional[str]:
+        """Decoded text of a string field, including one that is still streaming."""
+        if key in self.fields:
+            value = self.fields[key]
+            return value if isinstance(value, str) else None
+        if self._state == 'string' and self._key == key:
+            return _decode_partial(''.join(self._buffer))
+        return None
+
+    def _step(self, char: str) -> None:
+        state = self._state
+        if state == 'seek':
+            if char == '{':
+                self._state = 'key_or_end'
+        elif state == 'key_or_end':
+            if char == '"':
+                self._state = 'key'
+                self._buffer = []
+            elif char == '}':
+                self.done = True
+        elif state == 'key':
+            if self._consume_string_char(char):
+                self._key = _decode_partial(''.join(self._buffer))
+                self._state = 'colon'
+        elif state == 'colon':
+            if char == ':':
+                self._state = 'value'
+        elif state == 'value':
+            if char in _WHITESPACE:
+                return
+            self._buffer = []
+            if char == '"':
+                self._state = 'string'
+            elif char in '{[':
+                self._state = 'nested'
+                self._depth = 1
+                self._nested_in_string = False
+                self._buffer.append(char)
+            else:
+                self._state = 'scalar'
+                self._buffer.append(char)
+        elif state == 'string':
+            if self._consume_string_char(char):
+                self._finish_value(_decode_partial(''.join(self._buffer)))
+        elif state == 'scalar':
+            if char in ',}' or char in _WHITESPACE:
+                raw = ''.join(self._buffer)
+                try:
+                    value: Any = json.loads(raw)
+                except json.JSONDecodeError:
+                    value = raw
+                self._finish_value(value)
+                self._after_value(char)
+            else:
+                self._buffer.append(char)
+        elif state == 'nested':
+            self._buffer.append(char)
+            if self._nested_in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._nested_in_string = False
+                return
+            if char == '"':
+                self._nested_in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = ''.join(self._buffer)
+                    try:
+                        self._finish_value(json.loads(raw))
+                    except json.JSONDecodeError:
+                        self._finish_value(raw)
+        elif state == 'after_value':
+            self._after_value(char)
+
+    def _consume_string_char(self, char: str) -> bool:
+        """Append a raw string char; returns True on the closing quote."""
+        if self._escape:
+            self._escape = False
+            self._buffer.append(char)
+            return False
+        if char == '\\':
+            self._escape = True
+            self._buffer.append(char)
+            return False
+        if char == '"':
+            return True
+        self._buffer.append(char)
+        return False
+
+    def _finish_value(self, value: Any) -> None:
+        if self._key is not None:
+            self.fields[self._key] = value
+        self._key = None
+        self._buffer = []
+        self._state = 'after_value'
+
+    def _after_value(self, char: str) -> None:
+        if char == ',':
+            self._state = 'key_or_end'
+        elif char == '}':
+            self.done = True
+        else:
+            self._state = 'after_value'
+
+
+def _decode_partial(raw: str) -> str:
+    # 去掉尚未收全的转义序列（如结尾的 "\" 或 "\u12"），再按 JSON 字符串解码
+    cut = raw.rfind('\\')
+    if cut != -1:
+        tail = raw[cut:]
+        backslashes = len(raw[:cut]) - len(raw[:cut].rstrip('\\'))
+        if backslashes % 2 == 0 and (len(tail) == 1 or (tail[1] == 'u' and len(tail) < 6)):
+            raw = raw[:cut]
+    try:
+        return json.loads(f'"{raw}"', strict=False)
+    except json.JSONDecodeError:
+        return raw
+
+
+__all__ = ['IncrementalJSONParser']
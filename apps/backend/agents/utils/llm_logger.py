@@ -3,13 +3,18 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
+import os
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+from .tracing import traced
 
 _ROOT_DIR = Path(__file__).resolve().parents[4]
-_SESSION_DIR = _ROOT_DIR / 'data' / 'sessions'
+# 原始 LLM 交互记录目录，默认仓库根目录下的 data/sessions
+_SESSION_DIR = Path(os.getenv('AGENT_LLM_LOG_DIR', str(_ROOT_DIR / 'data' / 'sessions')))
 _SESSION_DIR.mkdir(parents=True, exist_ok=True)
 
 _session_locks: Dict[str, asyncio.Lock] = {}
@@ -23,6 +28,19 @@ def _get_session_lock(session_id: str) -> asyncio.Lock:
     return lock
 
 
+def prompt_hash(prompt: str) -> str:
+    """Stable fingerprint used to match recorded prompts (e.g. by ReplayProvider)."""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def llm_log_paths(directory: Optional[Path] = None) -> List[Path]:
+    """List recorded interaction files (data/sessions/*_llm.json), oldest first."""
+    base = directory or _SESSION_DIR
+    if not base.exists():
+        return []
+    return sorted(base.glob('*_llm.json'), key=lambda path: path.stat().st_mtime)
+
+
 def _append_entry(path: Path, entry: Dict[str, Any]) -> None:
     if path.exists():
         try:
@@ -39,6 +57,7 @@ def _append_entry(path: Path, entry: Dict[str, Any]) -> None:
     tmp_path.replace(path)
 
 
+@traced('llm_logger.record')
 async def record_llm_interaction(
     *,
     session_id: str,
@@ -48,6 +67,8 @@ async def record_llm_interaction(
     raw_response: str,
     final_response: Optional[str] = None,
     interaction: str = 'act',
+    usage: Optional[Dict[str, int]] = None,
+    timing: Optional[Dict[str, Any]] = None,
 ) -> None:
     """Persist a single agent/LLM exchange to data/sessions/{session}_llm.json."""
 
@@ -57,13 +78,18 @@ async def record_llm_interaction(
         'interaction': interaction,
         'provider': provider,
         'prompt': prompt,
+        'prompt_hash': prompt_hash(prompt),
         'raw_response': raw_response,
         'final_response': final_response if final_response is not None else raw_response,
     }
+    if usage:
+        entry['usage'] = dict(usage)
+    if timing:
+        entry['timing'] = dict(timing)
     file_path = _SESSION_DIR / f'{session_id}_llm.json'
     lock = _get_session_lock(session_id)
     async with lock:
         await asyncio.to_thread(_append_entry, file_path, entry)
 
 
-__all__ = ['record_llm_interaction']
+__all__ = ['llm_log_paths', 'prompt_hash', 'record_llm_interaction']
@@ -0,0 +1,444 @@
+"""Lightweight span tracing for chat turns.
+
+每个轮次是一条 trace（trace_id 即 turn_id），根 span 由 `AgentExecutor` 打开；上下文构建、LLM 调用、
+工具、docker 命令与落库等位置通过 `span` / `traced` 记录子 span。当前 span 保存在 contextvar 中，
+asyncio 子任务与 `asyncio.to_thread` 线程会自动挂到创建时的父 span 下；
+没有活动 trace 时全部为空操作。
+trace 结束后保留在内存中供 waterfall 接口查询，并按配置导出为 JSONL 或 OTLP JSON 文件。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+# 设置为 0 时完全关闭采集
+TRACING_ENABLED = os.getenv('AGENT_TRACING', '1') == '1'
+# none（默认）：只保留在内存；jsonl：每行一个 span；
+# otlp：每行一个 OTLP/JSON ExportTraceServiceRequest（一条 trace）
+TRACE_EXPORT = os.getenv('AGENT_TRACE_EXPORT', 'none').lower()
+TRACE_DIR = Path(
+    os.getenv('AGENT_TRACE_DIR', str(Path(__file__).resolve().parents[3] / 'data' / 'traces'))
+)
+# 导出文件超过该大小时轮转为 `.1`（只保留一个旧文件）；0 表示不限制
+TRACE_MAX_BYTES = int(os.getenv('AGENT_TRACE_MAX_BYTES', str(50 * 1024 * 1024)))
+# 内存中保留的最近 trace 数
+TRACE_HISTORY = int(os.getenv('AGENT_TRACE_HISTORY', '200'))
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_time: float  # epoch 秒
+    duration_ms: Optional[float] = None
+    status: str = 'ok'
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(
+            {key: value for key, value in attributes.items() if value is not None}
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_time': self.start_time,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'attributes': dict(self.attributes),
+        }
+
+
+class _NoopSpan:
+    """Returned when no trace is active so call sites never need a None check."""
+
+    def set(self, **attributes: Any) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+_CURRENT_SPAN: ContextVar[Optional[Span]] = ContextVar('agent_current_span', default=None)
+
+
+class SpanExporter:
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+
+def _append_lines(path: Path, lines: List[str], max_bytes: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if max_bytes > 0:
+        try:
+            if path.stat().st_size >= max_bytes:
+                os.replace(path, path.with_name(path.name + '.1'))
+        except FileNotFoundError:
+            pass
+    with path.open('a', encoding='utf-8') as handle:
+        handle.writelines(lines)
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends one JSON object per span to `spans.jsonl`."""
+
+    def __init__(self, directory: Path, max_bytes: int = TRACE_MAX_BYTES) -> None:
+        self._path = directory / 'spans.jsonl'
+        self._max_bytes = max_bytes
+
+    def export(self, spans: List[Span]) -> None:
+        lines = [
+            json.dumps(span.to_dict(), ensure_ascii=False, default=str) + '\n' for span in spans
+        ]
+        _append_lines(self._path, lines, self._max_bytes)
+
+
+class OtlpJsonSpanExporter(SpanExporter):
+    """Appends one OTLP/JSON ExportTraceServiceRequest per trace to `spans.otlp.jsonl`.
+
+    与 OpenTelemetry Collector 的 file exporter 格式一致，可直接用 otlpjsonfile receiver 导入。
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        service_name: str = 'mgx-backend',
+        max_bytes: int = TRACE_MAX_BYTES,
+    ) -> None:
+        self._path = directory / 'spans.otlp.jsonl'
+        self._service_name = service_name
+        self._max_bytes = max_bytes
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {
+            'resourceSpans': [
+                {
+                    'resource': {
+                        'attributes': [_otlp_attribute('service.name', self._service_name)]
+                    },
+                    'scopeSpans': [
+                        {
+                            'scope': {'name': 'agents.tracing'},
+                            'spans': [self._encode(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        _append_lines(self._path, [json.dumps(payload, ensure_ascii=False) + '\n'], self._max_bytes)
+
+    @staticmethod
+    def _encode(span: Span) -> Dict[str, Any]:
+        start_ns = int(span.start_time * 1e9)
+        end_ns = start_ns + int((span.duration_ms or 0) * 1e6)
+        encoded: Dict[str, Any] = {
+            'traceId': _hex_id(span.trace_id, 32),
+            'spanId': _hex_id(span.span_id, 16),
+            'name': span.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(start_ns),
+            'endTimeUnixNano': str(end_ns),
+            'attributes': [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+            # STATUS_CODE_OK=1 / STATUS_CODE_ERROR=2
+            'status': {'code': 2 if span.status == 'error' else 1, 'message': span.status},
+        }
+        if span.parent_id:
+            encoded['parentSpanId'] = _hex_id(span.parent_id, 16)
+        return encoded
+
+
+def _hex_id(value: str, length: int) -> str:
+    # OTLP 要求固定长度的十六进制 id；turn_id 为 uuid 时直接复用，否则取哈希
+    compact = value.replace('-', '').lower()
+    if len(compact) == length and all(char in '0123456789abcdef' for char in compact):
+        return compact
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()[:length]
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def build_exporter(
+    kind: Optional[str] = None, directory: Optional[Path] = None
+) -> Optional[SpanExporter]:
+    kind = (kind or TRACE_EXPORT).lower()
+    directory = directory or TRACE_DIR
+    if kind == 'none':
+        return None
+    if kind == 'jsonl':
+        return JsonlSpanExporter(directory)
+    if kind == 'otlp':
+        return OtlpJsonSpanExporter(directory)
+    raise ValueError(f'Unknown AGENT_TRACE_EXPORT: {kind}')
+
+
+class Tracer:
+    """Collects spans per trace, keeps recent traces in memory and exports finished ones."""
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        exporter: Optional[SpanExporter] = None,
+        history: int = 200,
+    ) -> None:
+        self.enabled = enabled
+        self._exporter = exporter
+        self._history = history
+        self._traces: 'OrderedDict[str, List[Span]]' = OrderedDict()
+        # 每条 trace 已导出的 span 数；恢复执行的轮次沿用 trace 时只导出新增部分
+        self._exported: Dict[str, int] = {}
+        # docker exec 等 span 在工作线程中结束
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(
+        self, trace_id: Optional[str], name: str, **attributes: Any
+    ) -> Iterator[Span | _NoopSpan]:
+        """Open the root span of a new trace; the trace is exported when it closes."""
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        trace_id = trace_id or uuid4().hex
+        with self._lock:
+            # 同一 turn 恢复执行时沿用 trace，之前的 span 一并保留
+            self._traces.setdefault(trace_id, [])
+            self._traces.move_to_end(trace_id)
+            self._trim()
+        root = Span(
+            trace_id=trace_id,
+            span_id=uuid4().hex[:16],
+            parent_id=None,
+            name=name,
+            start_time=time.time(),
+        )
+        root.set(**attributes)
+        try:
+            with self._activate(root):
+                yield root
+        finally:
+            self._export(trace_id)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+        parent = _CURRENT_SPAN.get()
+        if not self.enabled or parent is None:
+            yield NOOP_SPAN
+            return
+        current = Span(
+            trace_id=parent.trace_id,
+            span_id=uuid4().hex[:16],
+            parent_id=parent.span_id,
+            name=name,
+            start_time=time.time(),
+        )
+        current.set(**attributes)
+        with self._activate(current):
+            yield current
+
+    def start_span(self, name: str, **attributes: Any) -> Span | _NoopSpan:
+        """Start a leaf span without making it current (safe across async generator yields)."""
+        parent = _CURRENT_SPAN.get()
+        if not self.enabled or parent is None:
+            return NOOP_SPAN
+        leaf = Span(
+            trace_id=parent.trace_id,
+            span_id=uuid4().hex[:16],
+            parent_id=parent.span_id,
+            name=name,
+            start_time=time.time(),
+        )
+        leaf.set(**attributes)
+        return leaf
+
+    def end_span(self, leaf: Span | _NoopSpan, status: str = 'ok') -> None:
+        if not isinstance(leaf, Span):
+            return
+        leaf.status = status
+        leaf.duration_ms = round((time.perf_counter() - leaf._started) * 1000, 3)
+        with self._lock:
+            spans = self._traces.get(leaf.trace_id)
+            if spans is not None:
+                spans.append(leaf)
+
+    @contextmanager
+    def _activate(self, span: Span) -> Iterator[None]:
+        token = _CURRENT_SPAN.set(span)
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            span.status = 'cancelled'
+            raise
+        except BaseException as exc:
+            span.status = 'error'
+            span.set(error=f'{type(exc).__name__}: {exc}'[:300])
+            raise
+        finally:
+            _CURRENT_SPAN.reset(token)
+            span.duration_ms = round((time.perf_counter() - span._started) * 1000, 3)
+            with self._lock:
+                spans = self._traces.get(span.trace_id)
+                if spans is not None:
+                    spans.append(span)
+
+    def get_trace(self, trace_id: str) -> Optional[List[Span]]:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return list(spans) if spans is not None else None
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._traces.items())[-limit:]
+        summaries = []
+        for trace_id, spans in reversed(items):
+            roots = [span for span in spans if span.parent_id is None]
+            summaries.append(
+                {
+                    'trace_id': trace_id,
+                    'name': roots[-1].name if roots else None,
+                    'spans': len(spans),
+                    'start_time': min((span.start_time for span in spans), default=None),
+                    'duration_ms': (
+                        round(sum(span.duration_ms or 0 for span in roots), 3) if roots else None
+                    ),
+                    'status': roots[-1].status if roots else 'running',
+                }
+            )
+        return summaries
+
+    def waterfall(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Spans in start order with offset/depth, plus total time per span name."""
+        spans = self.get_trace(trace_id)
+        if spans is None:
+            return None
+        spans.sort(key=lambda span: span.start_time)
+        origin = spans[0].start_time if spans else 0.0
+        by_id = {span.span_id: span for span in spans}
+        rows = []
+        by_name: Dict[str, Dict[str, float]] = {}
+        for span in spans:
+            depth = 0
+            parent = by_id.get(span.parent_id or '')
+            while parent is not None:
+                depth += 1
+                parent = by_id.get(parent.parent_id or '')
+            rows.append(
+                {
+                    **span.to_dict(),
+                    'offset_ms': round((span.start_time - origin) * 1000, 3),
+                    'depth': depth,
+                }
+            )
+            totals = by_name.setdefault(span.name, {'count': 0, 'total_ms': 0.0})
+            totals['count'] += 1
+            totals['total_ms'] = round(totals['total_ms'] + (span.duration_ms or 0), 3)
+        return {'trace_id': trace_id, 'spans': rows, 'by_name': by_name}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._traces.clear()
+            self._exported.clear()
+
+    def _export(self, trace_id: str) -> None:
+        if self._exporter is None:
+            return
+        with self._lock:
+            all_spans = self._traces.get(trace_id) or []
+            spans = all_spans[self._exported.get(trace_id, 0):]
+            if trace_id in self._traces:
+                self._exported[trace_id] = len(all_spans)
+        if not spans:
+            return
+        try:
+            self._exporter.export(spans)
+        except OSError as exc:
+            logger.warning('Failed to export trace %s: %s', trace_id, exc)
+
+    def _trim(self) -> None:
+        while len(self._traces) > self._history:
+            trace_id, _ = self._traces.popitem(last=False)
+            self._exported.pop(trace_id, None)
+
+
+tracer = Tracer(enabled=TRACING_ENABLED, exporter=build_exporter(), history=TRACE_HISTORY)
+
+
+def span(name: str, **attributes: Any):
+    """Child span of the current span; no-op outside a trace."""
+    return tracer.span(name, **attributes)
+
+
+def annotate_span(**attributes: Any) -> None:
+    """Attach attributes to the innermost active span."""
+    current = _CURRENT_SPAN.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator form of `span` for sync and async functions."""
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with tracer.span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with tracer.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+__all__ = [
+    'JsonlSpanExporter',
+    'OtlpJsonSpanExporter',
+    'Span',
+    'SpanExporter',
+    'TRACING_ENABLED',
+    'Tracer',
+    'annotate_span',
+    'build_exporter',
+    'span',
+    'traced',
+    'tracer',
+]
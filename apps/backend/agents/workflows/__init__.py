@@ -1,3 +1,20 @@
+from .checkpoint import WorkflowCheckpoint, claim_checkpoint, clear_checkpoint, list_checkpoints
 from .orchestrator import SequentialWorkflow
+from .parallel import ParallelWorkflow
+from .routing import RoutingPolicyEngine, RoutingRule, routing_policy
+from .single import SingleAgentWorkflow
+from .speculation import speculation_stats
 
-__all__ = ['SequentialWorkflow']
+__all__ = [
+    'ParallelWorkflow',
+    'RoutingPolicyEngine',
+    'RoutingRule',
+    'SequentialWorkflow',
+    'SingleAgentWorkflow',
+    'WorkflowCheckpoint',
+    'claim_checkpoint',
+    'clear_checkpoint',
+    'list_checkpoints',
+    'routing_policy',
+    'speculation_stats',
+]
@@ -0,0 +1,95 @@
+"""Durable per-turn workflow checkpoints so interrupted turns can resume after a restart.
+
+编排器在每个步骤完成后保存状态机（下一位 Agent、剩余 Agent、各 Agent 产出与 action log）；
+轮次正常结束或被用户取消时删除。进程重启后仍存在的 checkpoint 即为被中断的轮次。
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from shared.types import AgentRole
+
+from ..context.models import ActionLogEntry
+from ..storage import get_session_state_store
+
+
+@dataclass
+class WorkflowCheckpoint:
+    turn_id: str
+    session_id: str
+    owner_id: str
+    user_id: str
+    user_message: str
+    mode: str  # 保存时所用的工作流，模式不一致时不复用
+    step: int = 0  # 已完成的 Agent 步骤数
+    next_agent: Optional[AgentRole] = None
+    remaining: List[AgentRole] = field(default_factory=list)
+    contributions: List[List[str]] = field(default_factory=list)  # [[agent, content], ...]
+    action_log: List[ActionLogEntry] = field(default_factory=list)
+    data: Dict[str, Any] = field(default_factory=dict)  # 各工作流的额外状态（如 DAG 计划）
+    updated_at: str = ''
+
+    def to_payload(self) -> Dict[str, Any]:
+        payload = asdict(self)
+        payload['action_log'] = [asdict(entry) for entry in self.action_log]
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> 'WorkflowCheckpoint':
+        values = dict(payload)
+        values['action_log'] = [
+            ActionLogEntry(**entry) for entry in payload.get('action_log') or []
+        ]
+        known = cls.__dataclass_fields__.keys()
+        return cls(**{key: value for key, value in values.items() if key in known})
+
+
+def save_checkpoint(checkpoint: WorkflowCheckpoint) -> None:
+    checkpoint.updated_at = datetime.now(timezone.utc).isoformat()
+    get_session_state_store().persist_checkpoint(checkpoint.turn_id, checkpoint.to_payload())
+
+
+def load_checkpoint(turn_id: Optional[str], mode: str) -> Optional[WorkflowCheckpoint]:
+    if not turn_id:
+        return None
+    payload = get_session_state_store().load_checkpoint(turn_id)
+    if not payload:
+        return None
+    try:
+        checkpoint = WorkflowCheckpoint.from_payload(payload)
+    except TypeError:
+        return None
+    return checkpoint if checkpoint.mode == mode else None
+
+
+def list_checkpoints() -> List[WorkflowCheckpoint]:
+    checkpoints: List[WorkflowCheckpoint] = []
+    for payload in get_session_state_store().list_checkpoints():
+        try:
+            checkpoints.append(WorkflowCheckpoint.from_payload(payload))
+        except TypeError:
+            continue
+    return checkpoints
+
+
+def claim_checkpoint(turn_id: str) -> bool:
+    """Take ownership of an interrupted turn so only one worker resumes it."""
+    return get_session_state_store().claim_checkpoint(turn_id)
+
+
+def clear_checkpoint(turn_id: Optional[str]) -> None:
+    if turn_id:
+        get_session_state_store().clear_checkpoint(turn_id)
+
+
+__all__ = [
+    'WorkflowCheckpoint',
+    'claim_checkpoint',
+    'clear_checkpoint',
+    'list_checkpoints',
+    'load_checkpoint',
+    'save_checkpoint',
+]
@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 import json
+import os
 import re
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 from shared.types import AgentRole
@@ -20,22 +21,31 @@ from ..agents.roles.david import DavidAgent
 from ..agents.roles.emma import EmmaAgent
 from ..agents.roles.iris import IrisAgent
 from ..agents.roles.mike import MikeAgent
-from ..stream import publish_status
+from ..stream import publish_status, publish_token
+from ..utils.deadline import TurnDeadlineExceeded
+from ..utils.tracing import span
 from ..context.models import ActionLogEntry, TodoEntry
 from ..context.state import (
     add_todo,
 )
+from .checkpoint import WorkflowCheckpoint, clear_checkpoint, load_checkpoint, save_checkpoint
+from .routing import RoutingDecision, RoutingPolicyEngine, RoutingState, routing_policy
+from .speculation import SpeculativeRun, predict_next_agent
 
 AGENT_EXECUTION_ORDER: List[AgentRole] = ['Emma', 'Bob', 'Alex', 'David', 'Iris']
 FINISH_TOKENS = {'finish', '完成', '结束', 'done', 'complete'}
+# Mike 复盘期间预先运行预测的下一位 Agent（输出缓存，确认后才推流/落库）
+SPECULATION_ENABLED = os.getenv('AGENT_SPECULATION', '0') == '1'
 
 
 class SequentialWorkflow(AgentWorkflow):
     """MVP orchestrator that让 Mike 负责编排，具体执行交给各角色 Agent。"""
 
     MAX_ITERATIONS = 6
+    CHECKPOINT_MODE = 'sequential'
 
-    def __init__(self) -> None:
+    def __init__(self, routing: Optional[RoutingPolicyEngine] = None) -> None:
+        self._routing = routing or routing_policy
         self._mike_agent = MikeAgent()
         self._agent_pool: Dict[AgentRole, object] = {
             'Emma': EmmaAgent(),
@@ -68,17 +78,59 @@ class SequentialWorkflow(AgentWorkflow):
         mike_context = agent_context.for_agent('Mike')
         # 收集每个 Agent 的输出，供 Mike 最终汇总向用户汇报
         agent_contributions: list[Tuple[AgentRole, str]] = []
+        # 本轮产生的 action log，随 checkpoint 一起保存
+        turn_action_log: list[ActionLogEntry] = []
 
-        await self._emit_status(
-            context.session_id,
-            'Mike 正在评估任务，准备调度团队。',
-        )
+        enabled_agents = list(available_agents)
+        executed: list[AgentRole] = []
+        iterations = 0
+        checkpoint = load_checkpoint(context.turn_id, self.CHECKPOINT_MODE)
+        if checkpoint is not None:
+            # 进程重启后从最后完成的步骤继续，已完成的 Agent 与 Mike 的规划不再重跑
+            agent_contributions = [(agent, content) for agent, content in checkpoint.contributions]
+            turn_action_log = list(checkpoint.action_log)
+            # 恢复的 action log 写回 AgentContext，后续 Agent 能看到已完成的步骤，step_id 也不会重复
+            self._seed_action_log(agent_context, turn_action_log)
+            mike_context = agent_context.for_agent('Mike')
+            executed = [agent for agent, _ in agent_contributions]
+            available_agents = [agent for agent in checkpoint.remaining if agent in enabled_agents]
+            next_agent = checkpoint.next_agent if checkpoint.next_agent in enabled_agents else None
+            iterations = checkpoint.step
+            await self._emit_status(
+                context.session_id,
+                f'Mike 从第 {checkpoint.step + 1} 步继续执行被中断的任务。',
+            )
+        else:
+            await self._emit_status(
+                context.session_id,
+                'Mike 正在评估任务，准备调度团队。',
+            )
+            decision = self._routing.decide(
+                RoutingState(
+                    stage='plan',
+                    user_message=context.user_message,
+                    candidates=available_agents,
+                    enabled=enabled_agents,
+                )
+            )
+            if decision is not None:
+                next_agent = await self._apply_routing_decision(decision)
+            else:
+                try:
+                    plan_result = await self._mike_agent.plan_next_agent(
+                        mike_context, available_agents_descriptions
+                    )
+                    next_agent = self._extract_agent_hint(
+                        plan_result.content, available_agents, data=plan_result.data
+                    )
+                except TurnDeadlineExceeded:
+                    next_agent = None
+            self._save_checkpoint(
+                context, 0, next_agent, available_agents, agent_contributions, turn_action_log
+            )
 
-        plan_result = await self._mike_agent.plan_next_agent(mike_context, available_agents_descriptions)
-        next_agent = self._extract_agent_hint(plan_result.content, available_agents)
+        speculation: Optional[SpeculativeRun] = None
 
-        iterations = 0
-        
         while next_agent and iterations < self.MAX_ITERATIONS:
             iterations += 1
             await self._emit_status(
@@ -86,11 +138,16 @@ class SequentialWorkflow(AgentWorkflow):
                 f'Mike 将任务交给 {next_agent}。',
             )
 
-            # 构建当前 Agent 的 AgentContext 视图
-            agent_view = agent_context.for_agent(next_agent)
-
-            agent_result = await self._run_agent(next_agent, agent_view)
+            if speculation is not None:
+                # 预测命中：回放已缓存的输出，剩余部分照常推流
+                agent_result = await speculation.commit()
+                speculation = None
+            else:
+                # 构建当前 Agent 的 AgentContext 视图
+                agent_view = agent_context.for_agent(next_agent)
+                agent_result = await self._run_agent(next_agent, agent_view)
             agent_contributions.append((next_agent, agent_result.content))
+            executed.append(next_agent)
             step_index = len(agent_context.action_log) + 1
             # detail_path = persist_action_detail(
             #     context.session_id,
@@ -123,6 +180,7 @@ class SequentialWorkflow(AgentWorkflow):
                 },
             )
             agent_context.action_log.append(log_entry)
+            turn_action_log.append(log_entry)
 
             # record_action(context.session_id, log_entry)
 
@@ -149,7 +207,7 @@ class SequentialWorkflow(AgentWorkflow):
             # snapshot_path = persist_session_context_snapshot(context.session_id, current_session_context, step_index)
             # log_entry.metadata['context_snapshot'] = snapshot_path
             # attach_snapshot_to_last_action(context.session_id, snapshot_path)
-            
+
             agent_context = build_agent_context_view(
                 session_id=context.session_id,
                 owner_id=context.owner_id,
@@ -158,23 +216,71 @@ class SequentialWorkflow(AgentWorkflow):
                 tools=context.tools,
                 session_context=current_session_context,
             )
+            self._seed_action_log(agent_context, turn_action_log)
             mike_context = agent_context.for_agent('Mike')
 
             available_agents = [agent for agent in available_agents if agent != next_agent]
-            review_result = await self._mike_agent.review_agent_output(
-                mike_context,
+            # 规则能确定下一步时跳过 Mike 的复盘调用
+            decision = self._routing.decide(
+                RoutingState(
+                    stage='review',
+                    user_message=context.user_message,
+                    candidates=available_agents,
+                    enabled=enabled_agents,
+                    executed=list(executed),
+                    last_agent=next_agent,
+                    last_output=agent_result.content,
+                )
+            )
+            if decision is not None:
+                next_agent = await self._apply_routing_decision(decision)
+                self._save_checkpoint(
+                    context,
+                    iterations,
+                    next_agent,
+                    available_agents,
+                    agent_contributions,
+                    turn_action_log,
+                )
+                continue
+            if SPECULATION_ENABLED and iterations < self.MAX_ITERATIONS:
+                speculation = self._start_speculation(available_agents, agent_context)
+            try:
+                review_result = await self._mike_agent.review_agent_output(
+                    mike_context,
+                    next_agent,
+                    agent_result.content,
+                    available_agents,
+                )
+                next_agent = self._extract_agent_hint(
+                    review_result.content, available_agents, data=review_result.data
+                )
+            except TurnDeadlineExceeded:
+                # 复盘途中耗尽时限，不再调度新的 Agent
+                next_agent = None
+            if speculation is not None and speculation.agent != next_agent:
+                await speculation.cancel()
+                speculation = None
+            self._save_checkpoint(
+                context,
+                iterations,
                 next_agent,
-                agent_result.content,
                 available_agents,
+                agent_contributions,
+                turn_action_log,
             )
 
-            next_agent = self._extract_agent_hint(review_result.content, available_agents)
-
         await self._emit_status(
             context.session_id,
             'Mike 收齐团队结果，准备向用户汇报结论与下一步。',
         )
-        await self._mike_agent.summarize_team(mike_context, agent_contributions)
+        await self._summarize(
+            context,
+            mike_context,
+            agent_contributions,
+            [entry.metadata.get('summary_line', '') for entry in turn_action_log],
+        )
+        clear_checkpoint(context.turn_id)
         return None
 
     async def _run_agent(
@@ -185,7 +291,107 @@ class SequentialWorkflow(AgentWorkflow):
         agent = self._agent_pool.get(agent_name)
         if not agent:
             raise ValueError(f'未知 Agent: {agent_name}')
-        return await agent.act(agent_context)
+        try:
+            with span('agent.run', agent=agent_name):
+                return await agent.act(agent_context)
+        except TurnDeadlineExceeded as exc:
+            # 时限耗尽的 Agent 以说明文字作为产出，由工作流继续汇总已有结果
+            return AgentRunResult(
+                agent=agent_name,
+                sender='agent',
+                content=f'{agent_name} 未能在本轮时限内完成：{exc}',
+                message_id='',
+            )
+
+    async def _summarize(
+        self,
+        context: WorkflowContext,
+        mike_context: AgentContext,
+        contributions: list[Tuple[AgentRole, str]],
+        summary_lines: list[str],
+    ) -> None:
+        try:
+            await self._mike_agent.summarize_team(mike_context, contributions)
+        except TurnDeadlineExceeded:
+            # 时限内来不及调用 LLM 汇总时，用各步骤摘要直接汇报
+            await self._publish_plain_summary(context, summary_lines)
+
+    async def _publish_plain_summary(
+        self, context: WorkflowContext, summary_lines: list[str]
+    ) -> None:
+        lines = [
+            '## Mike 最终汇报',
+            f"**用户需求概述**：{context.user_message.strip()}",
+            *[f'- {line}' for line in summary_lines if line],
+            '如需进一步修改或新增功能，随时告诉我，我会继续调度团队。',
+        ]
+        await publish_token(
+            sender='mike',
+            agent='Mike',
+            content='\n'.join(lines),
+            message_id=self._new_message_id(),
+            final=True,
+            persist_final=True,
+            timestamp=datetime.now(timezone.utc).isoformat(),
+        )
+
+    async def _apply_routing_decision(self, decision: RoutingDecision) -> Optional[AgentRole]:
+        # 规则路由不调用 LLM，以状态消息告知用户决策依据
+        await publish_status(
+            content=f'Mike（规则 {decision.rule}）：{decision.reason}',
+            agent='Mike',
+            message_id=self._new_message_id(),
+            timestamp=datetime.now(timezone.utc).isoformat(),
+        )
+        return decision.next_agent
+
+    @staticmethod
+    def _seed_action_log(agent_context: AgentContext, entries: list[ActionLogEntry]) -> None:
+        """Append this turn's action log entries missing from a rebuilt context."""
+        for entry in entries:
+            if entry not in agent_context.action_log:
+                agent_context.action_log.append(entry)
+
+    def _save_checkpoint(
+        self,
+        context: WorkflowContext,
+        step: int,
+        next_agent: Optional[AgentRole],
+        remaining: list[AgentRole],
+        contributions: list[Tuple[AgentRole, str]],
+        action_log: list[ActionLogEntry],
+        data: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        # 没有 turn_id（例如脚本直接调用编排器）时不做 checkpoint
+        if not context.turn_id:
+            return
+        save_checkpoint(
+            WorkflowCheckpoint(
+                turn_id=context.turn_id,
+                session_id=context.session_id,
+                owner_id=context.owner_id,
+                user_id=context.user_id,
+                user_message=context.user_message,
+                mode=self.CHECKPOINT_MODE,
+                step=step,
+                next_agent=next_agent,
+                remaining=list(remaining),
+                contributions=[[agent, content] for agent, content in contributions],
+                action_log=list(action_log),
+                data=data or {},
+            )
+        )
+
+    def _start_speculation(
+        self,
+        remaining: list[AgentRole],
+        agent_context: AgentContext,
+    ) -> Optional[SpeculativeRun]:
+        predicted = predict_next_agent(remaining)
+        if predicted is None or predicted not in self._agent_pool:
+            return None
+        # 与下一轮实际使用的视图相同（均基于复盘前的 agent_context），命中时输出可直接复用
+        return SpeculativeRun(predicted, agent_context.for_agent(predicted), self._run_agent)
 
     # 向调度结果和流式通道发送状态型消息，用于提示前端当前进度
     async def _emit_status(
@@ -201,10 +407,17 @@ class SequentialWorkflow(AgentWorkflow):
             timestamp=datetime.now(timezone.utc).isoformat(),
         )
 
-    def _extract_agent_hint(self, text: str, candidates: list[AgentRole]) -> Optional[AgentRole]:
+    def _extract_agent_hint(
+        self,
+        text: str,
+        candidates: list[AgentRole],
+        data: Optional[Dict[str, Any]] = None,
+    ) -> Optional[AgentRole]:
         if not candidates:
             return None
-        parsed = self._parse_json_agent(text)
+        # 优先使用 Mike 的结构化路由结果，没有再从文本里解析
+        hint = (data or {}).get('next_agent')
+        parsed = hint if isinstance(hint, str) and hint.strip() else self._parse_json_agent(text)
         if parsed:
             normalized = self._normalize_agent(parsed)
             if normalized in candidates:
@@ -265,7 +478,7 @@ class SequentialWorkflow(AgentWorkflow):
             if stripped.startswith('- [ ]'):
                 todos.append(stripped.split(']', 1)[-1].strip())
         return todos
-    
+
     # todo 后续整体收敛到 context 模块中
     def _summarize_agent_result(
         self,
@@ -0,0 +1,340 @@
+"""DAG orchestrator: Mike plans agent dependencies once, independent agents run concurrently."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from shared.types import AgentRole
+
+from ..config import AgentRegistry
+from ..runtime.executor import WorkflowContext
+from ..context import build_session_context, build_agent_context_view
+from ..agents.base import AgentRunResult
+from ..context.models import ActionLogEntry, SessionContext, TodoEntry
+from ..context.state import add_todo
+from ..utils.deadline import DEADLINE_FORCE_SUMMARY_SECONDS, TurnDeadlineExceeded, remaining_time
+from .checkpoint import clear_checkpoint, load_checkpoint
+from .orchestrator import AGENT_EXECUTION_ORDER, SequentialWorkflow
+from .routing import RoutingState
+
+# Mike 未给出可用计划时的默认依赖：调研与需求并行，架构依赖需求，分析依赖需求与调研，实现依赖架构
+DEFAULT_DEPENDENCIES: Dict[AgentRole, List[AgentRole]] = {
+    'Emma': [],
+    'Iris': [],
+    'Bob': ['Emma'],
+    'David': ['Emma', 'Iris'],
+    'Alex': ['Bob'],
+}
+
+
+@dataclass
+class AgentStep:
+    agent: AgentRole
+    depends_on: List[AgentRole] = field(default_factory=list)
+
+
+class ParallelWorkflow(SequentialWorkflow):
+    """Runs the agents of Mike's dependency plan with asyncio.TaskGroup.
+
+    每个 Agent 在其依赖全部完成后立即启动，依赖方的 action_log 会带上上游的执行摘要；
+    各 Agent 仍以自己的 message_id 与 agent 名称推流，前端按消息归属展示。
+    """
+
+    CHECKPOINT_MODE = 'dag'
+
+    async def generate(
+        self,
+        context: WorkflowContext,
+        registry: AgentRegistry,
+    ) -> None:
+        available_agents = [agent for agent in AGENT_EXECUTION_ORDER if registry.is_enabled(agent)]
+        agent_context = build_agent_context_view(
+            session_id=context.session_id,
+            owner_id=context.owner_id,
+            user_id=context.user_id,
+            user_message=context.user_message,
+            tools=context.tools,
+            session_context=context.session_context,
+        )
+        mike_context = agent_context.for_agent('Mike')
+
+        results: Dict[AgentRole, AgentRunResult] = {}
+        log_entries: Dict[AgentRole, ActionLogEntry] = {}
+        checkpoint = load_checkpoint(context.turn_id, self.CHECKPOINT_MODE)
+        if checkpoint is not None:
+            # 恢复依赖计划与已完成的 Agent，只重跑未完成的步骤
+            steps = [
+                AgentStep(agent=raw['agent'], depends_on=list(raw.get('depends_on') or []))
+                for raw in checkpoint.data.get('steps', [])
+                if raw.get('agent') in available_agents
+            ]
+            for agent, content in checkpoint.contributions:
+                results[agent] = AgentRunResult(
+                    agent=agent, sender='agent', content=content, message_id=''
+                )
+            log_entries = {entry.agent: entry for entry in checkpoint.action_log}
+            await self._emit_status(
+                context.session_id,
+                f'Mike 从第 {len(results) + 1} 步继续执行被中断的任务。',
+            )
+        else:
+            await self._emit_status(
+                context.session_id,
+                'Mike 正在评估任务，规划可并行的团队分工。',
+            )
+            decision = self._routing.decide(
+                RoutingState(
+                    stage='plan',
+                    user_message=context.user_message,
+                    candidates=available_agents,
+                    enabled=available_agents,
+                )
+            )
+            if decision is not None:
+                # 规则已确定唯一负责的 Agent（或无需 Agent），跳过依赖规划调用
+                agent = await self._apply_routing_decision(decision)
+                steps = [AgentStep(agent=agent)] if agent else []
+            else:
+                try:
+                    plan_result = await self._mike_agent.plan_dependency_graph(
+                        mike_context,
+                        registry.describe_agents(available_agents),
+                    )
+                    steps = self.resolve_plan(plan_result.data, available_agents)
+                except TurnDeadlineExceeded:
+                    steps = []
+            self._checkpoint_graph(context, steps, results, log_entries)
+
+        if steps:
+            await self._run_graph(context, steps, results, log_entries)
+
+        # 汇报按计划顺序排列，与各 Agent 实际完成的先后无关
+        agent_contributions: list[Tuple[AgentRole, str]] = [
+            (step.agent, results[step.agent].content) for step in steps if step.agent in results
+        ]
+        await self._emit_status(
+            context.session_id,
+            'Mike 收齐团队结果，准备向用户汇报结论与下一步。',
+        )
+        final_context = build_agent_context_view(
+            session_id=context.session_id,
+            owner_id=context.owner_id,
+            user_id=context.user_id,
+            user_message=context.user_message,
+            tools=context.tools,
+            session_context=self._refresh_session_context(context),
+        )
+        await self._summarize(
+            context,
+            final_context.for_agent('Mike'),
+            agent_contributions,
+            [
+                log_entries[agent].metadata.get('summary_line', '')
+                for agent, _ in agent_contributions
+                if agent in log_entries
+            ],
+        )
+        clear_checkpoint(context.turn_id)
+        return None
+
+    def resolve_plan(
+        self,
+        data: Optional[Dict[str, Any]],
+        available_agents: list[AgentRole],
+    ) -> List[AgentStep]:
+        """Validate Mike's steps (known agents and deps, acyclic), else use the default graph."""
+        steps = self._parse_steps(data, available_agents)
+        if steps is None:
+            steps = [
+                AgentStep(agent=agent, depends_on=list(DEFAULT_DEPENDENCIES.get(agent, [])))
+                for agent in available_agents
+            ]
+        planned = {step.agent for step in steps}
+        for step in steps:
+            step.depends_on = [
+                dep for dep in step.depends_on if dep in planned and dep != step.agent
+            ]
+        if self._has_cycle(steps):
+            # 有环时退化为按计划顺序串行
+            for index, step in enumerate(steps):
+                step.depends_on = [steps[index - 1].agent] if index else []
+        return steps[: self.MAX_ITERATIONS]
+
+    def _parse_steps(
+        self,
+        data: Optional[Dict[str, Any]],
+        available_agents: list[AgentRole],
+    ) -> Optional[List[AgentStep]]:
+        raw_steps = (data or {}).get('steps')
+        if not isinstance(raw_steps, list):
+            return None
+        steps: List[AgentStep] = []
+        seen: set[str] = set()
+        for raw in raw_steps:
+            if not isinstance(raw, dict):
+                continue
+            agent = self._normalize_agent(str(raw.get('agent') or ''))
+            if agent is None or agent not in available_agents or agent in seen:
+                continue
+            raw_deps = raw.get('depends_on') or []
+            if isinstance(raw_deps, str):
+                raw_deps = [raw_deps]
+            depends_on = []
+            for dep in raw_deps:
+                normalized = self._normalize_agent(str(dep))
+                if normalized and normalized not in depends_on:
+                    depends_on.append(normalized)
+            steps.append(AgentStep(agent=agent, depends_on=depends_on))
+            seen.add(agent)
+        if raw_steps and not steps:
+            return None
+        return steps
+
+    def _has_cycle(self, steps: List[AgentStep]) -> bool:
+        remaining = {step.agent: set(step.depends_on) for step in steps}
+        while remaining:
+            ready = [agent for agent, deps in remaining.items() if not deps]
+            if not ready:
+                return True
+            for agent in ready:
+                remaining.pop(agent)
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return False
+
+    async def _run_graph(
+        self,
+        context: WorkflowContext,
+        steps: List[AgentStep],
+        results: Dict[AgentRole, AgentRunResult],
+        log_entries: Dict[AgentRole, ActionLogEntry],
+    ) -> None:
+        done: Dict[AgentRole, asyncio.Event] = {step.agent: asyncio.Event() for step in steps}
+        for agent in results:
+            if agent in done:
+                done[agent].set()
+        task_focus = self._resolve_task_focus(context)
+
+        async def run_step(step: AgentStep) -> None:
+            for dep in step.depends_on:
+                await done[dep].wait()
+            remaining = remaining_time()
+            if remaining is not None and remaining <= DEADLINE_FORCE_SUMMARY_SECONDS:
+                # 时限将尽：不再启动新的 Agent，依赖它的步骤同样跳过
+                await self._emit_status(
+                    context.session_id, f'本轮仅剩 {remaining:.0f}s，Mike 跳过 {step.agent}。'
+                )
+                done[step.agent].set()
+                return
+            if step.depends_on:
+                message = f"{'、'.join(step.depends_on)} 已完成，Mike 将任务交给 {step.agent}。"
+            else:
+                message = f'Mike 将任务交给 {step.agent}（并行执行）。'
+            await self._emit_status(context.session_id, message)
+
+            # 依赖边上汇合：在最新会话快照之上追加上游 Agent 的执行记录
+            agent_context = build_agent_context_view(
+                session_id=context.session_id,
+                owner_id=context.owner_id,
+                user_id=context.user_id,
+                user_message=context.user_message,
+                tools=context.tools,
+                session_context=self._refresh_session_context(context),
+            )
+            agent_view = agent_context.for_agent(step.agent)
+            agent_view.action_log = list(agent_view.action_log) + [
+                log_entries[dep] for dep in step.depends_on if dep in log_entries
+            ]
+
+            result = await self._run_agent(step.agent, agent_view)
+            results[step.agent] = result
+            log_entries[step.agent] = self._record_step(
+                context, step, result, task_focus, len(log_entries) + 1
+            )
+            self._checkpoint_graph(context, steps, results, log_entries)
+            done[step.agent].set()
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                for step in steps:
+                    if step.agent in results:
+                        continue
+                    group.create_task(run_step(step), name=f'agent:{step.agent}')
+        except BaseExceptionGroup as group_error:
+            # 与串行模式保持一致：向上抛出首个 Agent 异常（如 LLMProviderError），
+            # 其余 Agent 已被取消
+            raise group_error.exceptions[0] from None
+
+    def _checkpoint_graph(
+        self,
+        context: WorkflowContext,
+        steps: List[AgentStep],
+        results: Dict[AgentRole, AgentRunResult],
+        log_entries: Dict[AgentRole, ActionLogEntry],
+    ) -> None:
+        self._save_checkpoint(
+            context,
+            len(results),
+            None,
+            [step.agent for step in steps if step.agent not in results],
+            [(agent, result.content) for agent, result in results.items()],
+            list(log_entries.values()),
+            data={
+                'steps': [
+                    {'agent': step.agent, 'depends_on': list(step.depends_on)} for step in steps
+                ]
+            },
+        )
+
+    def _record_step(
+        self,
+        context: WorkflowContext,
+        step: AgentStep,
+        result: AgentRunResult,
+        task_focus: str,
+        step_index: int,
+    ) -> ActionLogEntry:
+        todos = self._extract_todos(result.content)
+        summary_line = self._summarize_agent_result(
+            agent=step.agent,
+            text=result.content,
+            task_focus=task_focus,
+            todos=todos,
+        )
+        for description in todos:
+            add_todo(
+                context.session_id,
+                TodoEntry(
+                    description=description,
+                    owner=step.agent,
+                    priority='high',
+                    timestamp=datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+        return ActionLogEntry(
+            agent=step.agent,
+            action='agent_execution',
+            result=result.content[:400],
+            status='success',
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            metadata={
+                'summary_line': summary_line,
+                'detail_path': '',
+                'step_id': step_index,
+                'depends_on': list(step.depends_on),
+            },
+        )
+
+    def _refresh_session_context(self, context: WorkflowContext) -> SessionContext:
+        return build_session_context(
+            session_id=context.session_id,
+            owner_id=context.owner_id,
+            user_id=context.user_id,
+            user_message=context.user_message,
+        )
+
+
+__all__ = ['AgentStep', 'DEFAULT_DEPENDENCIES', 'ParallelWorkflow']
@@ -0,0 +1,276 @@
+"""Deterministic routing rules consulted before Mike's plan/review LLM calls.
+
+规则按注册顺序依次判断，第一个给出结论的规则生效；全部弃权时才调用 Mike。
+结论中的 `next_agent` 为 None 表示直接进入汇总（finish）。
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional, Pattern, Tuple
+
+from shared.types import AgentRole
+
+from ..utils.deadline import (
+    DEADLINE_FORCE_SUMMARY_SECONDS,
+    DEADLINE_SKIP_REVIEW_SECONDS,
+    remaining_time,
+)
+
+RoutingStage = Literal['plan', 'review']
+
+
+@dataclass
+class RoutingState:
+    stage: RoutingStage
+    user_message: str
+    candidates: List[AgentRole]  # 尚未执行、可被选中的 Agent
+    enabled: List[AgentRole]  # 本轮所有启用的 Agent
+    executed: List[AgentRole] = field(default_factory=list)
+    last_agent: Optional[AgentRole] = None
+    last_output: str = ''
+
+
+@dataclass
+class RoutingDecision:
+    next_agent: Optional[AgentRole]
+    reason: str
+    rule: str = ''
+
+
+class RoutingRule:
+    """Base class for a routing rule; return None to abstain."""
+
+    name = 'rule'
+
+    def decide(self, state: RoutingState) -> Optional[RoutingDecision]:
+        raise NotImplementedError
+
+
+class NoRemainingAgentsRule(RoutingRule):
+    """Nothing left to schedule: go straight to the summary."""
+
+    name = 'no_remaining_agents'
+
+    def decide(self, state: RoutingState) -> Optional[RoutingDecision]:
+        if state.stage == 'review' and not state.candidates:
+            return RoutingDecision(next_agent=None, reason='没有剩余 Agent，直接汇总。')
+        return None
+
+
+class DeadlineRule(RoutingRule):
+    """Running out of turn budget: skip Mike's review, then stop dispatching and summarize."""
+
+    name = 'deadline'
+
+    def __init__(
+        self,
+        skip_review_seconds: float = DEADLINE_SKIP_REVIEW_SECONDS,
+        force_summary_seconds: float = DEADLINE_FORCE_SUMMARY_SECONDS,
+    ) -> None:
+        self._skip_review_seconds = skip_review_seconds
+        self._force_summary_seconds = force_summary_seconds
+
+    def decide(self, state: RoutingState) -> Optional[RoutingDecision]:
+        remaining = remaining_time()
+        if remaining is None:
+            return None
+        if remaining <= self._force_summary_seconds:
+            return RoutingDecision(
+                next_agent=None, reason=f'本轮仅剩 {remaining:.0f}s，停止调度并直接汇总。'
+            )
+        if state.stage == 'review' and state.candidates and remaining <= self._skip_review_seconds:
+            agent = state.candidates[0]
+            return RoutingDecision(
+                next_agent=agent,
+                reason=f'本轮仅剩 {remaining:.0f}s，跳过复盘按默认顺序交给 {agent}。',
+            )
+        return None
+
+
+# 工具失败、命令非零退出或异常栈都视为需要工程师介入
+ERROR_PATTERN = re.compile(r'\(失败: |\(exit [1-9]\d*\)|Traceback \(most recent call last\)')
+
+
+class ErrorToAlexRule(RoutingRule):
+    """Agent output contains tool/command failures: hand it (back) to Alex."""
+
+    name = 'error_to_alex'
+
+    def __init__(self, max_alex_runs: int = 2) -> None:
+        self._max_alex_runs = max_alex_runs
+
+    def decide(self, state: RoutingState) -> Optional[RoutingDecision]:
+        if state.stage != 'review' or 'Alex' not in state.enabled:
+            return None
+        if not ERROR_PATTERN.search(state.last_output or ''):
+            return None
+        # Alex 自身失败时允许有限次重试，避免反复循环
+        if state.executed.count('Alex') >= self._max_alex_runs:
+            return None
+        return RoutingDecision(
+            next_agent='Alex', reason=f'{state.last_agent} 的输出包含执行失败，交给 Alex 修复。'
+        )
+
+
+# (规则名, 匹配用户需求的正则, 唯一负责的 Agent)
+DEFAULT_TEMPLATES: List[Tuple[str, str, AgentRole]] = [
+    ('bugfix', r'\bfix\b.*\bbug\b|\bbug\s*fix|修复.*(bug|问题|报错|错误)|修一下|修个', 'Alex'),
+    ('rename', r'\brename\b|重命名|改名', 'Alex'),
+    ('prd', r'\bPRD\b|需求文档|产品需求', 'Emma'),
+]
+
+# 各角色的工作信号；需求同时出现其他角色的信号时（如“写 PRD 并用 React 实现”）模板弃权，
+# 交给 Mike 规划
+ROLE_SIGNALS: Dict[AgentRole, str] = {
+    'Emma': r'\bPRD\b|\brequirements?\b|\buser stor|需求文档|产品需求|验收标准|用户故事',
+    'Bob': (
+        r'\barchitect|\bsystem design\b|\bAPI design\b|\btech(nical)? (stack|design)\b'
+        r'|架构|技术方案|接口设计|系统设计'
+    ),
+    'Alex': (
+        r'\bimplement|\bbuild\b|\bdevelop|\bcode\b|\bcoding\b|\bdeploy|\bfix\b|\brename\b'
+        r'|实现|开发|编码|代码|部署|修复|重命名'
+    ),
+    'David': r'\banaly[sz]|\bdashboard|\bchart|\bstatistic|\bmetrics?\b|数据分析|统计|报表|可视化',
+    'Iris': r'\bresearch\b|\bcompetitor|\bmarket\b|\bsurvey\b|调研|竞品|市场|检索',
+}
+
+
+class TemplateRule(RoutingRule):
+    """Requests matching a known template go to a single agent, then finish.
+
+    只有当需求中没有其他角色的工作信号时才套用模板，避免多角色需求被截断为单个 Agent。
+    """
+
+    name = 'template'
+
+    def __init__(
+        self,
+        templates: Optional[List[Tuple[str, str, AgentRole]]] = None,
+        role_signals: Optional[Dict[AgentRole, str]] = None,
+    ) -> None:
+        self._templates: List[Tuple[str, Pattern[str], AgentRole]] = [
+            (label, re.compile(pattern, re.IGNORECASE), agent)
+            for label, pattern, agent in (templates if templates is not None else DEFAULT_TEMPLATES)
+        ]
+        signals = role_signals if role_signals is not None else ROLE_SIGNALS
+        self._role_signals: Dict[AgentRole, Pattern[str]] = {
+            role: re.compile(pattern, re.IGNORECASE) for role, pattern in signals.items()
+        }
+
+    def match(self, user_message: str) -> Optional[Tuple[str, AgentRole]]:
+        text = user_message or ''
+        for label, pattern, agent in self._templates:
+            if not pattern.search(text):
+                continue
+            others = (signal for role, signal in self._role_signals.items() if role != agent)
+            if any(signal.search(text) for signal in others):
+                return None
+            return label, agent
+        return None
+
+    def decide(self, state: RoutingState) -> Optional[RoutingDecision]:
+        matched = self.match(state.user_message)
+        if not matched:
+            return None
+        label, agent = matched
+        if agent not in state.enabled:
+            return None
+        if state.stage == 'plan':
+            return RoutingDecision(
+                next_agent=agent, reason=f'需求匹配模板 {label}，直接交给 {agent}。'
+            )
+        if state.last_agent == agent:
+            return RoutingDecision(next_agent=None, reason=f'模板 {label} 只需 {agent}，直接汇总。')
+        return None
+
+
+# 默认顺序即判断优先级：时限优先，失败回退优先于直接汇总
+RULE_FACTORIES = {
+    DeadlineRule.name: DeadlineRule,
+    ErrorToAlexRule.name: ErrorToAlexRule,
+    NoRemainingAgentsRule.name: NoRemainingAgentsRule,
+    TemplateRule.name: TemplateRule,
+}
+
+
+class RoutingPolicyEngine:
+    """Evaluates rules in order and counts decisions made with and without Mike's LLM."""
+
+    def __init__(self, rules: Optional[List[RoutingRule]] = None) -> None:
+        self._rules: List[RoutingRule] = list(rules or [])
+        self.reset()
+
+    @property
+    def rules(self) -> List[str]:
+        return [rule.name for rule in self._rules]
+
+    def register(self, rule: RoutingRule, *, first: bool = False) -> None:
+        if first:
+            self._rules.insert(0, rule)
+        else:
+            self._rules.append(rule)
+
+    def decide(self, state: RoutingState) -> Optional[RoutingDecision]:
+        for rule in self._rules:
+            decision = rule.decide(state)
+            if decision is None:
+                continue
+            # 规则只能选择启用的 Agent，否则视为弃权
+            if decision.next_agent is not None and decision.next_agent not in state.enabled:
+                continue
+            decision.rule = decision.rule or rule.name
+            self.avoided[state.stage] += 1
+            self.by_rule[decision.rule] = self.by_rule.get(decision.rule, 0) + 1
+            return decision
+        self.llm_calls[state.stage] += 1
+        return None
+
+    def reset(self) -> None:
+        self.avoided: Dict[str, int] = {'plan': 0, 'review': 0}
+        self.llm_calls: Dict[str, int] = {'plan': 0, 'review': 0}
+        self.by_rule: Dict[str, int] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        avoided = sum(self.avoided.values())
+        total = avoided + sum(self.llm_calls.values())
+        return {
+            'rules': self.rules,
+            'avoided': dict(self.avoided),
+            'llm_calls': dict(self.llm_calls),
+            'avoided_ratio': round(avoided / total, 4) if total else None,
+            'by_rule': dict(self.by_rule),
+        }
+
+
+def build_routing_engine(raw: Optional[str] = None) -> RoutingPolicyEngine:
+    """Build from a comma separated rule list; `none` disables rule routing entirely."""
+    raw = raw if raw is not None else os.getenv('AGENT_ROUTING_RULES', ','.join(RULE_FACTORIES))
+    names = [item.strip() for item in raw.split(',') if item.strip()]
+    if names == ['none']:
+        return RoutingPolicyEngine()
+    unknown = [name for name in names if name not in RULE_FACTORIES]
+    if unknown:
+        raise ValueError(f'Unknown routing rules: {", ".join(unknown)}')
+    return RoutingPolicyEngine([RULE_FACTORIES[name]() for name in names])
+
+
+routing_policy = build_routing_engine()
+
+__all__ = [
+    'DEFAULT_TEMPLATES',
+    'DeadlineRule',
+    'ErrorToAlexRule',
+    'NoRemainingAgentsRule',
+    'ROLE_SIGNALS',
+    'RoutingDecision',
+    'RoutingPolicyEngine',
+    'RoutingRule',
+    'RoutingState',
+    'TemplateRule',
+    'build_routing_engine',
+    'routing_policy',
+]
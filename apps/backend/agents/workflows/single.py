@@ -0,0 +1,68 @@
+"""Single-agent fast path for simple requests: one agent run plus a merged Mike summary."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from shared.types import AgentRole
+
+from ..config import AgentRegistry
+from ..runtime.executor import WorkflowContext
+from ..context import build_agent_context_view
+from ..context.models import TodoEntry
+from ..context.state import add_todo
+from .orchestrator import SequentialWorkflow
+
+
+class SingleAgentWorkflow(SequentialWorkflow):
+    """Skips Mike's plan/review/summary LLM calls; the output is summarized without an LLM."""
+
+    def __init__(self, agent: AgentRole = 'Alex') -> None:
+        super().__init__()
+        self._agent = agent
+
+    async def generate(
+        self,
+        context: WorkflowContext,
+        registry: AgentRegistry,
+    ) -> None:
+        if not registry.is_enabled(self._agent):
+            # 快路径 Agent 被禁用时退回完整团队流程
+            await super().generate(context, registry)
+            return None
+        agent_context = build_agent_context_view(
+            session_id=context.session_id,
+            owner_id=context.owner_id,
+            user_id=context.user_id,
+            user_message=context.user_message,
+            tools=context.tools,
+            session_context=context.session_context,
+        )
+        await self._emit_status(
+            context.session_id,
+            f'Mike 判断这是一个简单请求，直接交给 {self._agent}。',
+        )
+        result = await self._run_agent(self._agent, agent_context.for_agent(self._agent))
+
+        todos = self._extract_todos(result.content)
+        for description in todos:
+            add_todo(
+                context.session_id,
+                TodoEntry(
+                    description=description,
+                    owner=self._agent,
+                    priority='high',
+                    timestamp=datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+        summary_line = self._summarize_agent_result(
+            agent=self._agent,
+            text=result.content,
+            task_focus=self._resolve_task_focus(context),
+            todos=todos,
+        )
+        await self._publish_plain_summary(context, [summary_line])
+        return None
+
+
+__all__ = ['SingleAgentWorkflow']
@@ -0,0 +1,188 @@
+"""Speculative execution of the predicted next agent while Mike reviews the previous one.
+
+预测的 Agent 在独立的 StreamContext 中运行：事件与落库先缓存，写文件/执行命令等有副作用的工具
+在确认前挂起。Mike 的复盘选中该 Agent 时 commit——回放缓存并切换为直通，剩余输出照常推流；
+否则 cancel，缓存直接丢弃。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from shared.types import AgentRole
+
+from ..agents.base import AgentContext, AgentRunResult
+from ..stream import StreamContext, current_stream_context, pop_stream_context, push_stream_context
+from ..tools import ToolExecutor
+from ..tools.executor import ToolParams, ToolPayload
+from ..utils.tracing import span
+
+# 只读工具可以在确认前执行，其余工具等待 commit
+READ_ONLY_TOOLS = {'web_search', 'file_read'}
+
+
+class SpeculationStats:
+    """Process-wide hit rate and wasted output of speculative runs."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted_tokens = 0  # 按流式 chunk 计，近似被丢弃的输出 token 数
+        self.saved_ms = 0.0  # commit 时预测运行已领先的时间
+
+    def snapshot(self) -> Dict[str, Any]:
+        decided = self.hits + self.misses
+        return {
+            'started': self.started,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / decided, 4) if decided else None,
+            'wasted_tokens': self.wasted_tokens,
+            'saved_ms': round(self.saved_ms, 2),
+        }
+
+
+speculation_stats = SpeculationStats()
+
+
+class _GatedToolExecutor(ToolExecutor):
+    """Runs read-only tools immediately; other tools wait until the speculation is committed."""
+
+    def __init__(self, target: ToolExecutor, gate: asyncio.Event) -> None:
+        super().__init__()
+        self._target = target
+        self._gate = gate
+
+    async def run(self, tool_name: str, *, params: ToolParams) -> ToolPayload:
+        if tool_name not in READ_ONLY_TOOLS:
+            await self._gate.wait()
+        return await self._target.run(tool_name, params=params)
+
+
+class _BufferedStreamContext(StreamContext):
+    """Holds events and persistence until commit, then forwards to the real context."""
+
+    def __init__(self, target: StreamContext) -> None:
+        super().__init__(
+            session_id=target.session_id,
+            owner_id=target.owner_id,
+            publisher=self._publish,
+        )
+        # 由目标上下文的 coalescer 统一合并，避免两级缓冲
+        self.coalescer = None
+        self._target = target
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._records: list[Dict[str, Any]] = []
+        self._live = False
+
+    @property
+    def buffered_tokens(self) -> int:
+        return sum(
+            1 for event in self._events if event.get('type') == 'token' and not event.get('final')
+        )
+
+    def record_message(self, **kwargs: Any):  # type: ignore[override]
+        if self._live:
+            return self._target.record_message(**kwargs)
+        self._records.append(kwargs)
+        return None
+
+    async def go_live(self) -> None:
+        # 回放期间预测任务仍可能产生新事件，循环直到缓存清空后再切换为直通（中间没有 await）
+        while self._records or self._events:
+            for record in self._records:
+                self._target.record_message(**record)
+            self._records.clear()
+            if self._events:
+                await self._forward(self._events.popleft())
+        self._live = True
+
+    async def _publish(self, event: Dict[str, Any]) -> None:
+        if self._live:
+            await self._forward(event)
+        else:
+            self._events.append(event)
+
+    async def _forward(self, event: Dict[str, Any]) -> None:
+        coalescer = self._target.coalescer
+        if coalescer is None:
+            if self._target.publisher:
+                await self._target.publisher(event)
+        elif event.get('type') == 'token' and not event.get('final'):
+            await coalescer.push(event)
+        else:
+            await coalescer.publish(event)
+
+
+class SpeculativeRun:
+    """One predicted agent run; exactly one of `commit` / `cancel` must be awaited."""
+
+    def __init__(
+        self,
+        agent: AgentRole,
+        context: AgentContext,
+        run: Callable[[AgentRole, AgentContext], Awaitable[AgentRunResult]],
+        stats: SpeculationStats = speculation_stats,
+    ) -> None:
+        target = current_stream_context()
+        if target is None:
+            raise RuntimeError('Speculation requires an active StreamContext')
+        self.agent = agent
+        self._stats = stats
+        self._gate = asyncio.Event()
+        self._stream = _BufferedStreamContext(target)
+        if context.tools is not None:
+            context.tools = _GatedToolExecutor(context.tools, self._gate)
+        self._started_at = time.perf_counter()
+        self._task = asyncio.create_task(self._run(run, context), name=f'speculate:{agent}')
+        # 轮次结束（完成、失败或取消）时兜底取消仍未决的预测任务
+        parent = asyncio.current_task()
+        if parent is not None:
+            parent.add_done_callback(lambda _: self._task.cancel())
+        stats.started += 1
+
+    async def _run(
+        self,
+        run: Callable[[AgentRole, AgentContext], Awaitable[AgentRunResult]],
+        context: AgentContext,
+    ) -> AgentRunResult:
+        token = push_stream_context(self._stream)
+        try:
+            with span('speculation', agent=self.agent):
+                return await run(self.agent, context)
+        finally:
+            pop_stream_context(token)
+
+    async def commit(self) -> AgentRunResult:
+        self._stats.hits += 1
+        self._stats.saved_ms += (time.perf_counter() - self._started_at) * 1000
+        await self._stream.go_live()
+        self._gate.set()
+        return await self._task
+
+    async def cancel(self) -> None:
+        self._stats.misses += 1
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._stats.wasted_tokens += self._stream.buffered_tokens
+
+
+def predict_next_agent(remaining: list[AgentRole]) -> Optional[AgentRole]:
+    # Mike 很少偏离默认顺序，剩余 Agent 中排在最前的即预测对象
+    return remaining[0] if remaining else None
+
+
+__all__ = [
+    'READ_ONLY_TOOLS',
+    'SpeculationStats',
+    'SpeculativeRun',
+    'predict_next_agent',
+    'speculation_stats',
+]
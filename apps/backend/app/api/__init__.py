@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1 import auth, chat, sessions, stream, sandbox, files
+from app.api.v1 import admin, auth, chat, sessions, stream, sandbox, files
 
 api_router = APIRouter()
 api_router.include_router(sessions.router, prefix="/sessions", tags=["sessions"])
@@ -9,3 +9,4 @@ api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(stream.router, tags=["stream"])
 api_router.include_router(sandbox.router, prefix="/sandbox", tags=["sandbox"])
 api_router.include_router(files.router, prefix="/files", tags=["files"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
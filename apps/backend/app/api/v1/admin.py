@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+
+from agents.llm import LLMProviderError, get_llm_metrics, get_llm_service
+from agents.runtime import complexity_classifier
+from agents.utils.tracing import tracer
+from agents.workflows import routing_policy, speculation_stats
+from app.dependencies.auth import get_admin_user
+from app.models import UserProfile
+from app.services import event_pipelines, stream_manager
+from app.services.turns import turn_manager
+
+
+class LLMMetricsGroup(BaseModel):
+    provider: str
+    agent: str
+    interaction: str
+    calls: int
+    errors: int
+    cancelled: int
+    closed: int
+    deadline: int = 0
+    tokens: int
+    metrics: dict[str, dict[str, Any]]
+
+
+class LLMMetricsResponse(BaseModel):
+    window: int
+    groups: list[LLMMetricsGroup]
+
+
+class LLMModelsResponse(BaseModel):
+    provider: str
+    models: list[str]
+
+
+class StreamStatsResponse(BaseModel):
+    connections: dict[str, Any]
+    pipeline: dict[str, Any]
+
+
+router = APIRouter()
+
+
+@router.get("/llm/metrics", response_model=LLMMetricsResponse)
+async def llm_metrics(
+    provider: str | None = Query(None),
+    agent: str | None = Query(None),
+    interaction: str | None = Query(
+        None, description="act / plan_next_agent / review_agent_output / summarize_team"
+    ),
+    _: UserProfile = Depends(get_admin_user),
+) -> LLMMetricsResponse:
+    """Rolling TTFT/gap/throughput histograms per provider, agent and interaction."""
+    metrics = get_llm_metrics()
+    groups = metrics.snapshot(provider=provider, agent=agent, interaction=interaction)
+    return LLMMetricsResponse(window=metrics.window, groups=groups)
+
+
+@router.delete("/llm/metrics", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_llm_metrics(_: UserProfile = Depends(get_admin_user)) -> None:
+    get_llm_metrics().reset()
+
+
+@router.get("/llm/providers", response_model=list[str])
+async def llm_providers(_: UserProfile = Depends(get_admin_user)) -> list[str]:
+    return get_llm_service().provider_keys()
+
+
+@router.get("/llm/providers/{provider}/models", response_model=LLMModelsResponse)
+async def llm_provider_models(
+    provider: str, _: UserProfile = Depends(get_admin_user)
+) -> LLMModelsResponse:
+    """Discover models served by an OpenAI-compatible endpoint (e.g. `local`, `ollama`)."""
+    try:
+        models = await get_llm_service().list_models(provider)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except LLMProviderError as exc:
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
+    return LLMModelsResponse(provider=provider, models=models)
+
+
+@router.get("/streams", response_model=StreamStatsResponse)
+async def stream_stats(_: UserProfile = Depends(get_admin_user)) -> StreamStatsResponse:
+    """WebSocket fan-out counters plus per-session event pipeline depth and dispatch lag."""
+    return StreamStatsResponse(
+        connections=stream_manager.stats(), pipeline=event_pipelines.snapshot()
+    )
+
+
+@router.get("/turns", response_model=dict[str, Any])
+async def turn_stats(_: UserProfile = Depends(get_admin_user)) -> dict[str, Any]:
+    """Queued turns, global concurrency usage and per-plan waiting counts."""
+    return turn_manager.stats()
+
+
+@router.get("/workflow/speculation", response_model=dict[str, Any])
+async def speculation_metrics(_: UserProfile = Depends(get_admin_user)) -> dict[str, Any]:
+    """Hit rate, wasted output tokens and time saved by speculative next-agent runs."""
+    return speculation_stats.snapshot()
+
+
+@router.delete("/workflow/speculation", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_speculation_metrics(_: UserProfile = Depends(get_admin_user)) -> None:
+    speculation_stats.reset()
+
+
+@router.get("/workflow/routing", response_model=dict[str, Any])
+async def routing_metrics(_: UserProfile = Depends(get_admin_user)) -> dict[str, Any]:
+    """Mike plan/review calls avoided by deterministic routing rules, per stage and per rule."""
+    return routing_policy.snapshot()
+
+
+@router.delete("/workflow/routing", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_routing_metrics(_: UserProfile = Depends(get_admin_user)) -> None:
+    routing_policy.reset()
+
+
+@router.get("/workflow/classifier", response_model=dict[str, Any])
+async def classifier_metrics(_: UserProfile = Depends(get_admin_user)) -> dict[str, Any]:
+    """How many turns took the single-agent fast path versus the full team workflow."""
+    return complexity_classifier.snapshot()
+
+
+@router.get("/traces", response_model=list[dict[str, Any]])
+async def list_traces(
+    limit: int = Query(50, ge=1, le=500),
+    _: UserProfile = Depends(get_admin_user),
+) -> list[dict[str, Any]]:
+    """Recent turn traces kept in memory, newest first."""
+    return tracer.recent(limit)
+
+
+@router.get("/traces/{trace_id}", response_model=dict[str, Any])
+async def trace_waterfall(
+    trace_id: str, _: UserProfile = Depends(get_admin_user)
+) -> dict[str, Any]:
+    """Span waterfall of one turn (trace_id = turn_id).
+
+    Offset/duration/depth per span plus totals per span name.
+    """
+    waterfall = tracer.waterfall(trace_id)
+    if waterfall is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return waterfall
@@ -2,21 +2,31 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.encoders import jsonable_encoder
 
 from app.dependencies.auth import get_current_user
-from app.models import ChatTurn, Message, MessageCreate, UserProfile
-from app.services import agent_runtime_gateway, session_repository
+from app.models import ChatTurnAccepted, ChatTurnStatus, Message, MessageCreate, UserProfile
+from app.services import session_repository
 from app.services.stream import stream_manager
-from agents.llm import LLMProviderError
+from app.services.turn_runner import run_chat_turn
+from app.services.turns import TurnOverloadedError, turn_manager
 from agents.stream import message_event
 
 router = APIRouter()
 
 
-@router.post("/messages", response_model=ChatTurn, status_code=201)
-async def send_message(payload: MessageCreate, user: UserProfile = Depends(get_current_user)) -> ChatTurn:
+@router.post("/messages", response_model=ChatTurnAccepted, status_code=202)
+async def send_message(
+    payload: MessageCreate, user: UserProfile = Depends(get_current_user)
+) -> ChatTurnAccepted:
     session = session_repository.get_session(payload.session_id, user.id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    
+    try:
+        # 排队轮次过多时直接拒绝，避免积压拖垮所有用户
+        turn_manager.check_capacity()
+    except TurnOverloadedError as exc:
+        raise HTTPException(
+            status_code=503, detail="服务繁忙，请稍后重试", headers={"Retry-After": "5"}
+        ) from exc
+
     # 每个会话对应一个 sessionId, 用户发送消息时，先把消息存储下来
     user_message = session_repository.append_message(
         session_id=payload.session_id,
@@ -34,24 +44,22 @@ async def send_message(payload: MessageCreate, user: UserProfile = Depends(get_c
             timestamp=jsonable_encoder(user_message.timestamp),
         ),
     )
-    try:
-        responses = await agent_runtime_gateway.handle_user_turn(
+    # turn_id 复用用户消息 id；工作流在后台执行，同一会话的轮次按提交顺序串行，
+    # 进度通过 WebSocket 与 GET /chat/turns/{turn_id} 获取
+    handle = turn_manager.submit(
+        turn_id=user_message.id,
+        session_id=payload.session_id,
+        owner_id=user.id,
+        plan=user.plan,
+        work=lambda: run_chat_turn(
+            turn_id=user_message.id,
             session_id=payload.session_id,
             owner_id=session.owner_id,
             user_id=user.id,
             user_message=payload.content,
-        )
-        return ChatTurn(user=user_message, responses=responses)
-    except LLMProviderError as exc:
-        # Persist an error/status message so历史可追踪
-        session_repository.append_message(
-            session_id=payload.session_id,
-            sender='status',
-            content=f"LLM 调用失败：{exc}",
-            owner_id=session.owner_id,
-            agent='Mike'
-        )
-        raise HTTPException(status_code=429, detail=str(exc)) from exc
+        ),
+    )
+    return ChatTurnAccepted(**turn_manager.status(handle).model_dump(), user=user_message)
 
 
 @router.get("/messages/{session_id}", response_model=list[Message])
@@ -60,3 +68,22 @@ async def fetch_messages(session_id: str, user: UserProfile = Depends(get_curren
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     return session.messages
+
+
+@router.get("/turns/{turn_id}", response_model=ChatTurnStatus)
+async def get_turn(turn_id: str, user: UserProfile = Depends(get_current_user)) -> ChatTurnStatus:
+    handle = turn_manager.get(turn_id, owner_id=user.id)
+    if not handle:
+        raise HTTPException(status_code=404, detail="Turn not found")
+    return turn_manager.status(handle)
+
+
+@router.post("/turns/{turn_id}/cancel", response_model=ChatTurnStatus, status_code=202)
+async def cancel_turn(
+    turn_id: str, user: UserProfile = Depends(get_current_user)
+) -> ChatTurnStatus:
+    handle = turn_manager.get(turn_id, owner_id=user.id)
+    if not handle:
+        raise HTTPException(status_code=404, detail="Turn not found")
+    turn_manager.cancel(turn_id, reason="user")
+    return turn_manager.status(handle)
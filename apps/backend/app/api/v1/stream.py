@@ -1,15 +1,36 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import Optional
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
 
 from app.services.stream import stream_manager
+from app.services.stream_codec import resolve_encoding
 
 router = APIRouter()
 
 
 @router.websocket("/ws/sessions/{session_id}")
-async def session_stream(websocket: WebSocket, session_id: str) -> None:
-    await stream_manager.connect(session_id, websocket)
+async def session_stream(
+    websocket: WebSocket,
+    session_id: str,
+    since: Optional[int] = Query(default=None, ge=0),
+    epoch: Optional[str] = Query(default=None),
+    encoding: str = Query(default="json"),
+    digest: bool = Query(default=False),
+) -> None:
+    # since：客户端已收到的最大 sequence，重连时只补发之后的事件；epoch：since 所属的编号空间
+    # encoding：json | compact | msgpack；digest：客户端自行拼接 token，final 只需校验值
+    try:
+        resolved_encoding = resolve_encoding(encoding)
+    except ValueError:
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+        return
+    await stream_manager.connect(
+        session_id, websocket, since, encoding=resolved_encoding, digest=digest, epoch=epoch
+    )
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         stream_manager.disconnect(session_id, websocket)
@@ -1,8 +1,15 @@
-from fastapi import Header, HTTPException, status
+import os
+
+from fastapi import Depends, Header, HTTPException, status
 
 from app.models import UserProfile
 from app.services import auth_service
 
+# 逗号分隔的管理员用户 ID，默认 demo 账号
+ADMIN_USER_IDS = {
+    item.strip() for item in os.getenv("MGX_ADMIN_USER_IDS", "user-1").split(",") if item.strip()
+}
+
 
 def get_current_user(authorization: str | None = Header(default=None)) -> UserProfile:
     if not authorization or not authorization.lower().startswith("bearer "):
@@ -10,3 +17,10 @@ def get_current_user(authorization: str | None = Header(default=None)) -> UserPr
     token = authorization.split(" ", 1)[1]
     return auth_service.get_profile(token)
 
+
+def get_admin_user(user: UserProfile = Depends(get_current_user)) -> UserProfile:
+    if user.id not in ADMIN_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required"
+        )
+    return user
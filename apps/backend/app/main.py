@@ -3,8 +3,11 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from agents.llm import get_llm_service
 from app.api import api_router
-from app.services import sandbox_idle_reaper
+from app.services import sandbox_idle_reaper, stream_manager
+from app.services.turn_runner import resume_interrupted_turns
+from app.services.turns import ensure_single_worker, turn_manager
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,11 +31,18 @@ def create_app() -> FastAPI:
 
     @app.on_event("startup")
     async def startup() -> None:
+        ensure_single_worker()
         await sandbox_idle_reaper.start()
+        await stream_manager.start()
+        # 上次进程退出时未完成的轮次从最后完成的步骤继续
+        resume_interrupted_turns()
 
     @app.on_event("shutdown")
     async def shutdown() -> None:
+        await turn_manager.shutdown()
         await sandbox_idle_reaper.stop()
+        await stream_manager.aclose()
+        await get_llm_service().aclose()
 
     @app.get("/healthz", tags=["health"])
     async def health_check() -> dict[str, str]:
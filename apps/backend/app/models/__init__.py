@@ -1,9 +1,22 @@
 from .auth import LoginRequest, TokenResponse, UserProfile
-from .chat import AgentRole, ChatTurn, Message, MessageCreate, SenderRole, Session, SessionCreate, SessionResponse
+from .chat import (
+    AgentRole,
+    ChatTurn,
+    ChatTurnAccepted,
+    ChatTurnStatus,
+    Message,
+    MessageCreate,
+    SenderRole,
+    Session,
+    SessionCreate,
+    SessionResponse,
+)
 
 __all__ = [
     "AgentRole",
     "ChatTurn",
+    "ChatTurnAccepted",
+    "ChatTurnStatus",
     "LoginRequest",
     "Message",
     "MessageCreate",
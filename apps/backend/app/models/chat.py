@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -41,3 +41,23 @@ class MessageCreate(BaseModel):
 class ChatTurn(BaseModel):
     user: Message
     responses: list[Message]
+
+
+TurnState = Literal["queued", "running", "completed", "failed", "cancelled"]
+
+
+class ChatTurnStatus(BaseModel):
+    turn_id: str
+    session_id: str
+    status: TurnState
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_position: Optional[int] = None  # 同一会话中排在前面的轮次数（含正在运行的）
+    admission_position: Optional[int] = None  # 全局调度队列中排在前面的轮次数
+    cancel_reason: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ChatTurnAccepted(ChatTurnStatus):
+    user: Message
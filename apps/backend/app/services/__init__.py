@@ -25,6 +25,7 @@ from .container import (
 )
 from agents.container.watchers import file_watcher_manager, SandboxFileWatcherManager
 from .stream import stream_manager
+from .stream_pipeline import event_pipelines
 
 __all__ = [
     "AgentRuntimeGateway",
@@ -53,6 +54,8 @@ __all__ = [
     "sandbox_file_capability",
     "sandbox_command_service",
     "sandbox_idle_reaper",
+    "stream_manager",
+    "event_pipelines",
 ]
 
 
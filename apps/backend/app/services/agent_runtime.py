@@ -18,6 +18,7 @@ from shared.types import AgentRole, SenderRole
 
 from .session_repository import SessionRepository, session_repository
 from .stream import stream_manager
+from .stream_pipeline import event_pipelines
 
 logger = logging.getLogger(__name__)
 
@@ -34,21 +35,32 @@ class AgentRuntimeGateway:
         self._orchestrator = get_agent_orchestrator()
 
     async def handle_user_turn(
-        self, *, session_id: str, owner_id: str, user_id: str, user_message: str
+        self,
+        *,
+        session_id: str,
+        owner_id: str,
+        user_id: str,
+        user_message: str,
+        turn_id: Optional[str] = None,
     ) -> List[Message]:
         """Forward a user turn to the orchestrator and persist agent replies."""
         # 为该 session 生成 WebSocket 推送器，编排器在生成 token/status 时复用
         stream_publisher = self._build_stream_publisher(session_id)
         # 交给 orchestrator 运行 Mike 状态机，StreamContext 内部会记录落库顺序
         persist_fn = self._build_persist_fn(session_id, owner_id)
-        messages = await self._orchestrator.handle_user_turn(
-            session_id=session_id,
-            owner_id=owner_id,
-            user_id=user_id,
-            user_message=user_message,
-            stream_publisher=stream_publisher,
-            persist_fn=persist_fn,
-        )
+        try:
+            messages = await self._orchestrator.handle_user_turn(
+                session_id=session_id,
+                owner_id=owner_id,
+                user_id=user_id,
+                user_message=user_message,
+                stream_publisher=stream_publisher,
+                persist_fn=persist_fn,
+                turn_id=turn_id,
+            )
+        finally:
+            # 等 pipeline 中本轮事件全部交给 stream_manager，之后直接 broadcast 的事件才不会乱序
+            await event_pipelines.drain(session_id)
         return messages
 
     async def execute_tool(
@@ -69,11 +81,9 @@ class AgentRuntimeGateway:
         return await executor.run(tool_name, params=payload)
 
     def _build_stream_publisher(self, session_id: str) -> Callable[[Dict[str, Any]], Awaitable[None]]:
-        # 返回闭包，供 orchestrator 在任意节点向该 session 推送事件
-        async def publish(event: Dict[str, Any]) -> None:
-            await stream_manager.broadcast(session_id, event)
-
-        return publish
+        # 返回闭包，供 orchestrator 在任意节点向该 session 推送事件；
+        # 事件先进入 session 的 pipeline 队列
+        return event_pipelines.publisher(session_id)
 
     def _build_persist_fn(
         self, session_id: str, owner_id: str
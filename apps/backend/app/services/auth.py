@@ -40,5 +40,11 @@ class AuthService:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
         return record["user"]
 
+    def get_user(self, user_id: str) -> Optional[UserProfile]:
+        for record in self._users.values():
+            if record["profile"].id == user_id:
+                return record["profile"]
+        return None
+
 
 auth_service = AuthService()
@@ -0,0 +1,168 @@
+"""Global admission control for chat turns: concurrency cap plus weighted fair queueing by plan.
+
+每个等待中的轮次获得一个虚拟时间标签 `max(当前虚拟时间, 该 plan 上一个标签) + 1/weight`，
+空出执行槽时总是放行标签最小的轮次（start-time fair queuing）。Pro 权重更高、排队更快，
+但 Basic 不会被饿死；某个 plan 空闲期间也不会“攒”下额度。
+
+状态只保存在本进程内：多个 worker 会各自拥有一份上限，
+因此启动时由 `ensure_single_worker` 限制为单 worker。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+DEFAULT_PLAN_WEIGHTS = "Pro=3,Basic=1"
+
+
+def parse_plan_weights(raw: str) -> Dict[str, float]:
+    """Parse "Pro=3,Basic=1" into {"pro": 3.0, "basic": 1.0}; invalid entries are ignored."""
+    weights: Dict[str, float] = {}
+    for item in raw.split(","):
+        name, _, value = item.partition("=")
+        try:
+            weight = float(value)
+        except ValueError:
+            continue
+        if name.strip() and weight > 0:
+            weights[name.strip().lower()] = weight
+    return weights
+
+
+@dataclass(order=True)
+class _Ticket:
+    tag: float
+    seq: int
+    key: str = field(compare=False)
+    plan: str = field(compare=False)
+    granted: asyncio.Event = field(default_factory=asyncio.Event, compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+class TurnScheduler:
+    """Caps concurrently running turns and admits waiters in weighted fair order."""
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int,
+        weights: Optional[Dict[str, float]] = None,
+        default_weight: float = 1.0,
+    ) -> None:
+        self._max_concurrency = max_concurrency  # <=0 不限制并发
+        self._weights = {name.lower(): value for name, value in (weights or {}).items()}
+        self._default_weight = default_weight
+        self._heap: List[_Ticket] = []
+        self._waiting: Dict[str, _Ticket] = {}
+        self._last_tag: Dict[str, float] = {}
+        self._vtime = 0.0
+        self._seq = itertools.count()
+        self._running = 0
+        self._listener: Optional[Callable[[], None]] = None
+        self.admitted = 0
+        self.abandoned = 0
+
+    def set_listener(self, listener: Callable[[], None]) -> None:
+        """Called whenever the waiting queue changes (used to push queue positions)."""
+        self._listener = listener
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    def weight(self, plan: str) -> float:
+        return self._weights.get(plan.lower(), self._default_weight)
+
+    def position(self, key: str) -> Optional[int]:
+        """Number of waiters that will be admitted before `key` (None when not waiting)."""
+        ticket = self._waiting.get(key)
+        if ticket is None:
+            return None
+        return sum(1 for other in self._waiting.values() if other < ticket)
+
+    @asynccontextmanager
+    async def slot(self, key: str, plan: str) -> AsyncIterator[None]:
+        ticket = self._enqueue(key, plan)
+        try:
+            await ticket.granted.wait()
+        except asyncio.CancelledError:
+            if ticket.granted.is_set():
+                # 放行与取消同时发生：槽位已占用，需要归还
+                self._release()
+            else:
+                ticket.cancelled = True
+                self._waiting.pop(key, None)
+                self.abandoned += 1
+                self._notify()
+            raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, object]:
+        by_plan: Dict[str, int] = {}
+        for ticket in self._waiting.values():
+            by_plan[ticket.plan] = by_plan.get(ticket.plan, 0) + 1
+        return {
+            "max_concurrency": self._max_concurrency,
+            "running": self._running,
+            "waiting": len(self._waiting),
+            "waiting_by_plan": by_plan,
+            "weights": dict(self._weights),
+            "admitted": self.admitted,
+            "abandoned": self.abandoned,
+        }
+
+    def _enqueue(self, key: str, plan: str) -> _Ticket:
+        plan_key = plan.lower()
+        tag = max(self._vtime, self._last_tag.get(plan_key, 0.0)) + 1.0 / self.weight(plan)
+        self._last_tag[plan_key] = tag
+        ticket = _Ticket(tag=tag, seq=next(self._seq), key=key, plan=plan)
+        heapq.heappush(self._heap, ticket)
+        self._waiting[key] = ticket
+        self._dispatch()
+        if not ticket.granted.is_set():
+            self._notify()
+        return ticket
+
+    def _release(self) -> None:
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        changed = False
+        while self._heap and (self._max_concurrency <= 0 or self._running < self._max_concurrency):
+            ticket = heapq.heappop(self._heap)
+            if ticket.cancelled:
+                continue
+            self._waiting.pop(ticket.key, None)
+            self._running += 1
+            self._vtime = ticket.tag
+            self.admitted += 1
+            ticket.granted.set()
+            changed = True
+        if changed:
+            self._notify()
+
+    def _notify(self) -> None:
+        if self._listener:
+            self._listener()
+
+
+turn_scheduler = TurnScheduler(
+    max_concurrency=int(os.getenv("TURN_MAX_CONCURRENCY", "8")),
+    weights=parse_plan_weights(os.getenv("TURN_PLAN_WEIGHTS", DEFAULT_PLAN_WEIGHTS)),
+)
+
+__all__ = ["DEFAULT_PLAN_WEIGHTS", "TurnScheduler", "parse_plan_weights", "turn_scheduler"]
@@ -12,6 +12,7 @@ from uuid import uuid4
 
 from fastapi.encoders import jsonable_encoder
 
+from agents.utils.tracing import traced
 from app.models.chat import AgentRole, Message, SenderRole, Session, SessionCreate
 
 
@@ -80,6 +81,7 @@ class InMemorySessionRepository(SessionRepository):
         """返回当前用户拥有的所有内存会话。"""
         return [session for session in self._sessions.values() if session.owner_id == owner_id]
 
+    @traced('repository.append_message')
     def append_message(
         self,
         *,
@@ -170,6 +172,7 @@ class FileSessionRepository(SessionRepository):
         session = self.get_session(session_id, owner_id)
         return session.messages if session else []
 
+    @traced('repository.append_message')
     def append_message(
         self,
         *,
@@ -217,6 +220,7 @@ class FileSessionRepository(SessionRepository):
     def _session_path(self, session_id: str) -> Path:
         return self.base_path / f'{session_id}.json'
 
+    @traced('repository.save_session')
     def _save_session(self, session: Session) -> None:
         """写入单个会话文件，使用临时文件保证原子性。"""
         data = jsonable_encoder(session)
@@ -245,6 +249,7 @@ class FileSessionRepository(SessionRepository):
         except Exception:
             return {'owners': {}}
 
+    @traced('repository.write_index')
     def _write_index(self) -> None:
         """持久化当前索引，同样采用临时文件策略。"""
         tmp = self.index_path.with_suffix('.tmp')
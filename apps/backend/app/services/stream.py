@@ -1,58 +1,323 @@
 from __future__ import annotations
 
-from collections import deque
-from typing import Any, Deque, Dict, Optional, Set
+import asyncio
+import logging
+import os
+from collections import OrderedDict, deque
+from typing import Any, Coroutine, Deque, Dict, List, Optional, Set, Tuple
 
 from fastapi import WebSocket
 
+from .stream_backend import InProcessStreamBackend, StreamBackend, create_stream_backend
+from .stream_codec import Frame, TextDigest, digest_event, encode_event
+
+logger = logging.getLogger(__name__)
+
+# 慢消费者策略：evict 直接断开（客户端重连后可重放缓冲区）；drop 先丢弃非 final token，
+# 队列仍被关键事件占满时才断开
+SLOW_CONSUMER_POLICIES = ("evict", "drop")
+WS_CLOSE_TRY_AGAIN = 1013
+DIGEST_TRACK_LIMIT = 256
+
+# (encoding, 是否为 digest 形式) -> 已编码帧；同一事件对每种组合只编码一次
+FrameCache = Dict[Tuple[str, bool], Frame]
+
+
+def _is_droppable(event: Dict[str, Any]) -> bool:
+    return event.get("type") == "token" and not event.get("final")
+
+
+class _Connection:
+    """One WebSocket with its own bounded send queue and writer task."""
+
+    def __init__(
+        self,
+        manager: "SessionStreamManager",
+        session_id: str,
+        websocket: WebSocket,
+        max_queue: int,
+        *,
+        encoding: str = "json",
+        digest: bool = False,
+    ) -> None:
+        self.session_id = session_id
+        self.websocket = websocket
+        self.encoding = encoding
+        self.digest = digest
+        self.queue: asyncio.Queue[Frame] = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+        # digest 模式：每条消息送达的首个 token sequence，以及丢过 token 的消息
+        self.first_token: Dict[str, int] = {}
+        self.incomplete: Set[str] = set()
+        self._manager = manager
+        self._writer = asyncio.create_task(self._run(), name=f"ws-writer:{session_id}")
+
+    def offer(self, frame: Frame) -> bool:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+        if not self._writer.done() and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            frame = await self.queue.get()
+            try:
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+            except Exception:
+                # 连接已断开：只移除自己，不影响同 session 的其它连接
+                self._manager._remove(self)
+                return
+
 
 class SessionStreamManager:
     """Manages WebSocket connections per session to broadcast streaming events."""
 
-    def __init__(self) -> None:
-        self._connections: Dict[str, Set[WebSocket]] = {}
+    def __init__(
+        self,
+        *,
+        buffer_size: int = 200,
+        max_queue: int = 1000,
+        slow_consumer_policy: str = "evict",
+        backend: Optional[StreamBackend] = None,
+    ) -> None:
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self._connections: Dict[str, Dict[WebSocket, _Connection]] = {}
         self._buffers: Dict[str, Deque[Dict[str, Any]]] = {}
         self._sequence: Dict[str, int] = {}
+        self._epochs: Dict[str, str] = {}
+        self._digests: "OrderedDict[str, TextDigest]" = OrderedDict()
+        self._buffer_size = buffer_size
+        self._max_queue = max_queue
+        self._policy = slow_consumer_policy
+        self.evicted = 0
+        self.dropped = 0
+        # 关闭被驱逐连接的后台任务；保留引用避免被 GC 提前回收
+        self._background: Set[asyncio.Task] = set()
+        self._backend = backend or InProcessStreamBackend()
+        self._backend.bind(self._dispatch)
 
-    async def connect(self, session_id: str, websocket: WebSocket) -> None:
+    async def connect(
+        self,
+        session_id: str,
+        websocket: WebSocket,
+        since: Optional[int] = None,
+        *,
+        encoding: str = "json",
+        digest: bool = False,
+        epoch: Optional[str] = None,
+    ) -> None:
         await websocket.accept()
-        self._connections.setdefault(session_id, set()).add(websocket)
+        connection = _Connection(
+            self, session_id, websocket, self._max_queue, encoding=encoding, digest=digest
+        )
+        self._connections.setdefault(session_id, {})[websocket] = connection
+        self._backend.update_subscribers(session_id, self.local_subscriber_count(session_id))
+        for event in self.replay(session_id, since, epoch):
+            # 重放的 final 一律带完整内容
+            self._deliver(connection, event, {})
+
+    def replay(
+        self, session_id: str, since: Optional[int] = None, epoch: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Buffered events after `since`; everything when the client's sequence is unknown."""
         buffer = self._buffers.get(session_id)
-        if buffer:
-            for event in buffer:
-                await self._safe_send(websocket, event)
+        if not buffer:
+            return []
+        # epoch 不同或 since 超过当前序号说明序号已重新计数（服务端 / broker 重启），此时整体重放
+        if since is None or since > self._sequence.get(session_id, 0):
+            return list(buffer)
+        if epoch is not None and epoch != self._epochs.get(session_id, epoch):
+            return list(buffer)
+        return [event for event in buffer if event["sequence"] > since]
 
     def disconnect(self, session_id: str, websocket: WebSocket) -> None:
+        connection = self._connections.get(session_id, {}).get(websocket)
+        if connection:
+            self._remove(connection)
+
+    def subscriber_count(self, session_id: str) -> int:
+        # 包含连接在其它 worker 上的订阅者
+        remote = self._backend.remote_subscriber_count(session_id)
+        return self.local_subscriber_count(session_id) + remote
+
+    def local_subscriber_count(self, session_id: str) -> int:
+        return len(self._connections.get(session_id, ()))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._connections),
+            "connections": sum(len(connections) for connections in self._connections.values()),
+            "queued_frames": sum(
+                connection.queue.qsize()
+                for connections in self._connections.values()
+                for connection in connections.values()
+            ),
+            "evicted": self.evicted,
+            "dropped": self.dropped,
+        }
+
+    async def broadcast(self, session_id: str, payload: Dict[str, Any]) -> None:
+        # sequence 由 backend 分配；多 worker 时事件经 broker 回到每个 worker 的 _dispatch
+        await self._backend.publish(session_id, payload)
+
+    async def start(self) -> None:
+        await self._backend.start()
+
+    async def aclose(self) -> None:
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await self._backend.aclose()
+
+    def _dispatch(self, session_id: str, event: Dict[str, Any]) -> None:
+        # 只做入队，不等待任何网络 I/O；实际发送由各连接的 writer task 完成
+        if event.get("epoch") and event["epoch"] != self._epochs.get(session_id):
+            # 编号空间变化：旧 epoch 的序号不再可比，缓冲区也不能再按 since 续传
+            if session_id in self._epochs:
+                self._buffers.pop(session_id, None)
+            self._epochs[session_id] = event["epoch"]
+            self._sequence[session_id] = event["sequence"]
+        else:
+            self._sequence[session_id] = max(self._sequence.get(session_id, 0), event["sequence"])
+        buffer = self._buffers.setdefault(session_id, deque(maxlen=self._buffer_size))
+        if event.get("type") == "token" and event.get("final"):
+            buffer = self._compact(session_id, buffer, event.get("message_id"))
+        buffer.append(event)
         connections = self._connections.get(session_id)
         if not connections:
             return
-        connections.discard(websocket)
+        digest = self._track_digest(event, connections.values())
+        frames: FrameCache = {}
+        for connection in list(connections.values()):
+            self._deliver(connection, event, frames, digest)
+
+    def _track_digest(self, event: Dict[str, Any], connections: Any) -> Optional[TextDigest]:
+        """Accumulate streamed text per message; returns the digest when a final matches it."""
+        if event.get("type") != "token":
+            return None
+        message_id = event.get("message_id") or ""
+        content = event.get("content") or ""
+        if event.get("final"):
+            digest = self._digests.pop(message_id, None)
+            return digest if digest is not None and digest.matches(content) else None
+        digest = self._digests.get(message_id)
+        if digest is None:
+            # 只有存在 digest 订阅者时才开始累计
+            if not any(connection.digest for connection in connections):
+                return None
+            digest = TextDigest(first_sequence=event["sequence"])
+            self._digests[message_id] = digest
+            while len(self._digests) > DIGEST_TRACK_LIMIT:
+                self._digests.popitem(last=False)
+        digest.update(content)
+        return None
+
+    def _compact(
+        self, session_id: str, buffer: Deque[Dict[str, Any]], message_id: Optional[str]
+    ) -> Deque[Dict[str, Any]]:
+        # final token 携带完整内容，同一消息之前的非 final token 不再需要重放
+        if not any(_is_droppable(item) and item.get("message_id") == message_id for item in buffer):
+            return buffer
+        compacted = deque(
+            (
+                item
+                for item in buffer
+                if not (_is_droppable(item) and item.get("message_id") == message_id)
+            ),
+            maxlen=self._buffer_size,
+        )
+        self._buffers[session_id] = compacted
+        return compacted
+
+    def _deliver(
+        self,
+        connection: _Connection,
+        event: Dict[str, Any],
+        frames: FrameCache,
+        digest: Optional[TextDigest] = None,
+    ) -> None:
+        if connection.closed:
+            return
+        droppable = _is_droppable(event)
+        message_id = event.get("message_id") or ""
+        slim = False
+        if connection.digest and event.get("type") == "token" and not droppable:
+            # 仅当该连接从首个 token 起完整收到了这条消息时，final 才只发 checksum/length
+            first = connection.first_token.pop(message_id, None)
+            complete = message_id not in connection.incomplete
+            connection.incomplete.discard(message_id)
+            slim = digest is not None and complete and first == digest.first_sequence
+        key = (connection.encoding, slim)
+        frame = frames.get(key)
+        if frame is None:
+            payload = digest_event(event, digest) if slim and digest else event
+            frame = encode_event(payload, connection.encoding)
+            frames[key] = frame
+        if connection.offer(frame):
+            if connection.digest and droppable:
+                connection.first_token.setdefault(message_id, event["sequence"])
+            return
+        if self._policy == "drop" and droppable:
+            connection.dropped += 1
+            self.dropped += 1
+            if connection.digest:
+                connection.incomplete.add(message_id)
+            return
+        self._evict(connection)
+
+    def _evict(self, connection: _Connection) -> None:
+        self.evicted += 1
+        logger.warning(
+            "Evicting slow stream consumer (session=%s, queued=%s, dropped=%s)",
+            connection.session_id,
+            connection.queue.qsize(),
+            connection.dropped,
+        )
+        self._remove(connection)
+        self._spawn(
+            self._close_socket(connection.websocket), name=f"ws-evict:{connection.session_id}"
+        )
+
+    def _remove(self, connection: _Connection) -> None:
+        connection.close()
+        connections = self._connections.get(connection.session_id)
+        if not connections:
+            return
+        if connections.get(connection.websocket) is not connection:
+            return
+        connections.pop(connection.websocket, None)
         if not connections:
-            self._connections.pop(session_id, None)
+            self._connections.pop(connection.session_id, None)
+        self._backend.update_subscribers(connection.session_id, len(connections))
 
-    async def broadcast(self, session_id: str, payload: Dict[str, Any]) -> None:
-        event = {'session_id': session_id, **payload}
-        event['sequence'] = self._next_sequence(session_id)
-        buffer = self._buffers.setdefault(session_id, deque(maxlen=200))
-        buffer.append(event)
-        connections = list(self._connections.get(session_id, []))
-        for websocket in connections:
-            await self._safe_send(websocket, event)
+    def _spawn(self, coro: Coroutine[Any, Any, Any], *, name: str) -> None:
+        task = asyncio.create_task(coro, name=name)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
 
-    async def _safe_send(self, websocket: WebSocket, payload: Dict[str, Any]) -> None:
-        try:
-            await websocket.send_json(payload)
-        except Exception:
-            # best-effort cleanup; caller负责继续广播
-            for session_id, sockets in list(self._connections.items()):
-                if websocket in sockets:
-                    self.disconnect(session_id, websocket)
-                    break
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background task %s failed", task.get_name(), exc_info=task.exception())
 
-    def _next_sequence(self, session_id: str) -> int:
-        current = self._sequence.get(session_id, 0) + 1
-        self._sequence[session_id] = current
-        return current
+    @staticmethod
+    async def _close_socket(websocket: WebSocket) -> None:
+        await websocket.close(code=WS_CLOSE_TRY_AGAIN)
 
 
-stream_manager = SessionStreamManager()
+stream_manager = SessionStreamManager(
+    buffer_size=int(os.getenv("STREAM_BUFFER_SIZE", "200")),
+    max_queue=int(os.getenv("STREAM_CONNECTION_QUEUE", "1000")),
+    slow_consumer_policy=os.getenv("STREAM_SLOW_CONSUMER_POLICY", "evict"),
+    backend=create_stream_backend(),
+)
@@ -0,0 +1,280 @@
+"""Broadcast backends behind SessionStreamManager.
+
+backend 负责为事件分配 session 内的 sequence 与 epoch 并交付给“每个 worker 的本地分发函数”。
+epoch 标识 sequence 的编号空间：进程或 broker 重启导致序号重新计数时 epoch 随之改变，
+客户端据此重置续传位置。
+- memory：进程内直接交付（默认，单 worker）
+- unix：经 `app.services.stream_broker` 的 Unix socket broker 转发，broker 串行处理所有发布，
+  因此同一 session 的事件在所有 worker 上顺序一致、sequence 全局唯一。轮次状态与调度仍在进程内，
+  目前只允许单个 worker（见 `app.services.turns.ensure_single_worker`）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+EventDeliverer = Callable[[str, Dict[str, Any]], None]
+
+
+def new_epoch() -> str:
+    return uuid4().hex[:8]
+
+# 单条消息上限（final 事件会携带完整回复）
+FRAME_LIMIT = 16 * 1024 * 1024
+
+
+class StreamBackend(ABC):
+    """Assigns per-session sequence numbers and delivers events to every worker."""
+
+    def __init__(self) -> None:
+        self._deliver: Optional[EventDeliverer] = None
+
+    def bind(self, deliver: EventDeliverer) -> None:
+        self._deliver = deliver
+
+    async def start(self) -> None:
+        return None
+
+    async def aclose(self) -> None:
+        return None
+
+    @abstractmethod
+    async def publish(self, session_id: str, payload: Dict[str, Any]) -> None:
+        """Sequence the event and hand it to the local deliverer of each worker."""
+
+    def update_subscribers(self, session_id: str, count: int) -> None:
+        """Report this worker's WebSocket count for a session."""
+        return None
+
+    def remote_subscriber_count(self, session_id: str) -> int:
+        """Subscribers connected to other workers."""
+        return 0
+
+    def _emit(self, session_id: str, event: Dict[str, Any]) -> None:
+        if self._deliver is None:
+            raise RuntimeError("StreamBackend is not bound to a stream manager")
+        self._deliver(session_id, event)
+
+
+class InProcessStreamBackend(StreamBackend):
+    """Single-process backend: sequence locally and deliver synchronously."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.epoch = new_epoch()
+        self._sequence: Dict[str, int] = {}
+        # 从 broker 延续过来的 session 沿用其 epoch
+        self._epochs: Dict[str, str] = {}
+
+    async def publish(self, session_id: str, payload: Dict[str, Any]) -> None:
+        self._emit(session_id, self.sequence_event(session_id, payload))
+
+    def sequence_event(self, session_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        event = {"session_id": session_id, **payload}
+        current = self._sequence.get(session_id, 0) + 1
+        self._sequence[session_id] = current
+        event["sequence"] = current
+        event["epoch"] = self._epochs.get(session_id, self.epoch)
+        return event
+
+    def observe(self, session_id: str, sequence: int, epoch: Optional[str] = None) -> None:
+        """Raise the session counter to a sequence assigned elsewhere (e.g. by the broker)."""
+        if sequence > self._sequence.get(session_id, 0):
+            self._sequence[session_id] = sequence
+            if epoch:
+                self._epochs[session_id] = epoch
+
+    def high_water_marks(self) -> Dict[str, Tuple[int, str]]:
+        return {
+            session_id: (sequence, self._epochs.get(session_id, self.epoch))
+            for session_id, sequence in self._sequence.items()
+        }
+
+
+class UnixSocketStreamBackend(StreamBackend):
+    """Publishes through the local broker; events come back (with sequence) on the same socket."""
+
+    def __init__(self, path: str, *, reconnect_delay: float = 1.0) -> None:
+        super().__init__()
+        self._path = path
+        self._reconnect_delay = reconnect_delay
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._local_subscribers: Dict[str, int] = {}
+        self._total_subscribers: Dict[str, int] = {}
+        # 待上报的订阅数（按 session 只保留最新值），由单个任务按顺序发送，
+        # 避免先后两次更新乱序到达 broker
+        self._subscriber_outbox: Dict[str, int] = {}
+        self._outbox_task: Optional[asyncio.Task] = None
+        # broker 不可用时退回进程内交付，保证单 worker 场景仍可用；
+        # 它同时记录每个 session 见过的最大 sequence 与 epoch，
+        # 退回时在同一 epoch 下从该值之后继续编号
+        self._fallback = InProcessStreamBackend()
+
+    def bind(self, deliver: EventDeliverer) -> None:
+        super().bind(deliver)
+        self._fallback.bind(deliver)
+
+    async def start(self) -> None:
+        if self._reader_task is None:
+            self._reader_task = asyncio.create_task(self._run(), name="stream-broker-client")
+
+    async def aclose(self) -> None:
+        self._closing = True
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+        self._reader_task = None
+        if self._outbox_task:
+            self._outbox_task.cancel()
+            try:
+                await self._outbox_task
+            except asyncio.CancelledError:
+                pass
+        await self._close_writer()
+
+    async def publish(self, session_id: str, payload: Dict[str, Any]) -> None:
+        if not await self._send({"op": "publish", "session_id": session_id, "payload": payload}):
+            await self._fallback.publish(session_id, payload)
+
+    def update_subscribers(self, session_id: str, count: int) -> None:
+        if count:
+            self._local_subscribers[session_id] = count
+        else:
+            self._local_subscribers.pop(session_id, None)
+        if self._writer is None:
+            # 重连后 _run 会重新上报全部订阅数
+            return
+        self._subscriber_outbox.pop(session_id, None)
+        self._subscriber_outbox[session_id] = count
+        if self._outbox_task is None:
+            self._start_outbox()
+
+    def remote_subscriber_count(self, session_id: str) -> int:
+        total = self._total_subscribers.get(session_id, 0)
+        return max(0, total - self._local_subscribers.get(session_id, 0))
+
+    async def _drain_outbox(self) -> None:
+        while self._subscriber_outbox:
+            session_id = next(iter(self._subscriber_outbox))
+            count = self._subscriber_outbox.pop(session_id)
+            message = {"op": "subscribers", "session_id": session_id, "count": count}
+            if not await self._send(message):
+                self._subscriber_outbox.clear()
+
+    def _outbox_done(self, task: asyncio.Task) -> None:
+        self._outbox_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Stream broker outbox failed", exc_info=task.exception())
+        elif self._subscriber_outbox and self._writer is not None:
+            # 排空后、回调执行前又有新的更新入队
+            self._start_outbox()
+
+    def _start_outbox(self) -> None:
+        self._outbox_task = asyncio.create_task(self._drain_outbox(), name="stream-broker-outbox")
+        self._outbox_task.add_done_callback(self._outbox_done)
+
+    async def _send(self, message: Dict[str, Any]) -> bool:
+        writer = self._writer
+        if writer is None:
+            return False
+        try:
+            writer.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+        except (ConnectionError, OSError) as exc:
+            logger.warning("Stream broker write failed: %s", exc)
+            await self._close_writer()
+            return False
+        return True
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self._path, limit=FRAME_LIMIT)
+            except OSError as exc:
+                logger.warning(
+                    "Stream broker %s unavailable (%s); delivering in-process", self._path, exc
+                )
+                await asyncio.sleep(self._reconnect_delay)
+                continue
+            self._writer = writer
+            logger.info("Connected to stream broker at %s", self._path)
+            # 重连后先上报见过的最大 sequence（broker 重启或本 worker 曾退回本地编号），
+            # 保证序号不回退
+            for session_id, (sequence, epoch) in self._fallback.high_water_marks().items():
+                await self._send(
+                    {"op": "seed", "session_id": session_id, "sequence": sequence, "epoch": epoch}
+                )
+            # 再重新上报本 worker 的订阅数
+            for session_id, count in list(self._local_subscribers.items()):
+                await self._send({"op": "subscribers", "session_id": session_id, "count": count})
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    self._handle(json.loads(line))
+            except (ConnectionError, OSError, ValueError) as exc:
+                logger.warning("Stream broker connection lost: %s", exc)
+            finally:
+                await self._close_writer()
+            if not self._closing:
+                await asyncio.sleep(self._reconnect_delay)
+
+    def _handle(self, message: Dict[str, Any]) -> None:
+        op = message.get("op")
+        if op == "event":
+            event = message["event"]
+            sequence = int(event.get("sequence") or 0)
+            self._fallback.observe(message["session_id"], sequence, event.get("epoch"))
+            self._emit(message["session_id"], event)
+        elif op == "subscribers":
+            session_id = message["session_id"]
+            if message.get("count"):
+                self._total_subscribers[session_id] = int(message["count"])
+            else:
+                self._total_subscribers.pop(session_id, None)
+
+    async def _close_writer(self) -> None:
+        writer, self._writer = self._writer, None
+        self._total_subscribers.clear()
+        if writer is None:
+            return
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+def create_stream_backend(name: Optional[str] = None) -> StreamBackend:
+    """Build the backend selected by STREAM_BACKEND (memory | unix)."""
+
+    name = (name or os.getenv("STREAM_BACKEND", "memory")).strip().lower()
+    if name in ("", "memory"):
+        return InProcessStreamBackend()
+    if name == "unix":
+        return UnixSocketStreamBackend(os.getenv("STREAM_BROKER_PATH", "/tmp/mgx-stream.sock"))
+    raise ValueError(f"Unknown STREAM_BACKEND: {name}")
+
+
+__all__ = [
+    "EventDeliverer",
+    "InProcessStreamBackend",
+    "StreamBackend",
+    "UnixSocketStreamBackend",
+    "create_stream_backend",
+    "new_epoch",
+]
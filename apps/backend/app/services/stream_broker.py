@@ -0,0 +1,186 @@
+"""Local pub/sub broker that lets several API workers share WebSocket streams.
+
+每个 worker 通过 UnixSocketStreamBackend 连到 broker；broker 在单个事件循环里串行处理发布请求，
+为每个 session 分配递增 sequence 后按相同顺序转发给所有 worker，并汇总各 worker 的订阅数。
+
+    python -m app.services.stream_broker --path /tmp/mgx-stream.sock
+
+协议为换行分隔的 JSON：
+- worker → broker：{"op": "publish", "session_id", "payload"}、
+  {"op": "subscribers", "session_id", "count"}、
+  {"op": "seed", "session_id", "sequence", "epoch"}（连接后上报 worker 见过的最大 sequence
+  与其 epoch，broker 在该 epoch 下从其后继续编号）
+- broker → worker：{"op": "event", "session_id", "event"}、
+  {"op": "subscribers", "session_id", "count"}
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Set
+
+from .stream_backend import FRAME_LIMIT, new_epoch
+
+logger = logging.getLogger(__name__)
+
+# 单个 worker 连接在 transport 中积压的字节上限；超过即断开该 worker（它会重连并 seed），
+# 避免一个卡住的 worker 让 broker 内存无限增长。默认为单帧上限的两倍，保证单个大 final 帧能写入
+CLIENT_BUFFER_LIMIT = int(os.getenv("STREAM_BROKER_CLIENT_BUFFER", str(2 * FRAME_LIMIT)))
+
+
+class StreamBroker:
+    """Sequences events per session and fans them out to every connected worker."""
+
+    def __init__(self, path: str, *, client_buffer_limit: int = CLIENT_BUFFER_LIMIT) -> None:
+        self._path = path
+        self._client_buffer_limit = client_buffer_limit
+        self.disconnected_slow = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self.epoch = new_epoch()
+        self._sequence: Dict[str, int] = {}
+        self._epochs: Dict[str, str] = {}
+        self._subscribers: Dict[asyncio.StreamWriter, Dict[str, int]] = {}
+
+    async def start(self) -> None:
+        if os.path.exists(self._path):
+            os.unlink(self._path)  # 上次异常退出残留的 socket 文件
+        self._server = await asyncio.start_unix_server(
+            self._handle_client, path=self._path, limit=FRAME_LIMIT
+        )
+        logger.info("Stream broker listening on %s", self._path)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def aclose(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in list(self._clients):
+            writer.close()
+        self._clients.clear()
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._clients.add(writer)
+        self._subscribers[writer] = {}
+        # 新 worker 需要知道当前各 session 的订阅数
+        for session_id in self._subscribed_sessions():
+            self._send(writer, self._subscribers_message(session_id))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                op = message.get("op")
+                if op == "publish":
+                    self._publish(message["session_id"], message.get("payload") or {})
+                elif op == "subscribers":
+                    count = int(message.get("count") or 0)
+                    self._update_subscribers(writer, message["session_id"], count)
+                elif op == "seed":
+                    sequence = int(message.get("sequence") or 0)
+                    self._seed(message["session_id"], sequence, message.get("epoch"))
+        except (ConnectionError, OSError, ValueError) as exc:
+            logger.warning("Stream broker client error: %s", exc)
+        finally:
+            self._clients.discard(writer)
+            sessions = self._subscribers.pop(writer, {})
+            for session_id in sessions:
+                self._announce(session_id)
+            writer.close()
+
+    def _publish(self, session_id: str, payload: Dict[str, Any]) -> None:
+        current = self._sequence.get(session_id, 0) + 1
+        self._sequence[session_id] = current
+        event = {
+            "session_id": session_id,
+            **payload,
+            "sequence": current,
+            "epoch": self._epochs.get(session_id, self.epoch),
+        }
+        self._fan_out({"op": "event", "session_id": session_id, "event": event})
+
+    def _seed(self, session_id: str, sequence: int, epoch: Optional[str]) -> None:
+        # broker 重启后计数从 0 开始，由 worker 上报的最大值恢复，并延续原 epoch
+        if sequence > self._sequence.get(session_id, 0):
+            self._sequence[session_id] = sequence
+            if epoch:
+                self._epochs[session_id] = epoch
+
+    def _update_subscribers(
+        self, writer: asyncio.StreamWriter, session_id: str, count: int
+    ) -> None:
+        counts = self._subscribers.setdefault(writer, {})
+        if count:
+            counts[session_id] = count
+        else:
+            counts.pop(session_id, None)
+        self._announce(session_id)
+
+    def _announce(self, session_id: str) -> None:
+        self._fan_out(self._subscribers_message(session_id))
+
+    def _subscribers_message(self, session_id: str) -> Dict[str, Any]:
+        return {"op": "subscribers", "session_id": session_id, "count": self._total(session_id)}
+
+    def _total(self, session_id: str) -> int:
+        return sum(counts.get(session_id, 0) for counts in self._subscribers.values())
+
+    def _subscribed_sessions(self) -> Set[str]:
+        return {session_id for counts in self._subscribers.values() for session_id in counts}
+
+    def _fan_out(self, message: Dict[str, Any]) -> None:
+        frame = json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+        for writer in list(self._clients):
+            self._write(writer, frame)
+
+    def _send(self, writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+        self._write(writer, json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def _write(self, writer: asyncio.StreamWriter, frame: bytes) -> None:
+        # 同步写入 transport 缓冲区，保证所有 worker 收到的顺序与处理顺序一致
+        if writer.is_closing():
+            self._clients.discard(writer)
+            return
+        buffered = writer.transport.get_write_buffer_size()
+        if buffered > self._client_buffer_limit:
+            # 不能只丢弃部分事件（该 worker 的 sequence 会出现空洞），直接断开让其重连
+            logger.warning("Disconnecting slow stream broker client (%d bytes buffered)", buffered)
+            self.disconnected_slow += 1
+            self._clients.discard(writer)
+            writer.transport.abort()
+            return
+        writer.write(frame)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MGX stream broker")
+    parser.add_argument("--path", default=os.getenv("STREAM_BROKER_PATH", "/tmp/mgx-stream.sock"))
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s"
+    )
+    try:
+        asyncio.run(StreamBroker(args.path).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["StreamBroker"]
@@ -0,0 +1,116 @@
+"""Wire encodings for session stream events, negotiated per WebSocket via `?encoding=`.
+
+- json（默认）：与之前完全一致的 JSON 文本
+- compact：短键 JSON，省略连接级别已知的 session_id 与空字段，final 以 0/1 表示
+- msgpack：与 compact 相同的短键结构，以二进制帧发送（需要安装 msgpack，否则退回 compact）
+
+客户端同时传 `digest=1` 表示会自行拼接 token；若服务端确认该连接收到了某条消息的全部 token，
+final 事件不再携带 content，只带 `checksum`（utf-8 字节的 crc32 十六进制）
+与 `length`（utf-8 字节数）。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Union
+
+try:  # msgpack 为可选依赖
+    import msgpack
+except ImportError:  # pragma: no cover - 取决于部署环境
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+Frame = Union[str, bytes]
+
+ENCODINGS = ("json", "compact", "msgpack")
+
+COMPACT_KEYS: Dict[str, str] = {
+    "type": "t",
+    "sender": "s",
+    "agent": "a",
+    "content": "c",
+    "message_id": "m",
+    "final": "f",
+    "timestamp": "ts",
+    "sequence": "q",
+    "epoch": "e",
+    "paths": "p",
+    "tool": "tl",
+    "invoker": "i",
+    "checksum": "h",
+    "length": "l",
+}
+
+
+def resolve_encoding(requested: Optional[str]) -> str:
+    encoding = (requested or "json").lower()
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported stream encoding: {requested}")
+    if encoding == "msgpack" and msgpack is None:
+        logger.warning("msgpack is not installed; falling back to compact JSON")
+        return "compact"
+    return encoding
+
+
+def compact_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    compacted: Dict[str, Any] = {}
+    for key, value in event.items():
+        if key == "session_id" or value is None:
+            continue
+        if key == "final":
+            value = 1 if value else 0
+        compacted[COMPACT_KEYS.get(key, key)] = value
+    return compacted
+
+
+def encode_event(event: Dict[str, Any], encoding: str = "json") -> Frame:
+    if encoding == "json":
+        # 与 WebSocket.send_json 的编码保持一致
+        return json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+    compacted = compact_event(event)
+    if encoding == "msgpack":
+        return msgpack.packb(compacted, use_bin_type=True)
+    return json.dumps(compacted, separators=(",", ":"), ensure_ascii=False)
+
+
+@dataclass
+class TextDigest:
+    """Running crc32/length of the token text streamed for one message."""
+
+    first_sequence: int
+    checksum: int = 0
+    length: int = 0
+
+    def update(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.checksum = zlib.crc32(data, self.checksum)
+        self.length += len(data)
+
+    def matches(self, text: str) -> bool:
+        data = text.encode("utf-8")
+        return len(data) == self.length and zlib.crc32(data) == self.checksum
+
+    def as_fields(self) -> Dict[str, Any]:
+        return {"checksum": f"{self.checksum:08x}", "length": self.length}
+
+
+def digest_event(event: Dict[str, Any], digest: TextDigest) -> Dict[str, Any]:
+    slim = {key: value for key, value in event.items() if key != "content"}
+    slim.update(digest.as_fields())
+    return slim
+
+
+__all__ = [
+    "COMPACT_KEYS",
+    "ENCODINGS",
+    "Frame",
+    "TextDigest",
+    "compact_event",
+    "digest_event",
+    "encode_event",
+    "resolve_encoding",
+]
@@ -0,0 +1,244 @@
+"""Per-session event pipeline between agents.stream publishers and SessionStreamManager.
+
+agent 的 publisher 只把事件放进该 session 的有界队列，由独立的 dispatcher task 调用
+`stream_manager.broadcast`，因此 LLM 流的读取节奏不受推送耗时影响。队列满时按策略处理：
+- block：等待队列有空位，内存有界，生产者只在严重积压时才被拖慢
+- coalesce（默认）：若队尾是同一消息的非 final token 则直接合并，否则退化为 block
+- drop_tokens：丢弃非 final token（final 事件携带完整内容），其它事件仍 block
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict
+
+from agents.llm.metrics import RollingHistogram
+
+from .stream import SessionStreamManager, stream_manager
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "coalesce", "drop_tokens")
+_LAG_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+EventSink = Callable[[str, Dict[str, Any]], Awaitable[None]]
+StreamPublisher = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _is_token(event: Dict[str, Any]) -> bool:
+    return event.get("type") == "token" and not event.get("final")
+
+
+@dataclass
+class _Queued:
+    event: Dict[str, Any]
+    enqueued_at: float
+
+
+class SessionEventPipeline:
+    """Bounded FIFO of events for one session plus the task that drains it."""
+
+    def __init__(
+        self,
+        session_id: str,
+        sink: EventSink,
+        *,
+        max_queue: int,
+        policy: str,
+        lag: RollingHistogram,
+        idle_timeout: float,
+        on_exit: Callable[["SessionEventPipeline"], None],
+    ) -> None:
+        self.session_id = session_id
+        self._sink = sink
+        self._max_queue = max_queue
+        self._policy = policy
+        self._lag = lag
+        self._idle_timeout = idle_timeout
+        self._on_exit = on_exit
+        self._queue: Deque[_Queued] = deque()
+        self._has_items = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.enqueued = 0
+        self.dispatched = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.max_depth = 0
+        self._task = asyncio.create_task(self._dispatch(), name=f"stream-pipeline:{session_id}")
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def closed(self) -> bool:
+        return self._task.done()
+
+    async def put(self, event: Dict[str, Any]) -> None:
+        if len(self._queue) >= self._max_queue:
+            if self._policy == "drop_tokens" and _is_token(event):
+                self.dropped += 1
+                return
+            if self._policy == "coalesce" and self._merge_into_tail(event):
+                return
+            self.blocked += 1
+            while len(self._queue) >= self._max_queue:
+                self._has_space.clear()
+                await self._has_space.wait()
+        self._queue.append(_Queued(event=event, enqueued_at=time.perf_counter()))
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._idle.clear()
+        self._has_items.set()
+
+    async def drain(self) -> None:
+        """Wait until everything queued so far has been handed to the sink."""
+        if not self.closed:
+            await self._idle.wait()
+
+    def _merge_into_tail(self, event: Dict[str, Any]) -> bool:
+        if not self._queue or not _is_token(event):
+            return False
+        tail = self._queue[-1].event
+        if not _is_token(tail) or tail.get("message_id") != event.get("message_id"):
+            return False
+        # 复制后再改，避免修改调用方仍持有的 dict
+        merged = dict(tail)
+        merged["content"] = (tail.get("content") or "") + (event.get("content") or "")
+        self._queue[-1].event = merged
+        self.coalesced += 1
+        return True
+
+    async def _dispatch(self) -> None:
+        try:
+            while True:
+                if not self._queue:
+                    self._idle.set()
+                    self._has_items.clear()
+                    try:
+                        await asyncio.wait_for(self._has_items.wait(), timeout=self._idle_timeout)
+                    except asyncio.TimeoutError:
+                        if not self._queue:
+                            # 空闲退出；检查与注销之间没有 await，不会丢失并发 put 的事件
+                            return
+                    continue
+                item = self._queue.popleft()
+                self._has_space.set()
+                self._lag.observe(round((time.perf_counter() - item.enqueued_at) * 1000, 2))
+                try:
+                    await self._sink(self.session_id, item.event)
+                except Exception as exc:  # pragma: no cover - defensive
+                    logger.warning(
+                        "Stream pipeline delivery failed for %s: %s", self.session_id, exc
+                    )
+                self.dispatched += 1
+        finally:
+            self._idle.set()
+            self._on_exit(self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "dispatched": self.dispatched,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+        }
+
+
+class EventPipelineManager:
+    """Creates one pipeline per active session and aggregates their lag metrics."""
+
+    def __init__(
+        self,
+        streams: SessionStreamManager,
+        *,
+        max_queue: int = 2000,
+        policy: str = "coalesce",
+        idle_timeout: float = 30.0,
+    ) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown stream pipeline overflow policy: {policy}")
+        self._streams = streams
+        self._max_queue = max_queue  # <=0 关闭 pipeline，publisher 直接 broadcast
+        self._policy = policy
+        self._idle_timeout = idle_timeout
+        self._pipelines: Dict[str, SessionEventPipeline] = {}
+        self._lag = RollingHistogram(_LAG_BUCKETS)
+        self._totals = {"enqueued": 0, "dispatched": 0, "coalesced": 0, "dropped": 0, "blocked": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_queue > 0
+
+    def publisher(self, session_id: str) -> StreamPublisher:
+        async def publish(event: Dict[str, Any]) -> None:
+            if not self.enabled:
+                await self._streams.broadcast(session_id, event)
+                return
+            await self._pipeline(session_id).put(event)
+
+        return publish
+
+    async def drain(self, session_id: str) -> None:
+        pipeline = self._pipelines.get(session_id)
+        if pipeline:
+            await pipeline.drain()
+
+    def snapshot(self) -> Dict[str, Any]:
+        sessions = [pipeline.stats() for pipeline in self._pipelines.values()]
+        totals = dict(self._totals)
+        for entry in sessions:
+            for key in totals:
+                totals[key] += entry[key]
+        return {
+            "policy": self._policy,
+            "max_queue": self._max_queue,
+            "totals": totals,
+            "lag_ms": self._lag.snapshot(),
+            "sessions": sessions,
+        }
+
+    def _pipeline(self, session_id: str) -> SessionEventPipeline:
+        pipeline = self._pipelines.get(session_id)
+        if pipeline is None or pipeline.closed:
+            pipeline = SessionEventPipeline(
+                session_id,
+                self._streams.broadcast,
+                max_queue=self._max_queue,
+                policy=self._policy,
+                lag=self._lag,
+                idle_timeout=self._idle_timeout,
+                on_exit=self._retire,
+            )
+            self._pipelines[session_id] = pipeline
+        return pipeline
+
+    def _retire(self, pipeline: SessionEventPipeline) -> None:
+        if self._pipelines.get(pipeline.session_id) is pipeline:
+            self._pipelines.pop(pipeline.session_id, None)
+        # 已退出 pipeline 的计数并入总量
+        for key, value in pipeline.stats().items():
+            if key in self._totals:
+                self._totals[key] += value
+
+
+event_pipelines = EventPipelineManager(
+    stream_manager,
+    max_queue=int(os.getenv("STREAM_PIPELINE_QUEUE", "2000")),
+    policy=os.getenv("STREAM_PIPELINE_OVERFLOW", "coalesce"),
+)
+
+__all__ = ["EventPipelineManager", "SessionEventPipeline", "event_pipelines"]
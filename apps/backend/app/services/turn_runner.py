@@ -0,0 +1,117 @@
+"""Background chat turn body plus resumption of turns interrupted by a restart."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable
+
+from fastapi.encoders import jsonable_encoder
+
+from agents.llm import LLMProviderError
+from agents.stream import error_event, status_event
+from agents.workflows import claim_checkpoint, clear_checkpoint, list_checkpoints
+from app.models import Message
+
+from .agent_runtime import agent_runtime_gateway
+from .auth import auth_service
+from .session_repository import session_repository
+from .stream import stream_manager
+from .turns import TurnHandle, turn_manager
+
+logger = logging.getLogger(__name__)
+
+# 因应用关闭而取消的轮次保留 checkpoint，重启后继续执行
+RESUMABLE_CANCEL_REASONS = {"shutdown"}
+
+
+async def run_chat_turn(
+    *, turn_id: str, session_id: str, owner_id: str, user_id: str, user_message: str
+) -> list[Message]:
+    try:
+        return await agent_runtime_gateway.handle_user_turn(
+            session_id=session_id,
+            owner_id=owner_id,
+            user_id=user_id,
+            user_message=user_message,
+            turn_id=turn_id,
+        )
+    except asyncio.CancelledError:
+        handle = turn_manager.get(turn_id)
+        reason = handle.cancel_reason if handle else None
+        if reason not in RESUMABLE_CANCEL_REASONS:
+            clear_checkpoint(turn_id)
+        await _notify(session_id, owner_id, f"本轮已取消（{reason or 'unknown'}）", status_event)
+        raise
+    except LLMProviderError as exc:
+        # 失败的轮次不自动重试，避免重启后反复触发同一错误
+        clear_checkpoint(turn_id)
+        # Persist an error/status message so历史可追踪
+        await _notify(session_id, owner_id, f"LLM 调用失败：{exc}", error_event)
+        raise
+    except Exception:
+        # 其它异常同样不保留 checkpoint，否则每次重启都会恢复并再次失败
+        clear_checkpoint(turn_id)
+        raise
+
+
+def resume_interrupted_turns() -> list[TurnHandle]:
+    """Resubmit every turn that still has a workflow checkpoint (called on startup)."""
+    handles: list[TurnHandle] = []
+    for checkpoint in list_checkpoints():
+        if turn_manager.get(checkpoint.turn_id):
+            continue
+        # 多个 worker 共享 checkpoint 目录，只有拿到 claim 的 worker 恢复该轮次
+        if not claim_checkpoint(checkpoint.turn_id):
+            continue
+        if not session_repository.get_session(checkpoint.session_id, checkpoint.owner_id):
+            # 会话已被删除（或使用内存仓库重启后丢失），checkpoint 无法继续
+            clear_checkpoint(checkpoint.turn_id)
+            continue
+        user = auth_service.get_user(checkpoint.user_id)
+        logger.info(
+            "Resuming turn %s (session=%s) from step %s",
+            checkpoint.turn_id,
+            checkpoint.session_id,
+            checkpoint.step,
+        )
+        handles.append(
+            turn_manager.submit(
+                turn_id=checkpoint.turn_id,
+                session_id=checkpoint.session_id,
+                owner_id=checkpoint.owner_id,
+                plan=user.plan if user else "Basic",
+                work=lambda checkpoint=checkpoint: run_chat_turn(
+                    turn_id=checkpoint.turn_id,
+                    session_id=checkpoint.session_id,
+                    owner_id=checkpoint.owner_id,
+                    user_id=checkpoint.user_id,
+                    user_message=checkpoint.user_message,
+                ),
+            )
+        )
+    return handles
+
+
+async def _notify(
+    session_id: str, owner_id: str, content: str, build_event: Callable[..., dict]
+) -> None:
+    notice = session_repository.append_message(
+        session_id=session_id,
+        sender='status',
+        content=content,
+        owner_id=owner_id,
+        agent='Mike',
+    )
+    await stream_manager.broadcast(
+        session_id,
+        build_event(
+            content=notice.content,
+            agent='Mike',
+            message_id=notice.id,
+            timestamp=jsonable_encoder(notice.timestamp),
+        ),
+    )
+
+
+__all__ = ["RESUMABLE_CANCEL_REASONS", "resume_interrupted_turns", "run_chat_turn"]
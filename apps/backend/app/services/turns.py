@@ -0,0 +1,355 @@
+"""Run chat turns in the background: per-session FIFO, cancellation and status tracking."""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import logging
+import os
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Coroutine, Deque, Dict, Optional, Set
+
+from agents.stream import turn_event
+from app.models import ChatTurnStatus
+from app.models.chat import TurnState
+
+from .scheduler import TurnScheduler, turn_scheduler
+from .stream import SessionStreamManager, stream_manager
+
+logger = logging.getLogger(__name__)
+
+TurnWork = Callable[[], Awaitable[Any]]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class TurnCancelledError(Exception):
+    """Raised to the waiter when a turn was cancelled before finishing."""
+
+    def __init__(self, turn_id: str, reason: Optional[str]) -> None:
+        super().__init__(f"Turn {turn_id} cancelled ({reason or 'unknown'})")
+        self.turn_id = turn_id
+        self.reason = reason
+
+
+@dataclass
+class TurnHandle:
+    turn_id: str
+    session_id: str
+    owner_id: str
+    plan: str = "Basic"
+    task: Optional[asyncio.Task] = None
+    submitted_at: datetime = field(default_factory=_now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    status: TurnState = "queued"
+    cancel_reason: Optional[str] = None
+    error: Optional[str] = None
+    ready: asyncio.Event = field(default_factory=asyncio.Event)  # 轮到该 turn 执行时置位
+
+    def to_status(
+        self, queue_position: Optional[int] = None, admission_position: Optional[int] = None
+    ) -> ChatTurnStatus:
+        return ChatTurnStatus(
+            turn_id=self.turn_id,
+            session_id=self.session_id,
+            status=self.status,
+            submitted_at=self.submitted_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            queue_position=queue_position,
+            admission_position=admission_position,
+            cancel_reason=self.cancel_reason,
+            error=self.error,
+        )
+
+
+class TurnOverloadedError(Exception):
+    """Raised when too many turns are already waiting; the API maps it to 503."""
+
+
+class TurnManager:
+    """Runs each turn in its own task; turns of one session execute strictly one after another.
+
+    The session's head turn then waits for a global slot from the TurnScheduler before running.
+    Cancelling a turn propagates through workflow, LLM streams and sandbox commands; a queued
+    turn is simply removed from its queue.
+    """
+
+    def __init__(
+        self,
+        streams: SessionStreamManager,
+        *,
+        scheduler: TurnScheduler,
+        max_queue_depth: int,
+        orphan_timeout: float,
+        poll_interval: float = 1.0,
+        history_limit: int = 500,
+    ) -> None:
+        self._streams = streams
+        self._scheduler = scheduler
+        self._scheduler.set_listener(self._announce_waiting)
+        self._max_queue_depth = max_queue_depth  # <=0 不限制排队数
+        self._orphan_timeout = orphan_timeout  # <=0 关闭无订阅者自动取消
+        self._poll_interval = poll_interval
+        self._history_limit = history_limit
+        self._turns: "OrderedDict[str, TurnHandle]" = OrderedDict()
+        self._queues: Dict[str, Deque[TurnHandle]] = {}
+        # 状态推送与订阅者监视等后台任务；持有引用避免被垃圾回收，结束时记录异常
+        self._background: Set[asyncio.Task] = set()
+
+    def check_capacity(self) -> None:
+        """Reject new turns once the number of queued turns reaches the configured depth."""
+        if self._max_queue_depth > 0 and self.queued_count() >= self._max_queue_depth:
+            raise TurnOverloadedError(f"{self.queued_count()} turns already queued")
+
+    def queued_count(self) -> int:
+        return sum(1 for handle in self._turns.values() if handle.status == "queued")
+
+    def submit(
+        self, *, turn_id: str, session_id: str, owner_id: str, work: TurnWork, plan: str = "Basic"
+    ) -> TurnHandle:
+        """Queue a turn behind earlier turns of the same session and return immediately."""
+        handle = TurnHandle(turn_id=turn_id, session_id=session_id, owner_id=owner_id, plan=plan)
+        # 入队是同步的，保证同一会话按提交顺序执行
+        queue = self._queues.setdefault(session_id, deque())
+        queue.append(handle)
+        if queue[0] is handle:
+            handle.ready.set()
+        handle.task = asyncio.create_task(self._run(handle, work), name=f"turn:{turn_id}")
+        self._turns[turn_id] = handle
+        self._trim_history()
+        handle.task.add_done_callback(lambda _: self._mark_finished(handle))
+        self._announce(handle)
+        if self._orphan_timeout > 0:
+            self._spawn(self._watch_subscribers(handle), name=f"turn-watch:{turn_id}")
+        return handle
+
+    async def wait(self, handle: TurnHandle) -> Any:
+        """Wait for the turn; the waiter itself being cancelled does not cancel the turn."""
+        assert handle.task is not None
+        await asyncio.wait({handle.task})
+        if handle.task.cancelled():
+            raise TurnCancelledError(handle.turn_id, handle.cancel_reason)
+        return handle.task.result()
+
+    def get(self, turn_id: str, owner_id: Optional[str] = None) -> Optional[TurnHandle]:
+        handle = self._turns.get(turn_id)
+        if handle and owner_id and handle.owner_id != owner_id:
+            return None
+        return handle
+
+    def status(self, handle: TurnHandle) -> ChatTurnStatus:
+        return handle.to_status(self.queue_position(handle), self.admission_position(handle))
+
+    def admission_position(self, handle: TurnHandle) -> Optional[int]:
+        if handle.status != "queued":
+            return None
+        return self._scheduler.position(handle.turn_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued_count(),
+            "max_queue_depth": self._max_queue_depth,
+            "scheduler": self._scheduler.stats(),
+        }
+
+    def queue_position(self, handle: TurnHandle) -> Optional[int]:
+        if handle.status != "queued":
+            return None
+        queue = self._queues.get(handle.session_id)
+        if not queue or handle not in queue:
+            return None
+        return queue.index(handle)
+
+    def cancel(self, turn_id: str, *, reason: str = "user") -> bool:
+        handle = self._turns.get(turn_id)
+        if not handle or not handle.task or handle.task.done():
+            return False
+        if handle.cancel_reason is None:
+            handle.cancel_reason = reason
+        handle.task.cancel()
+        logger.info(
+            "Cancelling turn %s (session=%s, reason=%s)", turn_id, handle.session_id, reason
+        )
+        return True
+
+    def cancel_session(self, session_id: str, *, reason: str) -> list[str]:
+        cancelled = []
+        for handle in list(self._turns.values()):
+            if handle.session_id == session_id and self.cancel(handle.turn_id, reason=reason):
+                cancelled.append(handle.turn_id)
+        return cancelled
+
+    async def shutdown(self) -> None:
+        """Cancel every unfinished turn (application shutdown)."""
+        tasks = [
+            handle.task
+            for handle in self._turns.values()
+            if handle.task and not handle.task.done()
+        ]
+        for handle in self._turns.values():
+            if handle.task in tasks:
+                handle.cancel_reason = handle.cancel_reason or "shutdown"
+                handle.task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        # 等待取消状态推送完成；监视任务在轮次结束后的下一次轮询退出，直接取消
+        for task in list(self._background):
+            if task.get_name().startswith("turn-watch:"):
+                task.cancel()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    async def _run(self, handle: TurnHandle, work: TurnWork) -> Any:
+        try:
+            await handle.ready.wait()
+            # 会话内轮到该 turn 后，再按 plan 权重等待全局执行槽
+            async with self._scheduler.slot(handle.turn_id, handle.plan):
+                handle.status = "running"
+                handle.started_at = _now()
+                self._announce(handle)
+                return await work()
+        finally:
+            self._leave_queue(handle)
+
+    def _leave_queue(self, handle: TurnHandle) -> None:
+        queue = self._queues.get(handle.session_id)
+        if not queue:
+            return
+        was_head = queue[0] is handle
+        try:
+            queue.remove(handle)
+        except ValueError:
+            return
+        if not queue:
+            self._queues.pop(handle.session_id, None)
+            return
+        if was_head:
+            queue[0].ready.set()
+        # 排在后面的轮次位置发生变化
+        for waiting in queue:
+            if waiting.status == "queued":
+                self._announce(waiting)
+
+    async def _watch_subscribers(self, handle: TurnHandle) -> None:
+        # 连续 orphan_timeout 秒没有 WebSocket 订阅者（例如用户关闭了标签页）即取消
+        assert handle.task is not None
+        idle = 0.0
+        while not handle.task.done():
+            await asyncio.sleep(self._poll_interval)
+            if self._streams.subscriber_count(handle.session_id) > 0:
+                idle = 0.0
+                continue
+            idle += self._poll_interval
+            if idle >= self._orphan_timeout:
+                self.cancel(handle.turn_id, reason="no_subscribers")
+                return
+
+    def _mark_finished(self, handle: TurnHandle) -> None:
+        assert handle.task is not None
+        # 尚未开始执行就被取消时 _run 的 finally 不会运行，这里兜底出队
+        self._leave_queue(handle)
+        handle.finished_at = _now()
+        if handle.task.cancelled():
+            handle.status = "cancelled"
+        elif handle.task.exception() is not None:
+            handle.status = "failed"
+            handle.error = handle.error or str(handle.task.exception())
+        else:
+            handle.status = "completed"
+        self._announce(handle)
+
+    def _announce(self, handle: TurnHandle) -> None:
+        # 状态变化通过 WebSocket 推送 turn 事件，前端据此更新“发送中”状态
+        event = turn_event(
+            turn_id=handle.turn_id,
+            status=handle.status,
+            queue_position=self.queue_position(handle),
+            admission_position=self.admission_position(handle),
+            cancel_reason=handle.cancel_reason,
+            error=handle.error,
+        )
+        self._spawn(
+            self._streams.broadcast(handle.session_id, event),
+            name=f"turn-announce:{handle.turn_id}",
+        )
+
+    def _spawn(self, coro: Coroutine[Any, Any, Any], *, name: str) -> None:
+        task = asyncio.create_task(coro, name=name)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background task %s failed", task.get_name(), exc_info=task.exception())
+
+    def _announce_waiting(self) -> None:
+        # 全局排队顺序变化时，推送各等待轮次的新位置
+        for handle in list(self._turns.values()):
+            if handle.status == "queued" and self._scheduler.position(handle.turn_id) is not None:
+                self._announce(handle)
+
+    def _trim_history(self) -> None:
+        # 只保留最近的已结束 turn，运行中的不会被淘汰
+        overflow = len(self._turns) - self._history_limit
+        if overflow <= 0:
+            return
+        for turn_id, handle in list(self._turns.items()):
+            if overflow <= 0:
+                break
+            if handle.task and handle.task.done():
+                self._turns.pop(turn_id, None)
+                overflow -= 1
+
+
+# 轮次状态、取消与全局调度只存在于单个进程内；共享之前禁止以多个 worker 运行
+_worker_lock: Optional[Any] = None
+
+
+def ensure_single_worker() -> None:
+    """Refuse to start a second worker; turns, cancellation and the scheduler are per process."""
+    global _worker_lock
+    workers = int(os.getenv("WEB_CONCURRENCY", "1") or "1")
+    if workers > 1:
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={workers}: turn state, cancellation and TURN_MAX_CONCURRENCY are "
+            "per-process; run a single worker"
+        )
+    if os.getenv("STREAM_BACKEND", "memory").strip().lower() != "unix" or _worker_lock is not None:
+        return
+    # 以 --workers 启动时不会设置 WEB_CONCURRENCY：同一 broker 下用文件锁保证只有一个 worker
+    path = os.getenv("STREAM_BROKER_PATH", "/tmp/mgx-stream.sock") + ".worker.lock"
+    handle = open(path, "a+")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        raise RuntimeError(
+            f"Another worker already holds {path}: turn state, cancellation and "
+            "TURN_MAX_CONCURRENCY are per-process; run a single worker"
+        ) from None
+    _worker_lock = handle
+
+
+turn_manager = TurnManager(
+    stream_manager,
+    scheduler=turn_scheduler,
+    max_queue_depth=int(os.getenv("TURN_QUEUE_MAX_DEPTH", "100")),
+    orphan_timeout=float(os.getenv("TURN_ORPHAN_TIMEOUT", "60")),
+)
+
+__all__ = [
+    "TurnCancelledError",
+    "TurnHandle",
+    "TurnManager",
+    "TurnOverloadedError",
+    "TurnWork",
+    "ensure_single_worker",
+    "turn_manager",
+]
@@ -0,0 +1,7 @@
+"""Offline benchmarks for the agent runtime.
+
+脚本均在进程内运行，使用 synthetic LLM provider 与离线沙箱（`SANDBOX_RUNTIME=offline`），
+结果写成 JSON 供 CI 对比趋势：
+
+    python -m benchmarks.workflow --output bench/workflow.json
+"""
@@ -0,0 +1,132 @@
+"""Shared helpers for the benchmark scripts: offline environment, I/O counters and JSON reports."""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+# workdir 下各数据子目录，workflow 基准分别统计其增长
+WORKDIR_LAYOUT = ["sessions", "state", "llm_logs", "logs", "sandboxes", "traces"]
+
+
+def configure_offline_env(workdir: Optional[Path] = None) -> Path:
+    """Point every configurable backend at a scratch directory and offline fakes.
+
+    必须在导入 `agents` / `app` 之前调用：各模块在导入时读取环境变量。已显式设置的变量保持不变。
+    """
+    workdir = workdir or Path(tempfile.mkdtemp(prefix="mgx-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    defaults = {
+        "AGENT_LLM_PROVIDER": "synthetic",
+        # 默认不模拟 token 间隔，测到的是编排器自身开销；需要真实节奏时覆盖这两个变量
+        "AGENT_LLM_SYNTHETIC_TTFT_MS": "0",
+        "AGENT_LLM_SYNTHETIC_TPS": "0",
+        "SANDBOX_RUNTIME": "offline",
+        "SANDBOX_BASE_PATH": str(workdir / "sandboxes"),
+        "SESSION_STORAGE_BACKEND": "file",
+        "SESSION_DATA_PATH": str(workdir / "sessions"),
+        "AGENT_STATE_DIR": str(workdir / "state"),
+        "AGENT_LLM_LOG_DIR": str(workdir / "llm_logs"),
+        "AGENT_CONTEXT_LOG_PATH": str(workdir / "logs" / "agent_context_logs.jsonl"),
+        "AGENT_TRACE_DIR": str(workdir / "traces"),
+        "AGENT_TURN_DEADLINE_SECONDS": "0",
+        "TURN_ORPHAN_TIMEOUT": "0",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    return workdir
+
+
+def io_write_bytes() -> Optional[int]:
+    """Bytes passed to write()-style syscalls by this process so far (Linux only)."""
+    try:
+        with open("/proc/self/io", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def tree_size(root: Path) -> int:
+    total = 0
+    if not root.exists():
+        return 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def percentiles(values: Iterable[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+
+    def pick(q: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+        return round(ordered[index], 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def environment_info() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_ROOT,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(report: Dict[str, Any], output: Optional[str]) -> None:
+    """Write the report as JSON to `output`, or to stdout when no path is given."""
+    text = json.dumps(report, ensure_ascii=False, indent=2, default=str)
+    if not output:
+        print(text)
+        return
+    path = Path(output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text + "\n", encoding="utf-8")
+
+
+__all__ = [
+    "BACKEND_ROOT",
+    "WORKDIR_LAYOUT",
+    "configure_offline_env",
+    "environment_info",
+    "io_write_bytes",
+    "percentiles",
+    "tree_size",
+    "write_report",
+]
@@ -0,0 +1,483 @@
+"""HTTP + WebSocket load generator for `app.main:app`.
+
+每个虚拟用户依次登录、创建会话、打开 `/api/ws/sessions/{id}` 事件流，然后在测试时长内循环
+发送消息（等待轮次结束后再思考 `--think-time` 秒）并按 `--tree-interval` 读取文件树。
+
+- 进程内（默认）：HTTP 走 `httpx.ASGITransport`，WebSocket 直接驱动 ASGI 应用，服务端使用
+  synthetic LLM 与离线沙箱，事件循环延迟同时反映服务端负载
+- 本地服务：`--base-url http://127.0.0.1:8000`，WebSocket 需要安装 `websockets`；服务端需自行以
+  `AGENT_LLM_PROVIDER=synthetic SANDBOX_RUNTIME=offline` 启动，事件循环延迟只反映压测客户端
+
+    python -m benchmarks.load --users 100 --duration 60 --ramp-up 10 --output bench/load.json
+
+报告包含各接口吞吐与延迟分位数、轮次完成延迟与首 token 延迟、事件送达延迟（收到时间减事件
+`timestamp`）以及事件循环延迟。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+import httpx
+
+from .common import configure_offline_env, environment_info, percentiles, write_report
+from .workflow import COMPLEX_REQUEST
+
+ACCOUNTS = [("demo@mgx.dev", "mgx-demo"), ("linda@mgx.dev", "mgx-linda")]
+SIMPLE_REQUEST = "帮我把首页标题改成“欢迎回来”"
+TERMINAL_TURN_STATES = {"completed", "failed", "cancelled"}
+
+Frame = Union[str, bytes]
+
+
+@dataclass(frozen=True)
+class LoadConfig:
+    users: int = 100
+    duration: float = 60.0  # 发送阶段的时长（秒），不含登录与建会话
+    ramp_up: float = 10.0  # 所有虚拟用户在该时间内均匀启动
+    messages_per_user: int = 0  # 每个用户最多发送的消息数，0 表示直到时长结束
+    think_time: float = 5.0  # 轮次结束到下一条消息之间的间隔
+    tree_interval: float = 5.0  # 读取文件树的间隔，0 表示不读取
+    complex_ratio: float = 0.2  # 走完整多 Agent 工作流的消息比例，其余为快路径请求
+    turn_timeout: float = 120.0
+    base_url: Optional[str] = None
+    seed: int = 0
+
+
+class Recorder:
+    """Collects request latencies, turn outcomes, stream events and loop lag."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter[str]] = defaultdict(Counter)
+        self.turns: Counter[str] = Counter()
+        self.turn_latency: List[float] = []
+        self.first_token: List[float] = []
+        self.events: Counter[str] = Counter()
+        self.event_bytes = 0
+        self.event_lag: List[float] = []
+        self.loop_lag: List[float] = []
+
+    @asynccontextmanager
+    async def request(self, name: str) -> AsyncIterator[Dict[str, Any]]:
+        outcome: Dict[str, Any] = {"status": "error"}
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except (httpx.HTTPError, OSError, asyncio.TimeoutError) as exc:
+            outcome["status"] = type(exc).__name__
+            raise
+        finally:
+            self.latencies[name].append((time.perf_counter() - started) * 1000)
+            self.statuses[name][str(outcome["status"])] += 1
+
+    def event(self, event: Dict[str, Any], size: int) -> None:
+        self.events[str(event.get("type"))] += 1
+        self.event_bytes += size
+        timestamp = event.get("timestamp")
+        if not timestamp:
+            return
+        try:
+            sent = datetime.fromisoformat(str(timestamp))
+        except ValueError:
+            return
+        if sent.tzinfo is None:
+            sent = sent.replace(tzinfo=timezone.utc)
+        self.event_lag.append((datetime.now(timezone.utc) - sent).total_seconds() * 1000)
+
+
+class _AsgiWebSocket:
+    """Minimal in-process WebSocket client that drives the ASGI app directly."""
+
+    def __init__(self, app, path: str, query: str = "") -> None:
+        self._app = app
+        self._scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "http_version": "1.1",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", 0),
+            "server": ("testserver", 80),
+            "subprotocols": [],
+            "state": {},
+        }
+        self._inbound: asyncio.Queue[Dict[str, Any]] = asyncio.Queue()
+        self._outbound: asyncio.Queue[Optional[Frame]] = asyncio.Queue()
+        self._accepted = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        await self._inbound.put({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self._app(self._scope, self._inbound.get, self._send))
+        accepted = asyncio.create_task(self._accepted.wait())
+        done, _ = await asyncio.wait({accepted, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        if accepted not in done:
+            accepted.cancel()
+            raise ConnectionError("WebSocket rejected by app")
+
+    async def recv(self) -> Optional[Frame]:
+        return await self._outbound.get()
+
+    async def close(self) -> None:
+        await self._inbound.put({"type": "websocket.disconnect", "code": 1000})
+        if self._task:
+            try:
+                await asyncio.wait_for(self._task, timeout=5)
+            except (asyncio.TimeoutError, Exception):
+                self._task.cancel()
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        kind = message["type"]
+        if kind == "websocket.accept":
+            self._accepted.set()
+        elif kind == "websocket.send":
+            text = message.get("text")
+            await self._outbound.put(text if text is not None else message.get("bytes"))
+        elif kind == "websocket.close":
+            await self._outbound.put(None)
+
+
+class _NetworkWebSocket:
+    """WebSocket client for a running server (requires the `websockets` package)."""
+
+    def __init__(self, url: str) -> None:
+        self._url = url
+        self._connection = None
+
+    async def connect(self) -> None:
+        try:
+            import websockets
+        except ImportError as exc:  # pragma: no cover - 取决于部署环境
+            raise RuntimeError(
+                "Load testing a running server requires the `websockets` package"
+            ) from exc
+        self._connection = await websockets.connect(self._url, max_size=None)
+
+    async def recv(self) -> Optional[Frame]:
+        try:
+            return await self._connection.recv()
+        except Exception:
+            return None
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+
+
+class VirtualUser:
+    def __init__(
+        self,
+        index: int,
+        *,
+        client: httpx.AsyncClient,
+        config: LoadConfig,
+        recorder: Recorder,
+        app=None,
+    ) -> None:
+        self.index = index
+        self._client = client
+        self._config = config
+        self._recorder = recorder
+        self._app = app
+        self._random = random.Random(config.seed + index)
+        self._headers: Dict[str, str] = {}
+        self._session_id: Optional[str] = None
+        self._turns: Dict[str, asyncio.Future] = {}
+        self._awaiting_first_token: Optional[float] = None
+
+    async def run(self, stop_at: float) -> None:
+        email, password = ACCOUNTS[self.index % len(ACCOUNTS)]
+        try:
+            async with self._recorder.request("login") as outcome:
+                response = await self._client.post(
+                    "/api/auth/login", json={"email": email, "password": password}
+                )
+                outcome["status"] = response.status_code
+            response.raise_for_status()
+            self._headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            async with self._recorder.request("create_session") as outcome:
+                response = await self._client.post(
+                    "/api/sessions", json={"title": f"load-{self.index}"}, headers=self._headers
+                )
+                outcome["status"] = response.status_code
+            response.raise_for_status()
+            self._session_id = response.json()["id"]
+        except httpx.HTTPError:
+            return
+
+        socket = self._open_socket(f"/api/ws/sessions/{self._session_id}")
+        try:
+            async with self._recorder.request("ws_connect") as outcome:
+                await socket.connect()
+                outcome["status"] = 101
+        except (ConnectionError, OSError, RuntimeError):
+            return
+        reader = asyncio.create_task(self._read_events(socket))
+        tree = None
+        if self._config.tree_interval > 0:
+            tree = asyncio.create_task(self._poll_tree(stop_at))
+        try:
+            await self._chat(stop_at)
+        finally:
+            if tree:
+                tree.cancel()
+            await socket.close()
+            reader.cancel()
+            await asyncio.gather(reader, *([tree] if tree else []), return_exceptions=True)
+
+    def _open_socket(self, path: str):
+        if self._config.base_url:
+            url = (
+                self._config.base_url.rstrip("/")
+                .replace("http://", "ws://", 1)
+                .replace("https://", "wss://", 1)
+            )
+            return _NetworkWebSocket(url + path)
+        return _AsgiWebSocket(self._app, path)
+
+    async def _chat(self, stop_at: float) -> None:
+        sent = 0
+        limit = self._config.messages_per_user
+        while time.monotonic() < stop_at and (limit <= 0 or sent < limit):
+            complex_turn = self._random.random() < self._config.complex_ratio
+            content = COMPLEX_REQUEST if complex_turn else SIMPLE_REQUEST
+            posted = time.perf_counter()
+            self._awaiting_first_token = posted
+            try:
+                async with self._recorder.request("post_message") as outcome:
+                    response = await self._client.post(
+                        "/api/chat/messages",
+                        json={"session_id": self._session_id, "content": content},
+                        headers=self._headers,
+                    )
+                    outcome["status"] = response.status_code
+            except httpx.HTTPError:
+                response = None
+            sent += 1
+            if response is None or response.status_code != 202:
+                self._awaiting_first_token = None
+                self._recorder.turns["rejected"] += 1
+                await self._sleep_until(stop_at, self._config.think_time)
+                continue
+            self._recorder.turns["submitted"] += 1
+            turn_id = response.json()["turn_id"]
+            try:
+                state = await asyncio.wait_for(
+                    self._turn_future(turn_id), timeout=self._config.turn_timeout
+                )
+            except asyncio.TimeoutError:
+                self._recorder.turns["timeout"] += 1
+            else:
+                self._recorder.turns[state] += 1
+                self._recorder.turn_latency.append((time.perf_counter() - posted) * 1000)
+            await self._sleep_until(stop_at, self._config.think_time)
+
+    async def _poll_tree(self, stop_at: float) -> None:
+        # 错开各用户的首次读取，避免所有请求集中在同一时刻
+        await asyncio.sleep(self._random.uniform(0, self._config.tree_interval))
+        while time.monotonic() < stop_at:
+            try:
+                async with self._recorder.request("file_tree") as outcome:
+                    response = await self._client.get(
+                        f"/api/files/{self._session_id}/tree", headers=self._headers
+                    )
+                    outcome["status"] = response.status_code
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(self._config.tree_interval)
+
+    async def _read_events(self, socket) -> None:
+        while True:
+            frame = await socket.recv()
+            if frame is None:
+                return
+            try:
+                event = json.loads(frame)
+            except (TypeError, ValueError):
+                continue
+            self._recorder.event(event, len(frame))
+            kind = event.get("type")
+            if kind == "token" and self._awaiting_first_token is not None:
+                waited = time.perf_counter() - self._awaiting_first_token
+                self._recorder.first_token.append(waited * 1000)
+                self._awaiting_first_token = None
+            elif kind == "turn" and event.get("status") in TERMINAL_TURN_STATES:
+                future = self._turn_future(str(event.get("turn_id")))
+                if not future.done():
+                    future.set_result(event["status"])
+
+    def _turn_future(self, turn_id: str) -> asyncio.Future:
+        # turn 事件可能先于 POST 响应到达，双方都通过同一个 future 交接
+        future = self._turns.get(turn_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._turns[turn_id] = future
+        return future
+
+    @staticmethod
+    async def _sleep_until(stop_at: float, delay: float) -> None:
+        await asyncio.sleep(max(0.0, min(delay, stop_at - time.monotonic())))
+
+
+async def _monitor_loop_lag(
+    recorder: Recorder, stop: asyncio.Event, interval: float = 0.05
+) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        recorder.loop_lag.append(max(0.0, (loop.time() - started - interval) * 1000))
+
+
+def _report(
+    config: LoadConfig, recorder: Recorder, elapsed: float, server: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    requests = {}
+    for name, values in recorder.latencies.items():
+        statuses = recorder.statuses[name]
+        ok = sum(
+            count for status, count in statuses.items() if status.isdigit() and int(status) < 400
+        )
+        requests[name] = {
+            "count": len(values),
+            "ok": ok,
+            "errors": len(values) - ok,
+            "throughput_rps": round(len(values) / elapsed, 3) if elapsed else None,
+            "status": dict(statuses),
+            "latency_ms": percentiles(values),
+        }
+    finished = sum(recorder.turns[state] for state in TERMINAL_TURN_STATES)
+    return {
+        "benchmark": "load",
+        "environment": environment_info(),
+        "config": asdict(config),
+        "mode": "url" if config.base_url else "in-process",
+        "elapsed_s": round(elapsed, 3),
+        "requests": requests,
+        "turns": {
+            **dict(recorder.turns),
+            "throughput_per_s": round(finished / elapsed, 3) if elapsed else None,
+            "latency_ms": percentiles(recorder.turn_latency),
+            "first_token_ms": percentiles(recorder.first_token),
+        },
+        "events": {
+            "received": sum(recorder.events.values()),
+            "per_second": round(sum(recorder.events.values()) / elapsed, 3) if elapsed else None,
+            "bytes": recorder.event_bytes,
+            "by_type": dict(recorder.events),
+            "delivery_lag_ms": percentiles(recorder.event_lag),
+        },
+        "event_loop_lag_ms": percentiles(recorder.loop_lag),
+        "server": server,
+    }
+
+
+async def _drive(
+    config: LoadConfig, client: httpx.AsyncClient, recorder: Recorder, app=None
+) -> float:
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop_lag(recorder, stop))
+    started = time.monotonic()
+    stop_at = started + config.ramp_up + config.duration
+    delay = config.ramp_up / config.users if config.users else 0
+
+    async def launch(index: int) -> None:
+        await asyncio.sleep(index * delay)
+        user = VirtualUser(index, client=client, config=config, recorder=recorder, app=app)
+        await user.run(stop_at)
+
+    try:
+        await asyncio.gather(*(launch(index) for index in range(config.users)))
+    finally:
+        stop.set()
+        await monitor
+    return time.monotonic() - started
+
+
+async def run_load(config: LoadConfig) -> Dict[str, Any]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if config.base_url:
+        async with httpx.AsyncClient(base_url=config.base_url, timeout=30, limits=limits) as client:
+            elapsed = await _drive(config, client, recorder)
+        return _report(config, recorder, elapsed, server=None)
+
+    from app.main import app
+    from app.services.stream import stream_manager
+    from app.services.stream_pipeline import event_pipelines
+    from app.services.turns import turn_manager
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://testserver", timeout=30
+        ) as client:
+            elapsed = await _drive(config, client, recorder, app=app)
+        pipelines = event_pipelines.snapshot()
+        server = {
+            "streams": stream_manager.stats(),
+            "pipelines": {"totals": pipelines["totals"], "lag_ms": pipelines["lag_ms"]},
+            "turns": turn_manager.stats(),
+        }
+    return _report(config, recorder, elapsed, server=server)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="HTTP + WebSocket load generator for the MGX backend"
+    )
+    parser.add_argument("--users", type=int, default=LoadConfig.users)
+    parser.add_argument("--duration", type=float, default=LoadConfig.duration)
+    parser.add_argument("--ramp-up", type=float, default=LoadConfig.ramp_up)
+    parser.add_argument("--messages-per-user", type=int, default=LoadConfig.messages_per_user)
+    parser.add_argument("--think-time", type=float, default=LoadConfig.think_time)
+    parser.add_argument("--tree-interval", type=float, default=LoadConfig.tree_interval)
+    parser.add_argument("--complex-ratio", type=float, default=LoadConfig.complex_ratio)
+    parser.add_argument("--turn-timeout", type=float, default=LoadConfig.turn_timeout)
+    parser.add_argument("--seed", type=int, default=LoadConfig.seed)
+    parser.add_argument(
+        "--base-url", default=None, help="target a running server instead of the in-process app"
+    )
+    parser.add_argument("--output", default=None, help="JSON report path (default: stdout)")
+    args = parser.parse_args()
+
+    if not args.base_url:
+        # 进程内压测使用接近真实节奏的 synthetic provider；显式设置的环境变量优先
+        os.environ.setdefault("AGENT_LLM_SYNTHETIC_TTFT_MS", "300")
+        os.environ.setdefault("AGENT_LLM_SYNTHETIC_TPS", "200")
+        configure_offline_env()
+    config = LoadConfig(
+        users=args.users,
+        duration=args.duration,
+        ramp_up=args.ramp_up,
+        messages_per_user=args.messages_per_user,
+        think_time=args.think_time,
+        tree_interval=args.tree_interval,
+        complex_ratio=args.complex_ratio,
+        turn_timeout=args.turn_timeout,
+        base_url=args.base_url,
+        seed=args.seed,
+    )
+    write_report(asyncio.run(run_load(config)), args.output)
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["LoadConfig", "Recorder", "VirtualUser", "run_load"]
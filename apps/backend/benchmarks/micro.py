@@ -0,0 +1,344 @@
+"""Microbenchmarks for per-turn parser, context and persistence hot paths.
+
+每个基准在小、大两个规模上各测一次（生成的输入：Agent 输出 10 KB / 100 KB、会话 100 / 1,000 条消息、
+工作区 1,000 / 10,000 个文件），并检查两类阈值：
+
+- `max_ms`：大规模下单次调用的中位耗时上限
+- `max_growth`：耗时增长倍数与规模增长倍数之比的上限；线性实现约为 1，
+  出现二次方级的扩展断崖时会远超阈值，这一项与机器快慢基本无关，适合在 CI 上拦截
+
+    python -m benchmarks.micro --output bench/micro.json
+    python -m benchmarks.micro --only extract_file_blocks --only file_service.list_tree
+    python -m benchmarks.micro --baseline bench/micro-main.json --max-regression 1.5
+
+有阈值未通过时以退出码 1 结束。
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from .common import configure_offline_env, environment_info, write_report
+
+_WORDS = (
+    "layout state router schema cache token render module query handler request response "
+    "config deploy metric widget session stream buffer commit review patch build test"
+).split()
+
+
+@dataclass(frozen=True)
+class MicroBenchmark:
+    name: str
+    unit: str
+    scales: tuple[int, int]  # (小规模, 大规模)
+    setup: Callable[[int, Path], Callable[[], Any]]  # 按规模生成输入，返回被计时的无参函数
+    max_ms: float
+    max_growth: float = 2.0
+
+
+def _prose(rng: random.Random, size: int) -> str:
+    words: List[str] = []
+    length = 0
+    while length < size:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+        if len(words) % 14 == 0:
+            words.append(".\n")
+    return " ".join(words)[:size]
+
+
+def agent_output(size_kb: int, *, seed: int = 0) -> str:
+    """Agent reply of roughly `size_kb` KB: prose, file/shell fences and tool result sections."""
+    rng = random.Random(seed)
+    chunks: List[str] = []
+    total = 0
+    index = 0
+    target = size_kb * 1024
+    while total < target:
+        chunk = (
+            f"{_prose(rng, 1200)}\n\n"
+            f"```file:src/module_{index}/view_{index}.tsx overwrite\n"
+            f"{_prose(rng, 1600)}\n```endfile\n\n"
+            f"```shell cwd=src timeout=60 env:NODE_ENV=test\n"
+            f"npm run build -- --filter module_{index}\n```endshell\n\n"
+            f"[文件写入 {index}]\n- src/module_{index}/view_{index}.tsx (size 1600)\n"
+            f"- docs/module_{index}.md\n\n"
+            f"[Sandbox Shell 执行 {index}]\n- npm run build -- --filter module_{index}\n\n"
+            f"- [ ] 补充 module_{index} 的单元测试\n"
+        )
+        chunks.append(chunk)
+        total += len(chunk)
+        index += 1
+    return "".join(chunks)
+
+
+def _setup_file_blocks(size_kb: int, _: Path) -> Callable[[], Any]:
+    from agents.utils.file_blocks import extract_file_blocks
+
+    text = agent_output(size_kb)
+    return lambda: extract_file_blocks(text)
+
+
+def _setup_shell_blocks(size_kb: int, _: Path) -> Callable[[], Any]:
+    from agents.utils.shell_blocks import extract_shell_blocks
+
+    text = agent_output(size_kb)
+    return lambda: extract_shell_blocks(text)
+
+
+def _setup_artifact_entries(size_kb: int, _: Path) -> Callable[[], Any]:
+    from agents.context.providers import _extract_artifact_entries
+
+    text = agent_output(size_kb)
+    return lambda: _extract_artifact_entries(text)
+
+
+def _setup_summarize(size_kb: int, _: Path) -> Callable[[], Any]:
+    from agents.workflows.orchestrator import SequentialWorkflow
+
+    workflow = SequentialWorkflow()
+    text = agent_output(size_kb)
+    todos = [f"补充 module_{index} 的单元测试" for index in range(5)]
+    return lambda: workflow._summarize_agent_result(
+        agent="Alex", text=text, task_focus="实现任务看板", todos=todos
+    )
+
+
+def _setup_compose_context(size_kb: int, _: Path) -> Callable[[], Any]:
+    from agents.agents.base import AgentContext, BaseAgent
+    from agents.context.models import ActionLogEntry, TodoEntry
+
+    # 上下文各段按规模放大：文件概览、近期写入、历史时间线、action log 与 TODO
+    rng = random.Random(1)
+    lines = max(1, size_kb * 1024 // 400)
+    agent = BaseAgent(name="Alex", description="benchmark")
+    context = AgentContext(
+        session_id="bench",
+        user_id="bench",
+        owner_id="bench",
+        user_message="实现任务看板",
+        files_overview="\n".join(
+            f"- src/module_{i}/view_{i}.tsx (size {i * 10})" for i in range(lines)
+        ),
+        artifacts="\n".join(f"- [文件写入]: src/module_{i}/view_{i}.tsx" for i in range(lines)),
+        history="\n".join(f"步骤 {i} · Alex: {_prose(rng, 120)}" for i in range(lines)),
+        action_log=[
+            ActionLogEntry(agent="Alex", action="act", result=_prose(rng, 120))
+            for _ in range(lines)
+        ],
+        pending_todos=[
+            TodoEntry(description=f"补充 module_{i} 的测试", owner="Alex") for i in range(lines)
+        ],
+    )
+    return lambda: agent._build_messages(
+        context, system_prompt="You are Alex.", task_prompt="实现任务看板"
+    )
+
+
+def _setup_list_tree(file_count: int, workdir: Path) -> Callable[[], Any]:
+    from agents.container.services.container import ContainerManager, SandboxConfig
+    from agents.container.services.filesystem import FileService, FileServiceConfig
+
+    sandbox = SandboxConfig(runtime="offline", base_path=workdir / f"tree-{file_count}")
+    manager = ContainerManager(sandbox)
+    # 默认 2000 条的展示上限会在大工作区直接报错，这里放开以测量完整遍历
+    config = FileServiceConfig(project_root=Path("."), max_entries=file_count * 2, max_depth=4)
+    service = FileService(manager, config)
+    session_id = f"tree-{file_count}"
+    root = service._resolve_base(session_id=session_id, owner_id="bench")
+    per_dir = 100
+    for index in range(file_count):
+        directory = root / f"pkg_{index // (per_dir * 10)}" / f"mod_{(index // per_dir) % 10}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"file_{index}.ts").write_text("export {}\n")
+    return lambda: service.list_tree(session_id=session_id, owner_id="bench", depth=4)
+
+
+def _setup_append_message(message_count: int, workdir: Path) -> Callable[[], Any]:
+    from app.services.session_repository import FileSessionRepository
+
+    repository = FileSessionRepository(workdir / f"sessions-{message_count}")
+    session_id = repository.create_session("bench").id
+    rng = random.Random(2)
+    for index in range(message_count):
+        repository.append_message(
+            session_id=session_id,
+            sender="user" if index % 2 == 0 else "agent",
+            agent=None if index % 2 == 0 else "Alex",
+            content=_prose(rng, 400),
+            owner_id="bench",
+        )
+    content = _prose(rng, 400)
+    return lambda: repository.append_message(
+        session_id=session_id, sender="agent", agent="Alex", content=content, owner_id="bench"
+    )
+
+
+# 阈值约为当前实现耗时的 10 倍，只用于拦截数量级的退化；扩展断崖主要靠 max_growth 捕获
+BENCHMARKS: List[MicroBenchmark] = [
+    MicroBenchmark("extract_file_blocks", "KB", (10, 100), _setup_file_blocks, max_ms=2.0),
+    MicroBenchmark("extract_shell_blocks", "KB", (10, 100), _setup_shell_blocks, max_ms=2.0),
+    MicroBenchmark(
+        "extract_artifact_entries", "KB", (10, 100), _setup_artifact_entries, max_ms=7.0
+    ),
+    MicroBenchmark("summarize_agent_result", "KB", (10, 100), _setup_summarize, max_ms=12.0),
+    MicroBenchmark("compose_context", "KB", (10, 100), _setup_compose_context, max_ms=2.0),
+    MicroBenchmark(
+        "file_service.list_tree", "files", (1_000, 10_000), _setup_list_tree, max_ms=2000.0
+    ),
+    MicroBenchmark(
+        "file_session_repository.append_message",
+        "messages",
+        (100, 1_000),
+        _setup_append_message,
+        max_ms=400.0,
+    ),
+]
+
+
+def measure(
+    fn: Callable[[], Any],
+    *,
+    rounds: int = 7,
+    min_round_seconds: float = 0.05,
+    max_loops: int = 10_000,
+) -> Dict[str, float]:
+    """Per-call timings in ms over several rounds, loop count calibrated like `timeit.autorange`."""
+    fn()  # 预热
+    loops = 1
+    while loops < max_loops:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - started >= min_round_seconds:
+            break
+        loops *= 2
+    samples: List[float] = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            samples.append((time.perf_counter() - started) * 1000 / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        "loops": loops,
+        "rounds": rounds,
+        "min_ms": round(min(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+    }
+
+
+def run_benchmark(benchmark: MicroBenchmark, workdir: Path) -> Dict[str, Any]:
+    small, large = benchmark.scales
+    timings = {str(scale): measure(benchmark.setup(scale, workdir)) for scale in (small, large)}
+    small_ms = timings[str(small)]["median_ms"]
+    large_ms = timings[str(large)]["median_ms"]
+    growth = (large_ms / small_ms) / (large / small) if small_ms > 0 else None
+    failures: List[str] = []
+    if large_ms > benchmark.max_ms:
+        failures.append(
+            f"median {large_ms:.3f}ms at {large} {benchmark.unit} exceeds {benchmark.max_ms}ms"
+        )
+    if growth is not None and growth > benchmark.max_growth:
+        failures.append(
+            f"scaling factor {growth:.2f} exceeds {benchmark.max_growth} (superlinear growth)"
+        )
+    return {
+        "unit": benchmark.unit,
+        "scales": list(benchmark.scales),
+        "timings": timings,
+        "growth": round(growth, 3) if growth is not None else None,
+        "thresholds": {"max_ms": benchmark.max_ms, "max_growth": benchmark.max_growth},
+        "failures": failures,
+    }
+
+
+def compare_baseline(
+    results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float
+) -> None:
+    """Flag benchmarks whose large-scale median regressed by more than `max_regression`x."""
+    for name, result in results.items():
+        previous = (baseline.get("benchmarks") or {}).get(name)
+        if not previous:
+            continue
+        scale = str(result["scales"][1])
+        before = previous.get("timings", {}).get(scale, {}).get("median_ms")
+        after = result["timings"][scale]["median_ms"]
+        if not before:
+            continue
+        ratio = after / before
+        result["baseline_ratio"] = round(ratio, 3)
+        if ratio > max_regression:
+            result["failures"].append(
+                f"{ratio:.2f}x slower than baseline ({before:.3f}ms -> {after:.3f}ms)"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for per-turn hot paths")
+    parser.add_argument(
+        "--only", action="append", choices=[b.name for b in BENCHMARKS], help="run a subset"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=None, help="previous report to compare against"
+    )
+    parser.add_argument(
+        "--max-regression", type=float, default=1.5, help="allowed slowdown versus --baseline"
+    )
+    parser.add_argument(
+        "--workdir", type=Path, default=None, help="scratch directory (default: a new temp dir)"
+    )
+    parser.add_argument("--output", default=None, help="JSON report path (default: stdout)")
+    args = parser.parse_args()
+
+    workdir = configure_offline_env(args.workdir)
+    selected = [b for b in BENCHMARKS if not args.only or b.name in args.only]
+    results: Dict[str, Any] = {}
+    for benchmark in selected:
+        results[benchmark.name] = run_benchmark(benchmark, workdir)
+        status = "FAIL" if results[benchmark.name]["failures"] else "ok"
+        large = str(benchmark.scales[1])
+        result = results[benchmark.name]
+        print(
+            f"{status:4} {benchmark.name}: {result['timings'][large]['median_ms']:.3f}ms "
+            f"@ {large} {benchmark.unit}, growth {result['growth']}",
+            file=sys.stderr,
+        )
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        compare_baseline(results, baseline, args.max_regression)
+    failed = sorted(name for name, result in results.items() if result["failures"])
+    write_report(
+        {
+            "benchmark": "micro",
+            "environment": environment_info(),
+            "benchmarks": results,
+            "failed": failed,
+        },
+        args.output,
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["BENCHMARKS", "MicroBenchmark", "agent_output", "measure", "run_benchmark"]
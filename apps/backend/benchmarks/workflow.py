@@ -0,0 +1,323 @@
+"""End-to-end offline benchmark for `AgentExecutor.handle_user_turn`.
+
+使用 synthetic 流式 provider、离线沙箱（只维护工作目录，不启动 docker）以及真实的会话仓库、
+状态存储、事件 pipeline 与 stream manager，逐个场景运行完整轮次并记录：
+
+- 延迟：整轮耗时、按 span 名汇总的耗时（来自 tracing waterfall）、各 Agent 的 LLM 交互耗时
+- 事件：按类型统计推送的事件数与序列化字节数
+- 磁盘：进程写入字节数（/proc/self/io 的 wchar）与各数据目录的增长
+- 内存：tracemalloc 峰值与进程最大 RSS
+
+    python -m benchmarks.workflow --scenario six_agent_turn --repeat 5 --output bench/workflow.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from .common import (
+    WORKDIR_LAYOUT,
+    configure_offline_env,
+    environment_info,
+    io_write_bytes,
+    percentiles,
+    tree_size,
+    write_report,
+)
+
+OWNER_ID = "bench-user"
+# 写入报告的配置项，便于对比不同 CI 运行的条件是否一致
+REPORTED_ENV = [
+    "AGENT_LLM_PROVIDER",
+    "AGENT_LLM_SYNTHETIC_TTFT_MS",
+    "AGENT_LLM_SYNTHETIC_TPS",
+    "AGENT_LLM_SYNTHETIC_TOKENS",
+    "AGENT_LLM_SYNTHETIC_FILE_BLOCKS",
+    "AGENT_LLM_SYNTHETIC_SHELL_BLOCKS",
+    "SANDBOX_RUNTIME",
+    "SESSION_STORAGE_BACKEND",
+    "STREAM_PIPELINE_QUEUE",
+    "AGENT_TRACE_EXPORT",
+]
+
+COMPLEX_REQUEST = (
+    "请设计并实现一个团队任务看板 Web 应用：先整理需求与验收标准，再给出系统架构和接口设计，"
+    "完成前后端代码与部署脚本，最后补充数据统计报表和上线前的检查清单。"
+)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    description: str
+    workflow: str = "sequential"
+    history_messages: int = 0  # 轮次开始前预先写入会话的历史消息数
+    history_chars: int = 400  # 每条历史消息的长度
+    user_message: str = COMPLEX_REQUEST
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario(
+            name="six_agent_turn",
+            description="Fresh session, Mike plus all five specialists in the sequential workflow",
+        ),
+        Scenario(
+            name="session_200_messages",
+            description="Same turn on a session that already holds 200 messages",
+            history_messages=200,
+        ),
+        Scenario(
+            name="six_agent_turn_dag",
+            description=(
+                "Fresh session, DAG workflow (Mike plans once, independent agents run in parallel)"
+            ),
+            workflow="dag",
+        ),
+    )
+}
+
+
+class _CountingPublisher:
+    """Wraps the real pipeline publisher and counts events by type."""
+
+    def __init__(self, inner) -> None:
+        self._inner = inner
+        self.counts: Counter[str] = Counter()
+        self.bytes = 0
+
+    async def __call__(self, event: Dict[str, Any]) -> None:
+        self.counts[str(event.get("type"))] += 1
+        self.bytes += len(json.dumps(event, ensure_ascii=False, default=str).encode("utf-8"))
+        await self._inner(event)
+
+
+def _seed_history(repository, session_id: str, scenario: Scenario) -> None:
+    repeated = "历史消息内容 lorem ipsum dolor sit amet " * (scenario.history_chars // 20 + 1)
+    filler = repeated[: scenario.history_chars]
+    agents = ["Mike", "Emma", "Bob", "Alex", "David", "Iris"]
+    for index in range(scenario.history_messages):
+        if index % 2 == 0:
+            repository.append_message(
+                session_id=session_id,
+                sender="user",
+                content=f"#{index} {filler}",
+                owner_id=OWNER_ID,
+            )
+        else:
+            repository.append_message(
+                session_id=session_id,
+                sender="agent",
+                agent=agents[(index // 2) % len(agents)],
+                content=f"#{index} {filler}",
+                owner_id=OWNER_ID,
+            )
+
+
+def _agent_breakdown(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    # 每次 LLM 交互（含推流与落库）按 Agent 汇总，Mike 的规划/复盘/汇总也计入
+    per_agent: Dict[str, Dict[str, float]] = {}
+    for span in spans:
+        if span["name"] not in ("agent.stream_llm_response", "agent.stream_routing_decision"):
+            continue
+        agent = str(span["attributes"].get("agent") or "unknown")
+        entry = per_agent.setdefault(agent, {"calls": 0, "total_ms": 0.0})
+        entry["calls"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + (span["duration_ms"] or 0), 3)
+    return per_agent
+
+
+async def _run_once(scenario: Scenario, *, workdir: Path, track_memory: bool) -> Dict[str, Any]:
+    from agents.config import default_registry
+    from agents.runtime import AgentExecutor, build_workflow
+    from agents.tools.registry import get_tool_executor
+    from agents.utils.tracing import tracer
+    from app.services.agent_runtime import agent_runtime_gateway  # noqa: F401  注册会话仓库与文件变更钩子
+    from app.services.session_repository import session_repository
+    from app.services.stream_pipeline import event_pipelines
+
+    executor = AgentExecutor(
+        registry=default_registry,
+        workflow=build_workflow(scenario.workflow),
+        tool_executor=get_tool_executor(),
+    )
+    session_id = session_repository.create_session(OWNER_ID).id
+    _seed_history(session_repository, session_id, scenario)
+    publisher = _CountingPublisher(event_pipelines.publisher(session_id))
+
+    def persist(sender, agent, content, message_id, timestamp):
+        return session_repository.append_message(
+            session_id=session_id,
+            sender=sender,
+            agent=agent,
+            content=content,
+            owner_id=OWNER_ID,
+            message_id=message_id,
+            timestamp=timestamp,
+        )
+
+    roots = {"workdir": workdir, **{name: workdir / name for name in WORKDIR_LAYOUT}}
+    sizes_before = {name: tree_size(root) for name, root in roots.items()}
+    written_before = io_write_bytes()
+    if track_memory:
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+    turn_id = uuid4().hex
+    started = time.perf_counter()
+    messages = await executor.handle_user_turn(
+        session_id=session_id,
+        owner_id=OWNER_ID,
+        user_id=OWNER_ID,
+        user_message=scenario.user_message,
+        stream_publisher=publisher,
+        persist_fn=persist,
+        turn_id=turn_id,
+    )
+    await event_pipelines.drain(session_id)
+    wall_ms = (time.perf_counter() - started) * 1000
+    peak_bytes = tracemalloc.get_traced_memory()[1] - memory_before if track_memory else None
+    written_after = io_write_bytes()
+
+    waterfall = tracer.waterfall(turn_id) or {"spans": [], "by_name": {}}
+    phases: Dict[str, float] = {}
+    for span in waterfall["spans"]:
+        if span["depth"] == 1:
+            total = phases.get(span["name"], 0.0) + (span["duration_ms"] or 0)
+            phases[span["name"]] = round(total, 3)
+    return {
+        "wall_ms": round(wall_ms, 3),
+        "messages_persisted": len(messages),
+        "latency": {
+            "phases_ms": phases,
+            "by_span": waterfall["by_name"],
+            "by_agent": _agent_breakdown(waterfall["spans"]),
+        },
+        "events": {
+            "total": sum(publisher.counts.values()),
+            "bytes": publisher.bytes,
+            "by_type": dict(publisher.counts),
+        },
+        "disk": {
+            "bytes_written": (
+                written_after - written_before
+                if written_before is not None and written_after is not None
+                else None
+            ),
+            "growth_bytes": {
+                name: tree_size(root) - sizes_before[name] for name, root in roots.items()
+            },
+        },
+        "memory": {
+            "peak_traced_bytes": peak_bytes,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+    }
+
+
+def _summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def mean(values: List[Optional[float]]) -> Optional[float]:
+        present = [value for value in values if value is not None]
+        return round(sum(present) / len(present), 3) if present else None
+
+    return {
+        "wall_ms": percentiles(run["wall_ms"] for run in runs),
+        "events_total": mean([run["events"]["total"] for run in runs]),
+        "disk_bytes_written": mean([run["disk"]["bytes_written"] for run in runs]),
+        "peak_traced_bytes": max(
+            (
+                run["memory"]["peak_traced_bytes"]
+                for run in runs
+                if run["memory"]["peak_traced_bytes"] is not None
+            ),
+            default=None,
+        ),
+        "max_rss_kb": max(run["memory"]["max_rss_kb"] for run in runs),
+    }
+
+
+async def run_benchmarks(
+    scenarios: List[Scenario], *, repeat: int, warmup: int, workdir: Path, track_memory: bool
+) -> Dict[str, Any]:
+    if track_memory:
+        tracemalloc.start()
+    results: Dict[str, Any] = {}
+    try:
+        for scenario in scenarios:
+            for _ in range(warmup):
+                await _run_once(scenario, workdir=workdir, track_memory=False)
+            runs = [
+                await _run_once(scenario, workdir=workdir, track_memory=track_memory)
+                for _ in range(repeat)
+            ]
+            results[scenario.name] = {
+                "scenario": asdict(scenario),
+                "summary": _summarize(runs),
+                "runs": runs,
+            }
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+    return {
+        "benchmark": "workflow",
+        "environment": environment_info(),
+        "config": {
+            "repeat": repeat,
+            "warmup": warmup,
+            "tracemalloc": track_memory,
+            "workdir": str(workdir),
+            "env": {key: os.environ.get(key) for key in REPORTED_ENV},
+        },
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline end-to-end workflow benchmark")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="scenario to run (repeatable, default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="measured runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs per scenario")
+    parser.add_argument(
+        "--workdir", type=Path, default=None, help="scratch directory (default: a new temp dir)"
+    )
+    parser.add_argument(
+        "--no-tracemalloc", action="store_true", help="skip peak memory tracking (less overhead)"
+    )
+    parser.add_argument("--output", default=None, help="JSON report path (default: stdout)")
+    args = parser.parse_args()
+
+    workdir = configure_offline_env(args.workdir)
+    scenarios = [SCENARIOS[name] for name in (args.scenario or SCENARIOS)]
+    report = asyncio.run(
+        run_benchmarks(
+            scenarios,
+            repeat=args.repeat,
+            warmup=args.warmup,
+            workdir=workdir,
+            track_memory=not args.no_tracemalloc,
+        )
+    )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["SCENARIOS", "Scenario", "run_benchmarks"]
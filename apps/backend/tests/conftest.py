@@ -0,0 +1,151 @@
+"""Shared pytest setup: offline backend environment and a stand-in OpenAI-compatible server."""
+
+from __future__ import annotations
+
+import json
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+from benchmarks.common import configure_offline_env
+
+# 必须在导入 `agents` / `app` 之前设置：各模块在导入时读取环境变量（离线沙箱、临时数据目录）
+_WORKDIR = configure_offline_env(Path(tempfile.mkdtemp(prefix="mgx-test-")))
+
+
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """Minimal `/v1/models` + `/v1/chat/completions` server recording every request."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubLLMHandler)
+        self.models: List[str] = ["stub-model", "stub-model-large"]
+        self.reply = "Hello"
+        # 流式响应按原样写出的 SSE 行，测试可替换以覆盖边界情况
+        self.stream_lines: List[str] = _default_stream_lines()
+        self.fail_status: Optional[int] = None
+        self.fail_body = "upstream exploded"
+        self.requests: List[Dict[str, Any]] = []
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def completions(self) -> List[Dict[str, Any]]:
+        return [entry["body"] for entry in self.requests if entry["path"] == "/v1/chat/completions"]
+
+
+def _default_stream_lines() -> List[str]:
+    def chunk(delta: Dict[str, Any], **extra: Any) -> str:
+        return "data: " + json.dumps({"choices": [{"index": 0, "delta": delta}], **extra})
+
+    return [
+        chunk({"role": "assistant"}),
+        "",
+        ": keep-alive",
+        chunk({"content": "Hel"}),
+        "data: {not json",
+        chunk({"content": "lo"}),
+        "data: "
+        + json.dumps(
+            {
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": 12,
+                    "completion_tokens": 2,
+                    "prompt_tokens_details": {"cached_tokens": 8},
+                },
+            }
+        ),
+        "data: [DONE]",
+        chunk({"content": "after done"}),
+    ]
+
+
+class _StubLLMHandler(BaseHTTPRequestHandler):
+    server: StubLLMServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.server.requests.append(
+            {"method": "GET", "path": self.path, "headers": dict(self.headers)}
+        )
+        if self.path != "/v1/models":
+            self._send_json(404, {"error": "not found"})
+            return
+        if self.server.fail_status is not None:
+            self._send_text(self.server.fail_status, self.server.fail_body)
+            return
+        models = [{"id": model} for model in self.server.models]
+        self._send_json(200, {"object": "list", "data": models})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests.append(
+            {"method": "POST", "path": self.path, "headers": dict(self.headers), "body": body}
+        )
+        if self.path != "/v1/chat/completions":
+            self._send_json(404, {"error": "not found"})
+            return
+        if self.server.fail_status is not None:
+            self._send_text(self.server.fail_status, self.server.fail_body)
+            return
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for line in self.server.stream_lines:
+                self.wfile.write(f"{line}\n".encode())
+                self.wfile.flush()
+            return
+        message = {"role": "assistant", "content": self.server.reply}
+        self._send_json(
+            200,
+            {
+                "choices": [{"index": 0, "message": message}],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 1},
+            },
+        )
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, status: int, text: str) -> None:
+        data = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def llm_server() -> Iterator[StubLLMServer]:
+    server = StubLLMServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5)
@@ -0,0 +1,210 @@
+"""OpenAICompatibleProvider against a local stand-in server: SSE, discovery, options, errors."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from agents.llm import LLMConfig, LLMProviderError, LLMService
+from agents.llm.providers import OpenAICompatibleProvider
+
+
+def _provider(server: Any, **kwargs: Any) -> OpenAICompatibleProvider:
+    return OpenAICompatibleProvider(base_url=server.base_url, **kwargs)
+
+
+def _service(provider: OpenAICompatibleProvider) -> LLMService:
+    # LLMConfig 的默认值在导入时读取环境变量（测试环境为 synthetic），这里显式指定 local
+    service = LLMService(LLMConfig(default_provider="local"))
+    service.register_provider("local", provider)
+    return service
+
+
+async def _collect(provider: OpenAICompatibleProvider, **kwargs: Any) -> List[str]:
+    try:
+        return [chunk async for chunk in provider.stream_generate(prompt="hi", **kwargs)]
+    finally:
+        await provider.aclose()
+
+
+def test_stream_generate_yields_content_deltas(llm_server):
+    usage: Dict[str, int] = {}
+    chunks = asyncio.run(_collect(_provider(llm_server, model="stub-model"), usage=usage))
+
+    # 跳过 role-only / 空行 / 注释 / 非 JSON 行，[DONE] 之后的内容不再读取
+    assert chunks == ["Hel", "lo"]
+    assert usage == {"prompt_tokens": 12, "completion_tokens": 2, "cached_tokens": 8}
+    (body,) = llm_server.completions()
+    assert body["stream"] is True
+    assert body["stream_options"] == {"include_usage": True}
+    assert body["messages"] == [{"role": "user", "content": "hi"}]
+
+
+def test_stream_generate_handles_data_lines_without_space(llm_server):
+    llm_server.stream_lines = [
+        'data:{"choices":[{"delta":{"content":"a"}}]}',
+        'data:{"choices":[{"delta":{"content":"b"}}]}',
+        "data:[DONE]",
+    ]
+    chunks = asyncio.run(_collect(_provider(llm_server, model="stub-model")))
+
+    assert chunks == ["a", "b"]
+
+
+def test_list_models_reads_models_endpoint(llm_server):
+    async def run() -> List[str]:
+        provider = _provider(llm_server, api_key="secret")
+        try:
+            return await provider.list_models()
+        finally:
+            await provider.aclose()
+
+    assert asyncio.run(run()) == ["stub-model", "stub-model-large"]
+    (request,) = llm_server.requests
+    assert request["path"] == "/v1/models"
+    assert request["headers"]["Authorization"] == "Bearer secret"
+
+
+def test_empty_model_is_discovered_once(llm_server):
+    async def run() -> List[str]:
+        provider = _provider(llm_server, model="")
+        try:
+            return [await provider.generate(prompt="one"), await provider.generate(prompt="two")]
+        finally:
+            await provider.aclose()
+
+    assert asyncio.run(run()) == ["Hello", "Hello"]
+    assert [entry["path"] for entry in llm_server.requests].count("/v1/models") == 1
+    assert [body["model"] for body in llm_server.completions()] == ["stub-model", "stub-model"]
+
+
+def test_explicit_model_skips_discovery(llm_server):
+    async def run() -> str:
+        provider = _provider(llm_server, model="")
+        try:
+            return await provider.generate(prompt="hi", model="chosen")
+        finally:
+            await provider.aclose()
+
+    asyncio.run(run())
+    assert all(entry["path"] != "/v1/models" for entry in llm_server.requests)
+    assert llm_server.completions()[0]["model"] == "chosen"
+
+
+def test_discovery_without_models_fails(llm_server):
+    llm_server.models = []
+
+    async def run() -> str:
+        provider = _provider(llm_server, model="")
+        try:
+            return await _service(provider).generate(prompt="hi", provider="local")
+        finally:
+            await provider.aclose()
+
+    with pytest.raises(LLMProviderError, match="no models available"):
+        asyncio.run(run())
+
+
+def test_completion_options_are_passed_through(llm_server):
+    async def run() -> None:
+        provider = _provider(llm_server, model="stub-model")
+        try:
+            await provider.generate(
+                prompt="json please",
+                response_format={"type": "json_object"},
+                max_tokens=64,
+                stop=["\n\n"],
+            )
+            await provider.generate(prompt="plain")
+            async for _ in provider.stream_generate(
+                prompt="stream json", response_format={"type": "json_object"}
+            ):
+                pass
+        finally:
+            await provider.aclose()
+
+    asyncio.run(run())
+    with_options, plain, streamed = llm_server.completions()
+    assert with_options["response_format"] == {"type": "json_object"}
+    assert with_options["max_tokens"] == 64
+    assert with_options["stop"] == ["\n\n"]
+    # 未显式指定时不发送可选参数，保持默认请求不变
+    assert not {"response_format", "max_tokens", "stop"} & set(plain)
+    assert streamed["response_format"] == {"type": "json_object"}
+
+
+def test_service_passes_response_format_to_provider(llm_server):
+    async def run() -> str:
+        provider = _provider(llm_server, model="stub-model")
+        try:
+            return await _service(provider).generate(
+                prompt="hi", provider="local", response_format={"type": "json_object"}
+            )
+        finally:
+            await provider.aclose()
+
+    assert asyncio.run(run()) == "Hello"
+    assert llm_server.completions()[0]["response_format"] == {"type": "json_object"}
+
+
+@pytest.mark.parametrize("status", [400, 500, 503])
+def test_generate_http_error_maps_to_provider_error(llm_server, status):
+    llm_server.fail_status = status
+
+    async def run() -> str:
+        provider = _provider(llm_server, model="stub-model")
+        try:
+            return await _service(provider).generate(prompt="hi", provider="local")
+        finally:
+            await provider.aclose()
+
+    with pytest.raises(LLMProviderError, match="upstream exploded") as excinfo:
+        asyncio.run(run())
+    assert isinstance(excinfo.value.__cause__, RuntimeError)
+
+
+def test_stream_http_error_maps_to_provider_error(llm_server):
+    llm_server.fail_status = 500
+
+    async def run() -> List[str]:
+        provider = _provider(llm_server, model="stub-model")
+        try:
+            service = _service(provider)
+            return [chunk async for chunk in service.stream_generate(prompt="hi", provider="local")]
+        finally:
+            await provider.aclose()
+
+    with pytest.raises(LLMProviderError, match="upstream exploded"):
+        asyncio.run(run())
+
+
+def test_model_discovery_error_maps_to_provider_error(llm_server):
+    llm_server.fail_status = 502
+
+    async def run() -> List[str]:
+        provider = _provider(llm_server)
+        try:
+            return await _service(provider).list_models("local")
+        finally:
+            await provider.aclose()
+
+    with pytest.raises(LLMProviderError, match="model discovery failed"):
+        asyncio.run(run())
+
+
+def test_connection_error_maps_to_provider_error(llm_server):
+    base_url = llm_server.base_url
+    llm_server.shutdown()
+    llm_server.server_close()
+
+    async def run() -> str:
+        provider = OpenAICompatibleProvider(base_url=base_url, model="stub-model")
+        try:
+            return await _service(provider).generate(prompt="hi", provider="local")
+        finally:
+            await provider.aclose()
+
+    with pytest.raises(LLMProviderError):
+        asyncio.run(run())
@@ -3,7 +3,8 @@
 import { Dispatch, SetStateAction, useCallback, useEffect, useMemo, useState } from "react";
 
 import { API_BASE } from "@/lib/api/chat";
-import type { Message, SenderRole, StreamEvent } from "@/types/chat";
+import { STREAM_QUERY, decodeCompactEvent, matchesDigest } from "@/lib/streamCodec";
+import type { Message, SenderRole } from "@/types/chat";
 
 interface UseSessionStreamArgs {
   sessionId?: string;
@@ -39,6 +40,12 @@ export function useSessionStream({
     const activeSessionId = sessionId;
     let socket: WebSocket | null = null;
     let cancelled = false;
+    // 已处理的最大 sequence 及其 epoch，断线重连时通过 ?since=&epoch= 只补发缺失的事件
+    let lastSequence: number | null = null;
+    let lastEpoch: string | null = null;
+    // 当前连接是否已收到过事件
+    let receivedOnSocket = false;
+    let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
 
     const resolveWsBase = () => {
       const configured = process.env.NEXT_PUBLIC_WS_BASE_URL;
@@ -56,26 +63,44 @@ export function useSessionStream({
     };
 
     const wsBase = resolveWsBase();
-    const url = `${wsBase}/api/ws/sessions/${activeSessionId}`;
-    try {
-      socket = new WebSocket(url);
-    } catch (err) {
-      console.error("WebSocket connection failed", err);
-      return;
-    }
 
-    socket.onmessage = (event) => {
+    const handleMessage = (event: MessageEvent) => {
       if (cancelled) return;
       try {
-        const data = JSON.parse(event.data) as StreamEvent;
+        // 使用短键 JSON，final 可能只带 checksum/length（见 lib/streamCodec）
+        const data = decodeCompactEvent(JSON.parse(event.data));
         const effectiveSession = data.session_id ?? activeSessionId;
         if (!effectiveSession || effectiveSession !== activeSessionId) return;
 
+        if (typeof data.sequence === "number") {
+          const firstOnSocket = !receivedOnSocket;
+          receivedOnSocket = true;
+          if (data.epoch && data.epoch !== lastEpoch) {
+            // 服务端或 broker 重启后序号重新计数，旧的 sequence 不再可比
+            lastSequence = null;
+            lastEpoch = data.epoch;
+          } else if (firstOnSocket && !data.epoch && lastSequence !== null && data.sequence <= lastSequence) {
+            // 不带 epoch 的服务端：新连接的首个事件不大于 since 同样说明序号已重置
+            lastSequence = null;
+          }
+          if (lastSequence !== null && data.sequence <= lastSequence) return;
+          lastSequence = data.sequence;
+        }
+
         if (data.type === "file_change") {
           setFileVersion((prev) => prev + 1);
           return;
         }
 
+        if (data.type === "turn") {
+          // 后台轮次状态：排队或执行中保持“发送中”，结束后解除
+          setIsSending(data.status === "queued" || data.status === "running");
+          if (data.status === "failed" && data.error) {
+            setError(data.error);
+          }
+          return;
+        }
+
         const messageId = data.message_id ?? "";
         if (!messageId) return;
         const stableMessageId = messageId;
@@ -144,6 +169,13 @@ export function useSessionStream({
                 };
 
           if (data.final) {
+            if (
+              data.checksum !== undefined &&
+              data.length !== undefined &&
+              !matchesDigest(updated.content, data.checksum, data.length)
+            ) {
+              console.warn("Stream digest mismatch", stableMessageId);
+            }
             mergeMessages({
               ...updated,
               timestamp: baseMessage.timestamp,
@@ -159,12 +191,35 @@ export function useSessionStream({
       }
     };
 
-    socket.onerror = (event) => {
-      console.error("WebSocket error", event);
+    const connect = () => {
+      const params = new URLSearchParams(STREAM_QUERY);
+      if (lastSequence !== null) params.set("since", String(lastSequence));
+      if (lastEpoch !== null) params.set("epoch", lastEpoch);
+      const query = `?${params.toString()}`;
+      receivedOnSocket = false;
+      const url = `${wsBase}/api/ws/sessions/${activeSessionId}${query}`;
+      try {
+        socket = new WebSocket(url);
+      } catch (err) {
+        console.error("WebSocket connection failed", err);
+        return;
+      }
+      socket.onmessage = handleMessage;
+      socket.onerror = (event) => {
+        console.error("WebSocket error", event);
+      };
+      socket.onclose = () => {
+        if (cancelled) return;
+        // 被服务端断开（例如慢连接被淘汰）后自动重连续传
+        reconnectTimer = setTimeout(connect, 1000);
+      };
     };
 
+    connect();
+
     return () => {
       cancelled = true;
+      if (reconnectTimer) clearTimeout(reconnectTimer);
       resetStreamingMessages();
       socket?.close();
     };
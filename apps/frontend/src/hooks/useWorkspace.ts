@@ -7,6 +7,7 @@ import {
   createSession,
   deleteSession,
   fetchMessages,
+  fetchTurn,
   listSessions,
   sendMessage,
 } from "@/lib/api/chat";
@@ -14,6 +15,9 @@ import { useAuth } from "@/hooks/useAuth";
 import { useSessionStream } from "@/hooks/useSessionStream";
 import type { Message, Session } from "@/types/chat";
 
+// WebSocket 断开或漏掉 turn 事件时，轮询轮次状态作为兜底
+const TURN_POLL_INTERVAL_MS = 5000;
+
 interface UseWorkspaceResult {
   user: ReturnType<typeof useAuth>["user"];
   logout: ReturnType<typeof useAuth>["logout"];
@@ -46,6 +50,7 @@ export function useWorkspace(): UseWorkspaceResult {
   const [isSending, setIsSending] = useState(false); // 是否正在发送消息或加载会话
   const [isLoadingSessions, setIsLoadingSessions] = useState(false); // 会话列表是否处于加载中
   const [error, setError] = useState<string | null>(null); // 全局错误提示
+  const [pendingTurn, setPendingTurn] = useState<{ turnId: string; sessionId: string } | null>(null); // 最近提交、尚未结束的轮次
 
   const isHomeView = !sessionId && messages.length === 0; // 判断是否显示首页视图
 
@@ -150,22 +155,13 @@ export function useWorkspace(): UseWorkspaceResult {
           agent: null,
         };
         mergeMessages(optimisticMessage);
-        // 向后端提交真实请求，并用真实回合替换掉乐观消息
+        // 提交后立即返回 202，回复通过 WebSocket 推送，turn 事件结束时解除“发送中”
         const turn = await sendMessage(token, activeSessionId, content);
-        // setMessages((prev) => {
-        //   const next = prev.filter((message) => message.id !== optimisticId);
-        //   const upsert = (item: Message) => {
-        //     const index = next.findIndex((message) => message.id === item.id);
-        //     if (index >= 0) {
-        //       next[index] = item;
-        //     } else {
-        //       next.push(item);
-        //     }
-        //   };
-        //   upsert(turn.user);
-        //   turn.responses.forEach(upsert);
-        //   return next;
-        // });
+        // 用已落库的用户消息替换乐观消息
+        const pendingId = optimisticId;
+        setMessages((prev) => prev.filter((message) => message.id !== pendingId));
+        mergeMessages(turn.user);
+        setPendingTurn({ turnId: turn.turn_id, sessionId: activeSessionId });
         await loadSessions();
       } catch (err) {
         if (optimisticId) {
@@ -174,13 +170,39 @@ export function useWorkspace(): UseWorkspaceResult {
           );
         }
         setError(err instanceof Error ? err.message : "发送失败，请稍后再试");
-      } finally {
         setIsSending(false);
       }
     },
     [user, token, router, sessionId, mergeMessages, loadSessions]
   );
 
+  useEffect(() => {
+    if (!pendingTurn || !token) return;
+    if (pendingTurn.sessionId !== sessionId) {
+      // 已切换到其它会话，不再跟踪该轮次
+      setPendingTurn(null);
+      return;
+    }
+    let stopped = false;
+    const timer = setInterval(async () => {
+      try {
+        const status = await fetchTurn(token, pendingTurn.turnId);
+        if (stopped || status.status === "queued" || status.status === "running") return;
+        setIsSending(false);
+        if (status.status === "failed" && status.error) {
+          setError(status.error);
+        }
+        setPendingTurn(null);
+      } catch {
+        // 轮询失败不影响 WebSocket 推送，下个周期重试
+      }
+    }, TURN_POLL_INTERVAL_MS);
+    return () => {
+      stopped = true;
+      clearInterval(timer);
+    };
+  }, [pendingTurn, token, sessionId]);
+
   // 首页输入框提交后复用 handleSend
   const handleHomeSubmit = useCallback(
     async (event: FormEvent<HTMLFormElement>) => {
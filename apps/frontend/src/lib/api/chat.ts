@@ -1,5 +1,6 @@
 import {
-  ChatTurn,
+  ChatTurnAccepted,
+  ChatTurnStatus,
   Message,
   Session,
   TokenResponse,
@@ -48,13 +49,18 @@ export async function listSessions(token: string): Promise<Session[]> {
   return handleResponse<Session[]>(response);
 }
 
-export async function sendMessage(token: string, sessionId: string, content: string): Promise<ChatTurn> {
+export async function sendMessage(token: string, sessionId: string, content: string): Promise<ChatTurnAccepted> {
   const response = await fetch(`${API_BASE}/chat/messages`, {
     method: 'POST',
     headers: authHeaders(token, { 'Content-Type': 'application/json' }),
     body: JSON.stringify({ session_id: sessionId, content })
   });
-  return handleResponse<ChatTurn>(response);
+  return handleResponse<ChatTurnAccepted>(response);
+}
+
+export async function fetchTurn(token: string, turnId: string): Promise<ChatTurnStatus> {
+  const response = await fetch(`${API_BASE}/chat/turns/${turnId}`, { headers: authHeaders(token) });
+  return handleResponse<ChatTurnStatus>(response);
 }
 
 export async function fetchFileTree(
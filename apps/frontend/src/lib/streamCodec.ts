@@ -0,0 +1,58 @@
+import type { StreamEvent } from '@/types/chat';
+
+// 与后端 app/services/stream_codec.py 的 COMPACT_KEYS 保持一致
+const COMPACT_KEYS: Record<string, keyof StreamEvent> = {
+  t: 'type',
+  s: 'sender',
+  a: 'agent',
+  c: 'content',
+  m: 'message_id',
+  f: 'final',
+  ts: 'timestamp',
+  q: 'sequence',
+  e: 'epoch',
+  p: 'paths',
+  tl: 'tool',
+  i: 'invoker',
+  h: 'checksum',
+  l: 'length'
+};
+
+export const STREAM_QUERY = 'encoding=compact&digest=1';
+
+export function decodeCompactEvent(raw: Record<string, unknown>): StreamEvent {
+  const event: Record<string, unknown> = {};
+  for (const [key, value] of Object.entries(raw)) {
+    const name = COMPACT_KEYS[key] ?? key;
+    event[name] = name === 'final' ? Boolean(value) : value;
+  }
+  return event as unknown as StreamEvent;
+}
+
+let crcTable: Uint32Array | null = null;
+
+function getCrcTable(): Uint32Array {
+  if (crcTable) return crcTable;
+  crcTable = new Uint32Array(256);
+  for (let n = 0; n < 256; n += 1) {
+    let c = n;
+    for (let k = 0; k < 8; k += 1) {
+      c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+    }
+    crcTable[n] = c >>> 0;
+  }
+  return crcTable;
+}
+
+// 校验本地拼接的内容与服务端 final 事件中的 crc32（utf-8 字节）/长度是否一致
+export function matchesDigest(content: string, checksum: string, length: number): boolean {
+  const bytes = new TextEncoder().encode(content);
+  if (bytes.length !== length) return false;
+  const table = getCrcTable();
+  let crc = 0xffffffff;
+  for (let index = 0; index < bytes.length; index += 1) {
+    crc = table[(crc ^ bytes[index]) & 0xff] ^ (crc >>> 8);
+  }
+  const hex = ((crc ^ 0xffffffff) >>> 0).toString(16).padStart(8, '0');
+  return hex === checksum;
+}
@@ -24,8 +24,28 @@ export interface ChatTurn {
   responses: Message[];
 }
 
+export type TurnState = 'queued' | 'running' | 'completed' | 'failed' | 'cancelled';
+
+// POST /chat/messages 返回 202，工作流在后台执行
+export interface ChatTurnStatus {
+  turn_id: string;
+  session_id: string;
+  status: TurnState;
+  submitted_at: string;
+  started_at?: string | null;
+  finished_at?: string | null;
+  queue_position?: number | null; // 同一会话中排在前面的轮次数
+  admission_position?: number | null; // 全局调度队列中排在前面的轮次数
+  cancel_reason?: string | null;
+  error?: string | null;
+}
+
+export interface ChatTurnAccepted extends ChatTurnStatus {
+  user: Message;
+}
+
 export interface StreamEvent {
-  type: 'token' | 'status' | 'error' | 'file_change' | 'message' | 'tool_call'; // 推送事件类别
+  type: 'token' | 'status' | 'error' | 'file_change' | 'message' | 'tool_call' | 'turn'; // 推送事件类别
   sender?: SenderRole; // 消息来源（user/agent/status）
   agent?: AgentRole | null; // 具体哪位 agent 触发
   content?: string; // 文本内容或状态描述
@@ -34,9 +54,16 @@ export interface StreamEvent {
   session_id?: string; // 所属会话 id
   timestamp?: string; // 事件时间
   sequence?: number; // 流式顺序号，便于排序
+  epoch?: string; // sequence 的编号空间，服务端重启后改变
   paths?: string[]; // 受影响的文件路径（文件变更事件）
   tool?: string; // 工具调用名称
   invoker?: string; // 谁触发了工具调用
+  checksum?: string; // digest 模式下 final 事件的内容 crc32
+  length?: number; // digest 模式下 final 事件的内容 utf-8 字节数
+  turn_id?: string; // turn 事件：后台轮次 id
+  status?: TurnState; // turn 事件：轮次状态
+  queue_position?: number; // turn 事件：排队位置
+  admission_position?: number; // turn 事件：全局调度排队位置
 }
 
 export interface TokenResponse {